@@ -9,11 +9,149 @@ class Settings:
     OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
     COLLECTION_NAME = os.environ.get("COLLECTION_NAME")
     LIMIT = 3
+    # Largest limit a request may ask for
+    MAX_LIMIT = int(os.environ.get("MAX_LIMIT", 100))
+    GENERATION_MODEL = os.environ.get("GENERATION_MODEL", "gpt-4.1")
+
+    # Worker threads used to run blocking Weaviate calls off the event loop
+    WEAVIATE_MAX_WORKERS = int(os.environ.get("WEAVIATE_MAX_WORKERS", 16))
+    # Weaviate client timeouts in seconds for connecting, queries (incl. server-side generation) and inserts
+    WEAVIATE_TIMEOUT_INIT = float(os.environ.get("WEAVIATE_TIMEOUT_INIT", 10))
+    WEAVIATE_TIMEOUT_QUERY = float(os.environ.get("WEAVIATE_TIMEOUT_QUERY", 30))
+    WEAVIATE_TIMEOUT_INSERT = float(os.environ.get("WEAVIATE_TIMEOUT_INSERT", 90))
+    # Timeout for one OpenAI chat completion request, capped by the request deadline
+    GENERATION_TIMEOUT = float(os.environ.get("GENERATION_TIMEOUT", 60))
+
+    # Request deadline in seconds, carried through every stage; clients can shorten it with X-Request-Timeout
+    REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", 30))
+    GENERATE_REQUEST_TIMEOUT = float(os.environ.get("GENERATE_REQUEST_TIMEOUT", 60))
+    # Return retrieval-only results from /generate when generation is unavailable, times out or has too little time left
+    GENERATE_DEGRADE_ENABLED = os.environ.get("GENERATE_DEGRADE_ENABLED", "true").lower() == "true"
+    GENERATE_DEGRADE_MIN_SECONDS = float(os.environ.get("GENERATE_DEGRADE_MIN_SECONDS", 2))
+
+    # Circuit breakers around Weaviate, Neo4j and generation: consecutive failures to open, seconds until half-open probes
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", 5))
+    CIRCUIT_RECOVERY_TIMEOUT = float(os.environ.get("CIRCUIT_RECOVERY_TIMEOUT", 30))
+    CIRCUIT_HALF_OPEN_PROBES = int(os.environ.get("CIRCUIT_HALF_OPEN_PROBES", 1))
+
+    # Let concurrent identical searches, generations and read-only Cypher queries share one execution
+    COALESCE_ENABLED = os.environ.get("COALESCE_ENABLED", "true").lower() == "true"
+
+    # Admission control: concurrent requests and queued requests per route class, beyond which requests get a 503
+    ADMISSION_CONTROL_ENABLED = os.environ.get("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+    ADMISSION_GENERATE_CONCURRENCY = int(os.environ.get("ADMISSION_GENERATE_CONCURRENCY", 8))
+    ADMISSION_GENERATE_QUEUE = int(os.environ.get("ADMISSION_GENERATE_QUEUE", 16))
+    ADMISSION_SEARCH_CONCURRENCY = int(os.environ.get("ADMISSION_SEARCH_CONCURRENCY", 32))
+    ADMISSION_SEARCH_QUEUE = int(os.environ.get("ADMISSION_SEARCH_QUEUE", 64))
+    ADMISSION_NEO4J_CONCURRENCY = int(os.environ.get("ADMISSION_NEO4J_CONCURRENCY", 16))
+    ADMISSION_NEO4J_QUEUE = int(os.environ.get("ADMISSION_NEO4J_QUEUE", 32))
+    # Longest wait in the queue before a 503, and the Retry-After seconds sent with it
+    ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 10))
+    ADMISSION_RETRY_AFTER = int(os.environ.get("ADMISSION_RETRY_AFTER", 1))
+
+    # Batch search: maximum queries per call and how many run against Weaviate at once
+    BATCH_SEARCH_MAX_SIZE = int(os.environ.get("BATCH_SEARCH_MAX_SIZE", 1000))
+    BATCH_SEARCH_CONCURRENCY = int(os.environ.get("BATCH_SEARCH_CONCURRENCY", 8))
+
+    # Search result and answer caches live in each worker process; /cache/invalidate only clears the worker
+    # that receives it, so with several workers the TTLs bound how long results stay stale after re-ingestion
+    # Shared secret that /cache/invalidate requires in its X-Cache-Admin-Token header; unset disables the endpoint
+    CACHE_ADMIN_TOKEN = os.environ.get("CACHE_ADMIN_TOKEN")
+    # Semantic search result cache
+    SEARCH_CACHE_MAX_SIZE = int(os.environ.get("SEARCH_CACHE_MAX_SIZE", 1024))
+    SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 300))
+
+    # Generated answer cache; paraphrases match when query embeddings reach the similarity threshold
+    GENERATE_CACHE_MAX_SIZE = int(os.environ.get("GENERATE_CACHE_MAX_SIZE", 512))
+    GENERATE_CACHE_TTL = float(os.environ.get("GENERATE_CACHE_TTL", 3600))
+    GENERATE_CACHE_SIMILARITY = float(os.environ.get("GENERATE_CACHE_SIMILARITY", 0.95))
+
+    # Client-side embeddings: "openai" or the deterministic offline "hashing" embedder
+    EMBEDDING_PROVIDER = os.environ.get("EMBEDDING_PROVIDER", "openai")
+    EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+    EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 512))
+    # Vector size; OpenAI models that support shortened embeddings (text-embedding-3-*) are asked for it too
+    EMBEDDING_DIMENSIONS = int(os.environ.get("EMBEDDING_DIMENSIONS", 256))
+    # Seconds per embeddings API call; query embeddings in the API are further capped by the request deadline
+    EMBEDDING_TIMEOUT = float(os.environ.get("EMBEDDING_TIMEOUT", 30))
+    VECTOR_CACHE_PATH = os.environ.get("VECTOR_CACHE_PATH", ".vector_cache.sqlite3")
+
+    # Embed queries in the API and search with near_vector. Off by default: EMBEDDING_MODEL and EMBEDDING_DIMENSIONS
+    # must match the collection's vectorizer, or retrieval silently degrades or fails on a dimension mismatch
+    CLIENT_QUERY_EMBEDDING = os.environ.get("CLIENT_QUERY_EMBEDDING", "false").lower() == "true"
+    QUERY_EMBEDDING_CACHE_MAX_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_MAX_SIZE", 4096))
+    QUERY_EMBEDDING_CACHE_TTL = float(os.environ.get("QUERY_EMBEDDING_CACHE_TTL", 86400))
+
+    # Retrieval backend: the remote "weaviate" collection or an in-process "local" vector index
+    RETRIEVAL_BACKEND = os.environ.get("RETRIEVAL_BACKEND", "weaviate")
+    LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", ".local_index.npz")
+    # IVF partitioning for the local index: lists to build (0 disables), minimum size and lists probed per query
+    LOCAL_INDEX_IVF_LISTS = int(os.environ.get("LOCAL_INDEX_IVF_LISTS", 0))
+    LOCAL_INDEX_IVF_MIN_SIZE = int(os.environ.get("LOCAL_INDEX_IVF_MIN_SIZE", 50000))
+    LOCAL_INDEX_NPROBE = int(os.environ.get("LOCAL_INDEX_NPROBE", 8))
+    
+    # Re-rank over-fetched generation context with a local scorer ("bm25" or "vector") and MMR diversification;
+    # answers are then generated client-side instead of by Weaviate's generate.hybrid
+    RERANK_ENABLED = os.environ.get("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", 20))
+    RERANK_SCORER = os.environ.get("RERANK_SCORER", "bm25")
+    # Share of relevance taken from query-vector similarity (or the retrieval rank without a query vector), and MMR's relevance/diversity trade-off
+    RERANK_VECTOR_WEIGHT = float(os.environ.get("RERANK_VECTOR_WEIGHT", 0.5))
+    RERANK_MMR_LAMBDA = float(os.environ.get("RERANK_MMR_LAMBDA", 0.7))
+    # Hits this similar to an already selected one are dropped as duplicates
+    RERANK_DUPLICATE_THRESHOLD = float(os.environ.get("RERANK_DUPLICATE_THRESHOLD", 0.97))
+    
+    # Pack generation context into a token budget, merging chunks of one section or table and dropping repeated text;
+    # enabling it moves /generate from Weaviate's generate.hybrid to client-side generation, even with re-ranking off
+    CONTEXT_PACKING_ENABLED = os.environ.get("CONTEXT_PACKING_ENABLED", "false").lower() == "true"
+    CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 3000))
+    
+    # Graph-augmented search: fused results returned, candidates fetched per store, sibling chunks per match and the RRF constant
+    GRAPH_SEARCH_LIMIT = int(os.environ.get("GRAPH_SEARCH_LIMIT", 10))
+    GRAPH_SEARCH_CANDIDATES = int(os.environ.get("GRAPH_SEARCH_CANDIDATES", 20))
+    GRAPH_SIBLING_WINDOW = int(os.environ.get("GRAPH_SIBLING_WINDOW", 1))
+    GRAPH_RRF_K = int(os.environ.get("GRAPH_RRF_K", 60))
+    GRAPH_FULLTEXT_INDEX = os.environ.get("GRAPH_FULLTEXT_INDEX", "chunk_content")
+    
+    # Encode endpoint results directly with orjson (or json when it is not installed), skipping response_model validation
+    FAST_JSON_RESPONSES = os.environ.get("FAST_JSON_RESPONSES", "false").lower() == "true"
+    
+    # Expose Prometheus metrics at /metrics and record per-route and per-stage latencies
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    
+    # Per-request profiling, triggered by an X-Profile-Token header matching PROFILING_TOKEN or at PROFILING_SAMPLE_RATE
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN")
+    PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0.0))
+    # "sampling" (all threads, low overhead) or "cprofile" (event loop thread, exact call counts)
+    PROFILING_MODE = os.environ.get("PROFILING_MODE", "sampling")
+    PROFILING_INTERVAL = float(os.environ.get("PROFILING_INTERVAL", 0.005))
+    PROFILING_TRACEMALLOC = os.environ.get("PROFILING_TRACEMALLOC", "false").lower() == "true"
+    PROFILING_TRACEMALLOC_FRAMES = int(os.environ.get("PROFILING_TRACEMALLOC_FRAMES", 1))
+    PROFILING_TOP_N = int(os.environ.get("PROFILING_TOP_N", 30))
+    PROFILING_MAX_REPORTS = int(os.environ.get("PROFILING_MAX_REPORTS", 100))
+    
+    # Response compression by Accept-Encoding: zstd (needs the zstandard package) or gzip, for bodies of at least COMPRESSION_MIN_SIZE bytes
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_ZSTD_LEVEL = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", 3))
     
     # Neo4j settings
     NEO4J_URI = os.environ.get("NEO4J_URI")
     NEO4J_USER = os.environ.get("NEO4J_USER")
     NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD")
     NEO4J_DATABASE = os.environ.get("NEO4J_DATABASE", "neo4j")
+    # Connection pool tuning; read transactions go to read replicas when NEO4J_URI uses neo4j:// or neo4j+s://
+    NEO4J_MAX_POOL_SIZE = int(os.environ.get("NEO4J_MAX_POOL_SIZE", 100))
+    NEO4J_MAX_CONNECTION_LIFETIME = float(os.environ.get("NEO4J_MAX_CONNECTION_LIFETIME", 3600))
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.environ.get("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 60))
+    NEO4J_MAX_TRANSACTION_RETRY_TIME = float(os.environ.get("NEO4J_MAX_TRANSACTION_RETRY_TIME", 30))
+    # Socket connect timeout, and the server-side transaction timeout (capped by the request deadline)
+    NEO4J_CONNECTION_TIMEOUT = float(os.environ.get("NEO4J_CONNECTION_TIMEOUT", 10))
+    NEO4J_QUERY_TIMEOUT = float(os.environ.get("NEO4J_QUERY_TIMEOUT", 30))
+    # Records pulled from the server per round trip, and the largest page a client may request
+    NEO4J_FETCH_SIZE = int(os.environ.get("NEO4J_FETCH_SIZE", 1000))
+    NEO4J_MAX_PAGE_SIZE = int(os.environ.get("NEO4J_MAX_PAGE_SIZE", 1000))
 
 settings = Settings()
@@ -1,43 +1,84 @@
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, AsyncGraphDatabase
 from app.config import settings
 
 class Neo4jClient:
     def __init__(self):
         self.driver = None
+        self.async_driver = None
+    
+    @staticmethod
+    def _driver_config():
+        """Connection pool and retry settings shared by the sync and async drivers"""
+        return {
+            "auth": (settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+            "max_connection_pool_size": settings.NEO4J_MAX_POOL_SIZE,
+            "max_connection_lifetime": settings.NEO4J_MAX_CONNECTION_LIFETIME,
+            "connection_acquisition_timeout": settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+            "connection_timeout": settings.NEO4J_CONNECTION_TIMEOUT,
+            "max_transaction_retry_time": settings.NEO4J_MAX_TRANSACTION_RETRY_TIME,
+        }
     
     def connect(self):
         """Connect to Neo4j database"""
         try:
             self.driver = GraphDatabase.driver(
                 settings.NEO4J_URI,
-                auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+                **self._driver_config()
             )
             return self.driver
         except Exception as e:
             print(f"Failed to connect to Neo4j: {e}")
             raise
     
+    def connect_async(self):
+        """Create the async Neo4j driver used by the API"""
+        try:
+            self.async_driver = AsyncGraphDatabase.driver(
+                settings.NEO4J_URI,
+                **self._driver_config()
+            )
+            return self.async_driver
+        except Exception as e:
+            print(f"Failed to connect to Neo4j: {e}")
+            raise
+    
     def disconnect(self):
         """Close Neo4j connection"""
         if self.driver:
             self.driver.close()
     
+    async def disconnect_async(self):
+        """Close the async Neo4j driver"""
+        if self.async_driver:
+            await self.async_driver.close()
+    
     def get_driver(self):
         """Get the Neo4j driver instance"""
         if not self.driver:
             self.connect()
         return self.driver
     
+    def get_async_driver(self):
+        """Get the async Neo4j driver instance"""
+        if not self.async_driver:
+            self.connect_async()
+        return self.async_driver
+    
     def is_ready(self):
         """Check if Neo4j is ready"""
         try:
-            if not self.driver:
-                self.connect()
-            with self.driver.session() as session:
-                result = session.run("RETURN 1")
-                return bool(result.single())
+            self.get_driver().verify_connectivity()
+            return True
+        except:
+            return False
+    
+    async def is_ready_async(self):
+        """Check if Neo4j is ready using the async driver"""
+        try:
+            await self.get_async_driver().verify_connectivity()
+            return True
         except:
             return False
 
 # Global instance
-neo4j_client = Neo4jClient() 
\ No newline at end of file
+neo4j_client = Neo4jClient()
\ No newline at end of file
@@ -1,21 +1,30 @@
-import weaviate
-from weaviate.classes.init import Auth
-from weaviate.classes.config import Configure
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from app.config import settings
 
 class WeaviateClient:
     def __init__(self):
         self.client = None
+        self.executor = None
     
     def connect(self):
         """Connect to Weaviate Cloud"""
+        # Imported here so the app can run against the local retrieval backend without the client library
+        import weaviate
+        from weaviate.classes.init import AdditionalConfig, Auth, Timeout
         try:
             self.client = weaviate.connect_to_weaviate_cloud(
                 cluster_url=settings.WEAVIATE_URL,
                 auth_credentials=Auth.api_key(settings.WEAVIATE_API_KEY),
-                headers={"X-OpenAI-Api-Key": settings.OPENAI_API_KEY}
+                headers={"X-OpenAI-Api-Key": settings.OPENAI_API_KEY},
                 # headers={"X-Cohere-Api-Key": settings.COHERE_API_KEY},
-
+                additional_config=AdditionalConfig(timeout=Timeout(
+                    init=settings.WEAVIATE_TIMEOUT_INIT,
+                    query=settings.WEAVIATE_TIMEOUT_QUERY,
+                    insert=settings.WEAVIATE_TIMEOUT_INSERT
+                ))
             )
             return self.client
         except Exception as e:
@@ -26,6 +35,9 @@ class WeaviateClient:
         """Close Weaviate connection"""
         if self.client:
             self.client.close()
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
     
     def get_client(self):
         """Get the Weaviate client instance"""
@@ -33,6 +45,28 @@ class WeaviateClient:
             self.connect()
         return self.client
     
+    def get_executor(self):
+        """Get the bounded thread pool used for blocking Weaviate calls"""
+        if not self.executor:
+            self.executor = ThreadPoolExecutor(
+                max_workers=settings.WEAVIATE_MAX_WORKERS,
+                thread_name_prefix="weaviate"
+            )
+        return self.executor
+    
+    async def run_in_executor(self, func, *args, **kwargs):
+        """Run a blocking call in the Weaviate thread pool without blocking the event loop
+
+        The call runs in a copy of the caller's context so context variables such as
+        the current route reach the worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.get_executor(),
+            functools.partial(context.run, func, *args, **kwargs)
+        )
+    
     def is_ready(self):
         """Check if Weaviate is ready"""
         try:
@@ -1,22 +1,38 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import hmac
+import math
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from db.weaviate_client import weaviate_client
 from db.neo4j_client import neo4j_client
+from services.retrieval import backend
 from routers import search, neo4j
+from middleware.admission import AdmissionMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.deadline import DeadlineMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.profiling import ProfilingMiddleware, profile_store
+from services.metrics import registry
+from services.resilience import BackendUnavailable, CircuitOpenError
+from app.config import settings
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting FastAPI application...")
     try:
-        weaviate_client.connect()
-        print("Connected to Weaviate successfully")
-        neo4j_client.connect()
+        if backend.name == "local":
+            index = backend.load()
+            print(f"Loaded local vector index with {len(index)} objects")
+        else:
+            weaviate_client.connect()
+            print("Connected to Weaviate successfully")
+        neo4j_client.connect_async()
         print("Connected to Neo4j successfully")
     except Exception as e:
         print(f"Failed to connect to databases: {e}")
@@ -27,7 +43,7 @@ async def lifespan(app: FastAPI):
     print("Shutting down FastAPI application...")
     weaviate_client.disconnect()
     print("Disconnected from Weaviate")
-    neo4j_client.disconnect()
+    await neo4j_client.disconnect_async()
     print("Disconnected from Neo4j")
 
 app = FastAPI(
@@ -46,6 +62,31 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Inside the metrics middleware, so shed requests still show up in request latencies and errors
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# Outside admission control, so time spent queued counts against the request deadline
+app.add_middleware(DeadlineMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Added only when enabled so requests pay nothing for profiling otherwise
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+@app.exception_handler(BackendUnavailable)
+async def backend_unavailable_handler(request: Request, exc: BackendUnavailable):
+    """Answer 503 for an open circuit and 504 for an exceeded deadline instead of a generic 500"""
+    headers = {}
+    if isinstance(exc, CircuitOpenError):
+        headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
+
 # Include routers
 app.include_router(search.router, prefix="/api/search", tags=["Search"])
 app.include_router(neo4j.router, prefix="/api/neo4j", tags=["Neo4j"])
@@ -61,6 +102,32 @@ def read_root():
         }
     }
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus metrics in the text exposition format"""
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+if settings.PROFILING_ENABLED:
+    def check_profile_token(token):
+        if not settings.PROFILING_TOKEN or not hmac.compare_digest(token or "", settings.PROFILING_TOKEN):
+            raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+    @app.get("/debug/profiles", include_in_schema=False)
+    def list_profiles(x_profile_token: str = Header(None)):
+        """List stored profiling reports, newest first"""
+        check_profile_token(x_profile_token)
+        return {"profiles": profile_store.summaries()}
+
+    @app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+    def get_profile(profile_id: str, x_profile_token: str = Header(None)):
+        """Return a stored profiling report by the ID sent in its X-Profile-Id header"""
+        check_profile_token(x_profile_token)
+        report = profile_store.get(profile_id)
+        if report is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return report
+
 # if __name__ == "__main__":
 #     import uvicorn
 #     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,182 @@
+import asyncio
+import json
+from collections import deque
+from typing import Dict, Optional
+from middleware.metrics import resolve_route
+from services.metrics import admission_active, admission_queued, admission_rejected, requests_cancelled
+from services.resilience import remaining
+from app.config import settings
+
+# Route templates by prefix and the limit class that admits them; other routes are never limited
+ROUTE_LIMITS = (
+    ("/api/search/generate", "generate"),
+    ("/api/search/search", "search"),
+    ("/api/search/graph", "search"),
+    ("/api/search/objects", "search"),
+    ("/api/neo4j/query", "neo4j"),
+)
+
+class ConcurrencyLimiter:
+    """At most `concurrency` requests at once, with up to `queue_size` more waiting in FIFO order
+
+    A released slot is handed straight to the oldest waiter, so requests cannot
+    overtake the queue.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+        admission_active.set_function(lambda: self.active, limit=name)
+        admission_queued.set_function(lambda: len(self._waiters), limit=name)
+
+    async def acquire(self, timeout: float) -> Optional[str]:
+        """Take a slot; returns None once admitted, or why the request was rejected"""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return None
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return "queue_timeout"
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+def build_limiters() -> Dict[str, ConcurrencyLimiter]:
+    return {
+        "generate": ConcurrencyLimiter(
+            "generate", settings.ADMISSION_GENERATE_CONCURRENCY, settings.ADMISSION_GENERATE_QUEUE
+        ),
+        "search": ConcurrencyLimiter("search", settings.ADMISSION_SEARCH_CONCURRENCY, settings.ADMISSION_SEARCH_QUEUE),
+        "neo4j": ConcurrencyLimiter("neo4j", settings.ADMISSION_NEO4J_CONCURRENCY, settings.ADMISSION_NEO4J_QUEUE),
+    }
+
+class AdmissionMiddleware:
+    """ASGI middleware applying per-route concurrency limits and cancelling requests whose client left
+
+    Requests beyond a route's limit wait in a bounded queue; when the queue is full,
+    or the wait exceeds ADMISSION_QUEUE_TIMEOUT or the request deadline, they are answered at once with 503
+    and Retry-After. Admitted requests run as a task that is cancelled if the client
+    disconnects before the response is complete, which drops Weaviate calls still
+    queued for the executor and aborts Neo4j queries and token streams.
+    """
+
+    def __init__(self, app, limiters: Dict[str, ConcurrencyLimiter] = None):
+        self.app = app
+        self.limiters = limiters or route_limiters
+
+    def _limiter(self, scope) -> Optional[ConcurrencyLimiter]:
+        route = resolve_route(scope)
+        for prefix, name in ROUTE_LIMITS:
+            if route.startswith(prefix):
+                return self.limiters[name]
+        return None
+
+    @staticmethod
+    async def _reject(send, reason: str) -> None:
+        body = json.dumps({"detail": "Server is overloaded, please retry later", "reason": reason}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(settings.ADMISSION_RETRY_AFTER).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limiter = self._limiter(scope)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        # A request never waits for a slot longer than its deadline leaves it
+        left = remaining()
+        timeout = settings.ADMISSION_QUEUE_TIMEOUT if left is None else max(0.0, min(settings.ADMISSION_QUEUE_TIMEOUT, left))
+        rejected = await limiter.acquire(timeout)
+        if rejected is not None:
+            admission_rejected.inc(limit=limiter.name, reason=rejected)
+            await self._reject(send, rejected)
+            return
+        try:
+            await self._run(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _run(self, scope, receive, send):
+        # Read the body up front so that afterwards only disconnects are left to receive
+        messages = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                requests_cancelled.inc(route=resolve_route(scope))
+                return
+            messages.append(message)
+            if not message.get("more_body", False):
+                break
+
+        disconnected = asyncio.Event()
+        response_complete = False
+
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send_wrapper(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        task = asyncio.ensure_future(self.app(scope, replay_receive, send_wrapper))
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    # Background tasks run after the response is complete and must not be cut off
+                    if not response_complete and not task.done():
+                        requests_cancelled.inc(route=resolve_route(scope))
+                        task.cancel()
+                    return
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await task
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                raise
+        finally:
+            watcher.cancel()
+
+# Global instance
+route_limiters = build_limiters()
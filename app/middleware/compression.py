@@ -0,0 +1,137 @@
+import zlib
+from typing import Dict, Optional
+from app.config import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Media types sent incrementally to the client; compressing them would buffer events and records
+UNCOMPRESSED_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its quality value"""
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+def choose_encoding(header: str) -> Optional[str]:
+    """Pick "zstd" or "gzip" for an Accept-Encoding header, preferring zstd on equal quality"""
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get("*", 0.0)
+    candidates = []
+    if zstandard is not None:
+        candidates.append((codings.get("zstd", wildcard), 1, "zstd"))
+    candidates.append((codings.get("gzip", wildcard), 0, "gzip"))
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+class _Compressor:
+    """Incremental gzip or zstd encoder"""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._encoder = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+        else:
+            self._encoder = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._encoder.compress(data)
+
+    def flush(self) -> bytes:
+        return self._encoder.flush()
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with zstd or gzip according to Accept-Encoding
+
+    Bodies smaller than COMPRESSION_MIN_SIZE, event and NDJSON streams and responses that
+    already carry a Content-Encoding are passed through untouched. zstd is only
+    offered when the optional zstandard package is installed.
+    """
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for key, value in scope.get("headers", []):
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+class _CompressingSend:
+    """Send callable for one response; holds back the start message until the first body chunk"""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = {key.lower(): value for key, value in message.get("headers", [])}
+            media_type = headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip().lower()
+            if b"content-encoding" in headers or media_type in UNCOMPRESSED_MEDIA_TYPES:
+                self.passthrough = True
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.compressor = _Compressor(self.encoding)
+            headers = [
+                (key, value) for key, value in start.get("headers", [])
+                if key.lower() not in (b"content-length", b"vary")
+            ]
+            vary = [value for key, value in start.get("headers", []) if key.lower() == b"vary"]
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+            headers.append((b"content-encoding", self.encoding.encode("ascii")))
+            if not more_body:
+                body = self.compressor.compress(body) + self.compressor.flush()
+                headers.append((b"content-length", str(len(body)).encode("ascii")))
+                await self.send({**start, "headers": headers})
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send({**start, "headers": headers})
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,48 @@
+import time
+from typing import Optional
+from services.resilience import request_deadline
+from app.config import settings
+
+# Routes given GENERATE_REQUEST_TIMEOUT instead of REQUEST_TIMEOUT
+GENERATE_ROUTE_PREFIX = "/api/search/generate"
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each request a deadline that every backend call is bounded by
+
+    The deadline starts when the request arrives, so time spent queued for admission
+    counts against it. Clients can shorten it, never extend it, with an
+    X-Request-Timeout header in seconds. A timeout of 0 disables the deadline.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _timeout(scope) -> Optional[float]:
+        timeout = settings.GENERATE_REQUEST_TIMEOUT if scope["path"].startswith(GENERATE_ROUTE_PREFIX) \
+            else settings.REQUEST_TIMEOUT
+        timeout = timeout if timeout > 0 else None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-timeout":
+                try:
+                    requested = float(value.decode("latin-1"))
+                except ValueError:
+                    break
+                if requested > 0:
+                    timeout = requested if timeout is None else min(timeout, requested)
+                break
+        return timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timeout = self._timeout(scope)
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+        token = request_deadline.set(time.monotonic() + timeout)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
@@ -0,0 +1,104 @@
+import asyncio
+import contextvars
+import functools
+import time
+from fastapi.routing import APIRoute
+from starlette.responses import StreamingResponse
+from starlette.routing import Match
+from services.metrics import current_route, request_latency, requests_in_flight, request_errors, stage_latency
+from services.serialization import fast_json_endpoint
+from app.config import settings
+
+# Set by a MetricsRoute handler; the wrapped endpoint stores the time it returned so serialization can be timed
+endpoint_finished = contextvars.ContextVar("endpoint_finished", default=None)
+
+def resolve_route(scope) -> str:
+    """Route path template for a request, so metric labels do not grow with raw URLs"""
+    app = scope.get("app")
+    partial = None
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, in-flight requests and server errors"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = resolve_route(scope)
+        token = current_route.set(route)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        requests_in_flight.inc(route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status["code"] = 500
+            raise
+        finally:
+            request_latency.observe(
+                time.perf_counter() - start,
+                method=scope["method"], route=route, status=str(status["code"])
+            )
+            if status["code"] >= 500:
+                request_errors.inc(route=route, status=str(status["code"]))
+            requests_in_flight.dec(route=route)
+            current_route.reset(token)
+
+def _mark_endpoint_finished(endpoint):
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            marker = endpoint_finished.get()
+            if marker is not None:
+                marker[0] = time.perf_counter()
+    return wrapper
+
+class MetricsRoute(APIRoute):
+    """APIRoute that records response validation and JSON encoding as the serialization stage
+
+    With FAST_JSON_RESPONSES, endpoint results are encoded straight to JSON instead
+    of being validated against the response_model and run through jsonable_encoder.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _mark_endpoint_finished(endpoint)
+            # Wrapped outside the marker so the fast path's encoding is still timed as serialization
+            if settings.FAST_JSON_RESPONSES:
+                endpoint = fast_json_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            marker = [None]
+            token = endpoint_finished.set(marker)
+            try:
+                response = await handler(request)
+            finally:
+                endpoint_finished.reset(token)
+            if marker[0] is not None and not isinstance(response, StreamingResponse):
+                stage_latency.observe(time.perf_counter() - marker[0], route=self.path, stage="serialization")
+            return response
+
+        return timed_handler
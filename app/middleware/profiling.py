@@ -0,0 +1,240 @@
+import cProfile
+import hmac
+import io
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+from app.config import settings
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_MODE_HEADER = b"x-profile-mode"
+PROFILE_MEMORY_HEADER = b"x-profile-memory"
+PROFILE_MODES = ("sampling", "cprofile")
+
+# Innermost Python frames of a pool worker waiting for work rather than working for a request
+IDLE_LEAF_FRAMES = {("thread.py", "_worker"), ("threading.py", "wait"), ("queue.py", "get")}
+
+class ProfileStore:
+    """Bounded in-memory store of profiling reports, evicting the oldest first"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._reports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            self._reports[report["id"]] = report
+            while len(self._reports) > self.max_size:
+                self._reports.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._reports.get(profile_id)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Newest first, without the profile bodies"""
+        with self._lock:
+            reports = list(self._reports.values())
+        keys = ("id", "method", "path", "mode", "status", "started_at", "duration_ms")
+        return [{key: report.get(key) for key in keys} for report in reversed(reports)]
+
+class SamplingProfiler:
+    """Samples the stacks of all threads from a background thread via sys._current_frames()
+
+    Unlike cProfile this sees the Weaviate executor threads as well as the event
+    loop, and its overhead depends on the interval rather than on call counts.
+    Samples cover the whole process, so concurrent requests show up too.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                name = names.get(ident, str(ident))
+                leaf = (frame.f_code.co_filename.rsplit("/", 1)[-1], frame.f_code.co_name)
+                if name != "MainThread" and leaf in IDLE_LEAF_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[(name, tuple(reversed(stack)))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, top: int) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+
+        threads: Counter = Counter()
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        for (thread_name, stack), count in self.stacks.items():
+            threads[thread_name] += count
+            own[stack[-1]] += count
+            for label in set(stack):
+                cumulative[label] += count
+
+        def ranked(counter: Counter) -> List[Dict[str, Any]]:
+            return [
+                {"function": label, "samples": count, "percent": round(100.0 * count / max(self.samples, 1), 1)}
+                for label, count in counter.most_common(top)
+            ]
+
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "threads": dict(threads),
+            "top_self": ranked(own),
+            "top_cumulative": ranked(cumulative),
+            # Collapsed stacks for flame graph tools: "thread;outer;...;inner count"
+            "collapsed": [
+                f"{';'.join((thread_name,) + stack)} {count}"
+                for (thread_name, stack), count in self.stacks.most_common(top * 5)
+            ],
+        }
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles selected requests and stores the report under an ID
+
+    A request is profiled when it carries the configured X-Profile-Token, or at
+    random with PROFILING_SAMPLE_RATE. X-Profile-Mode picks "sampling" or "cprofile"
+    and X-Profile-Memory: true adds a tracemalloc diff. Only one request is profiled
+    at a time; others run untouched. The report ID is returned in X-Profile-Id.
+    Only add this middleware when profiling is enabled, so a disabled profiler costs nothing.
+    """
+
+    def __init__(self, app, store: ProfileStore = None):
+        self.app = app
+        self.store = store or profile_store
+        self._active = threading.Lock()
+
+    @staticmethod
+    def _header(scope, name: bytes) -> Optional[str]:
+        for key, value in scope.get("headers", []):
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    def _selected(self, scope):
+        """(mode, trace memory) for a request that should be profiled, otherwise None"""
+        token = self._header(scope, PROFILE_TOKEN_HEADER)
+        if token is not None and settings.PROFILING_TOKEN and hmac.compare_digest(token, settings.PROFILING_TOKEN):
+            mode = (self._header(scope, PROFILE_MODE_HEADER) or settings.PROFILING_MODE).lower()
+            memory = (self._header(scope, PROFILE_MEMORY_HEADER) or "").lower() in ("1", "true", "yes")
+            return (mode if mode in PROFILE_MODES else settings.PROFILING_MODE), memory
+        if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return settings.PROFILING_MODE, settings.PROFILING_TRACEMALLOC
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/debug/profiles"):
+            await self.app(scope, receive, send)
+            return
+        selected = self._selected(scope)
+        if selected is None or not self._active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send, *selected)
+        finally:
+            self._active.release()
+
+    @staticmethod
+    def _snapshot():
+        """Allocation snapshot without the profiler's own bookkeeping"""
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    async def _profile(self, scope, receive, send, mode: str, memory: bool):
+        profile_id = uuid.uuid4().hex
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode("ascii"))]
+            await send(message)
+
+        started_tracemalloc = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start(settings.PROFILING_TRACEMALLOC_FRAMES)
+            started_tracemalloc = True
+        snapshot_before = self._snapshot() if memory else None
+
+        sampler = None
+        profiler = None
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            sampler = SamplingProfiler(settings.PROFILING_INTERVAL)
+            sampler.start()
+
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            report = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "mode": mode,
+                "status": status["code"],
+                "started_at": started_at,
+                "duration_ms": round(duration * 1000, 3),
+            }
+            if profiler is not None:
+                stream = io.StringIO()
+                pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(settings.PROFILING_TOP_N)
+                report["profile"] = stream.getvalue()
+            else:
+                report["profile"] = sampler.stop(settings.PROFILING_TOP_N)
+            if memory:
+                snapshot_after = self._snapshot()
+                report["memory"] = [
+                    {
+                        "location": str(stat.traceback[0]) if stat.traceback else None,
+                        "size_diff": stat.size_diff,
+                        "count_diff": stat.count_diff,
+                    }
+                    for stat in snapshot_after.compare_to(snapshot_before, "lineno")[:settings.PROFILING_TOP_N]
+                ]
+                if started_tracemalloc:
+                    tracemalloc.stop()
+            self.store.add(report)
+
+# Global instance
+profile_store = ProfileStore(max_size=settings.PROFILING_MAX_REPORTS)
@@ -1,17 +1,63 @@
 from pydantic import BaseModel
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Union
+
+class SearchFilters(BaseModel):
+    """Exact-match filters on indexed chunk metadata; a list matches any of its values"""
+    chunk_type: Optional[Union[str, List[str]]] = None
+    doi: Optional[Union[str, List[str]]] = None
+    source_file: Optional[Union[str, List[str]]] = None
+    section_title: Optional[Union[str, List[str]]] = None
+    table_id: Optional[Union[str, List[str]]] = None
 
 class SearchRequest(BaseModel):
     query: str
+    limit: Optional[int] = None
+    offset: Optional[int] = None
+    cursor: Optional[str] = None
+    auto_limit: Optional[int] = None
+    filters: Optional[SearchFilters] = None
+    # Properties to return per hit (all when unset); metadata_only returns just IDs and scores
+    return_properties: Optional[List[str]] = None
+    metadata_only: bool = False
 
 class SearchResponse(BaseModel):
     success: bool
     results: List[Dict[str, Any]]
     count: int
     message: str
+    next_cursor: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    requests: List[SearchRequest]
+
+class BatchSearchItem(BaseModel):
+    index: int
+    success: bool
+    result: Optional[SearchResponse] = None
+    error: Optional[str] = None
+
+class BatchSearchResponse(BaseModel):
+    success: bool
+    results: List[BatchSearchItem]
+    count: int
+    message: str
+
+class ObjectsRequest(BaseModel):
+    ids: List[str]
+    return_properties: Optional[List[str]] = None
+
+class ObjectsResponse(BaseModel):
+    success: bool
+    results: List[Dict[str, Any]]
+    count: int
+    missing: List[str]
+    message: str
 
 class GenerativeRequest(BaseModel):
     query: str
+    limit: Optional[int] = None
+    auto_limit: Optional[int] = None
+    filters: Optional[SearchFilters] = None
 
 class GenerativeResponse(BaseModel):
     success: bool
@@ -19,6 +65,41 @@ class GenerativeResponse(BaseModel):
     source_results: List[Dict[str, Any]]
     count: int
     message: str
+    # Prompt tokens sent to the generation model, counted locally; None for server-side generation
+    prompt_tokens: Optional[int] = None
+    # True when generation was skipped (deadline, open circuit, timeout) and only sources are returned
+    degraded: bool = False
+
+class GraphSearchRequest(BaseModel):
+    query: str
+    limit: Optional[int] = None
+    sibling_window: Optional[int] = None
+
+class GraphSearchResponse(BaseModel):
+    success: bool
+    results: List[Dict[str, Any]]
+    count: int
+    sources: Dict[str, int]
+    message: str
+
+class CacheStats(BaseModel):
+    size: int
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    semantic_hits: Optional[int] = None
+    similarity_threshold: Optional[float] = None
+
+class CacheStatsResponse(BaseModel):
+    search: CacheStats
+    generate: CacheStats
+
+class CacheInvalidateResponse(BaseModel):
+    success: bool
+    removed: int
+    message: str
 
 class HealthResponse(BaseModel):
     status: str
@@ -29,12 +110,17 @@ class HealthResponse(BaseModel):
 class Neo4jQueryRequest(BaseModel):
     query: str
     parameters: Optional[Dict[str, Any]] = None
+    fetch_size: Optional[int] = None
+    page_size: Optional[int] = None
+    cursor: Optional[str] = None
+    read_only: Optional[bool] = None
 
 class Neo4jQueryResponse(BaseModel):
     success: bool
     results: List[Dict[str, Any]]
     count: int
     message: str
+    next_cursor: Optional[str] = None
 
 class Neo4jHealthResponse(BaseModel):
     status: str
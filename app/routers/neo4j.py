@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -9,24 +10,50 @@ from models.schema import (
     Neo4jHealthResponse
 )
 from services.neo4j_service import Neo4jService
+from middleware.metrics import MetricsRoute
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
 
 @router.get("/health", response_model=Neo4jHealthResponse)
 async def health_check():
     """Check the health status of Neo4j connection"""
-    health_data = Neo4jService.health_check()
+    health_data = await Neo4jService.health_check()
     return Neo4jHealthResponse(**health_data)
 
+def validate_query_request(query_request: Neo4jQueryRequest):
+    """Reject empty queries, malformed paging options and paging of write queries"""
+    if not query_request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    if query_request.page_size is not None and query_request.page_size < 1:
+        raise HTTPException(status_code=400, detail="page_size must be positive")
+    if query_request.fetch_size is not None and query_request.fetch_size < 1:
+        raise HTTPException(status_code=400, detail="fetch_size must be positive")
+    # Each page re-runs the query, which would repeat a write once per page
+    if (query_request.page_size is not None or query_request.cursor) and not Neo4jService.is_read_only(query_request):
+        raise HTTPException(status_code=400, detail="page_size and cursor are only supported for read-only queries")
+    try:
+        Neo4jService.decode_cursor(query_request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/query", response_model=Neo4jQueryResponse)
 async def execute_query(query_request: Neo4jQueryRequest):
     """Execute a Cypher query in Neo4j"""
-    if not query_request.query.strip():
-        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    validate_query_request(query_request)
     
-    result = Neo4jService.execute_query(query_request)
+    result = await Neo4jService.execute_query(query_request)
     
     if not result.success:
         raise HTTPException(status_code=500, detail=result.message)
     
-    return result 
\ No newline at end of file
+    return result
+
+@router.post("/query/stream")
+async def stream_query(query_request: Neo4jQueryRequest):
+    """Execute a Cypher query and stream its records as NDJSON"""
+    validate_query_request(query_request)
+    
+    return StreamingResponse(
+        Neo4jService.stream_query(query_request),
+        media_type="application/x-ndjson"
+    ) 
\ No newline at end of file
@@ -1,30 +1,94 @@
-from fastapi import APIRouter, HTTPException, Depends
+import hmac
+import json
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import StreamingResponse
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from models.schema import (
     SearchRequest,SearchResponse,
+    BatchSearchRequest, BatchSearchResponse,
     GenerativeRequest,
-    GenerativeResponse, HealthResponse
+    GenerativeResponse, HealthResponse,
+    GraphSearchRequest, GraphSearchResponse,
+    ObjectsRequest, ObjectsResponse,
+    CacheStatsResponse, CacheInvalidateResponse
 )
-from services.weaviate_service import WeaviateService
+from app.config import settings
+from middleware.metrics import MetricsRoute
+from services.weaviate_service import WeaviateService, search_cache, answer_cache
+from services.graph_service import GraphService
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=MetricsRoute)
+
+def validate_request(request):
+    """Reject empty queries and malformed limit, paging and filter options"""
+    error = WeaviateService.request_error(request)
+    if error is not None:
+        raise HTTPException(status_code=400, detail=error)
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Check the health status of Weaviate connection"""
-    health_data = WeaviateService.health_check()
+    health_data = await WeaviateService.health_check_async()
     return HealthResponse(**health_data)
 
 @router.post("/search", response_model=SearchResponse)
 async def semantic_search(search_request: SearchRequest):
     """Perform semantic search using Weaviate"""
-    if not search_request.query.strip():
+    validate_request(search_request)
+    
+    result = await WeaviateService.semantic_search_async(search_request)
+    
+    if not result.success:
+        raise HTTPException(status_code=500, detail=result.message)
+    
+    return result
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def batch_semantic_search(batch_request: BatchSearchRequest):
+    """Perform many semantic searches concurrently in one call"""
+    if not batch_request.requests:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    if len(batch_request.requests) > settings.BATCH_SEARCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds the limit of {settings.BATCH_SEARCH_MAX_SIZE} queries"
+        )
+    
+    return await WeaviateService.batch_search_async(batch_request)
+
+@router.post("/objects", response_model=ObjectsResponse)
+async def fetch_objects(objects_request: ObjectsRequest):
+    """Fetch full objects by ID in one call, e.g. to hydrate hits from a metadata-only search"""
+    if not objects_request.ids:
+        raise HTTPException(status_code=400, detail="ids cannot be empty")
+    if len(objects_request.ids) > settings.MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {settings.MAX_LIMIT} ids can be fetched per call")
+    
+    result = await WeaviateService.fetch_objects_async(objects_request)
+    
+    if not result.success:
+        raise HTTPException(status_code=500, detail=result.message)
+    
+    return result
+
+@router.post("/graph", response_model=GraphSearchResponse)
+async def graph_search(graph_request: GraphSearchRequest):
+    """Search Weaviate and expand matches through the Neo4j graph concurrently, fusing both rankings"""
+    if not graph_request.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
+    if graph_request.limit is not None and graph_request.limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    if graph_request.sibling_window is not None and graph_request.sibling_window < 0:
+        raise HTTPException(status_code=400, detail="sibling_window cannot be negative")
     
-    result = WeaviateService.semantic_search(search_request)
+    result = await GraphService.graph_search(graph_request)
     
     if not result.success:
         raise HTTPException(status_code=500, detail=result.message)
@@ -34,14 +98,51 @@ async def semantic_search(search_request: SearchRequest):
 @router.post("/generate", response_model=GenerativeResponse)
 async def generative_search(gen_request: GenerativeRequest):
     """Perform generative AI search using Weaviate and Cohere"""
-    if not gen_request.query.strip():
-        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    validate_request(gen_request)
     
-    result = WeaviateService.generative_search(gen_request)
-    print("*"*200)
-    print(f"Generated response: {result}")
+    result = await WeaviateService.generative_search_async(gen_request)
+    logger.debug("Generated response: %s", result)
     if not result.success:
         raise HTTPException(status_code=500, detail=result.message)
     
     return result
 
+@router.post("/generate/stream")
+async def generative_search_stream(gen_request: GenerativeRequest):
+    """Stream a generative answer as server-sent events: sources first, then tokens"""
+    validate_request(gen_request)
+    
+    async def event_stream():
+        async for event, data in WeaviateService.generative_search_stream(gen_request):
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def cache_stats():
+    """Return hit/miss counters for the search result and generated answer caches"""
+    return CacheStatsResponse(search=search_cache.stats(), generate=answer_cache.stats())
+
+def check_cache_admin_token(x_cache_admin_token: Optional[str] = Header(None)):
+    """Only callers holding CACHE_ADMIN_TOKEN, such as the ingestion scripts, may clear the caches"""
+    if not settings.CACHE_ADMIN_TOKEN or not hmac.compare_digest(x_cache_admin_token or "", settings.CACHE_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid cache admin token")
+
+@router.post("/cache/invalidate", response_model=CacheInvalidateResponse, dependencies=[Depends(check_cache_admin_token)])
+async def invalidate_cache(collection: Optional[str] = None):
+    """Drop cached search results and answers, e.g. after an ingestion run rewrites a collection
+
+    Requires the X-Cache-Admin-Token header. Caches are per process: only the worker that
+    receives this call is cleared. Other workers keep serving their entries until
+    SEARCH_CACHE_TTL / GENERATE_CACHE_TTL expire.
+    """
+    removed = WeaviateService.invalidate_cache(collection)
+    return CacheInvalidateResponse(
+        success=True,
+        removed=removed,
+        message=f"Invalidated {removed} cached entries in worker {os.getpid()}; other workers expire theirs by TTL"
+    )
@@ -0,0 +1,179 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query string so trivially different spellings share a cache key"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key, evicting the least recently used entries when full"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate=None) -> int:
+        """Drop all entries, or only those whose key matches predicate; returns the number dropped"""
+        with self._lock:
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class SemanticCache:
+    """LRU cache that also matches paraphrased queries by embedding cosine similarity
+
+    Entries are stored per collection together with the normalized query text and
+    its embedding. A lookup first tries an exact match on the normalized text and
+    then falls back to the most similar cached embedding above the threshold.
+    An optional scope (e.g. result limit and filters) must also match exactly.
+    """
+
+    def __init__(self, max_size: int, ttl: float, threshold: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        # key: (collection, normalized query, scope) -> (expires_at, unit vector or None, value)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry[0] < now]
+        for key in expired:
+            del self._entries[key]
+
+    def get_exact(self, collection: str, query: str, scope: tuple = ()) -> Optional[Any]:
+        """Return the value cached for exactly this normalized query, without counting a miss"""
+        key = (collection, normalize_query(query), scope)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def get_similar(self, collection: str, vector: Sequence[float], scope: tuple = ()) -> Optional[Any]:
+        """Return the value whose query embedding is most similar to vector, if above the threshold"""
+        query_vector = self._unit(vector)
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            keys: List[tuple] = []
+            vectors = []
+            for key, (_, cached_vector, _) in self._entries.items():
+                if key[0] == collection and key[2] == scope and cached_vector is not None \
+                        and cached_vector.shape == query_vector.shape:
+                    keys.append(key)
+                    vectors.append(cached_vector)
+            if vectors:
+                similarities = np.stack(vectors) @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.semantic_hits += 1
+                    return self._entries[keys[best]][2]
+            self.misses += 1
+            return None
+
+    def set(self, collection: str, query: str, value: Any, vector: Optional[Sequence[float]] = None,
+            ttl: Optional[float] = None, scope: tuple = ()) -> None:
+        """Store value for a query and, when given, its embedding"""
+        if self.max_size <= 0:
+            return
+        key = (collection, normalize_query(query), scope)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        unit_vector = self._unit(vector) if vector is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, unit_vector, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, collection: Optional[str] = None) -> int:
+        """Drop all entries, or only those for one collection; returns the number dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if collection is None or key[0] == collection]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits + self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "semantic_hits": self.semantic_hits,
+                "similarity_threshold": self.threshold
+            }
@@ -0,0 +1,201 @@
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+from services.generation import generator, GROUNDED_TASK
+from services.rerank import hit_text
+from app.config import settings
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Approximates BPE tokens without a vocabulary: short word pieces and single punctuation marks
+APPROXIMATE_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+# Heading paragraph that ingestion puts in front of each section chunk
+SECTION_HEADING_PATTERN = re.compile(r"^Section: [^\n]*$")
+
+# Chunk properties kept in the packed context; the rest (IDs, file names, row numbers) only cost tokens
+CONTEXT_FIELDS = ("document_title", "doi", "section_title", "table_id", "figure_id")
+
+class Tokenizer:
+    """Counts tokens with tiktoken's encoding for the generation model, or a regex approximation
+
+    tiktoken is optional and may need to download its vocabulary on first use; when
+    that fails the approximation is used instead.
+    """
+
+    def __init__(self, model: str = None):
+        self.model = model or settings.GENERATION_MODEL
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get_encoding(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if tiktoken is not None:
+                        try:
+                            self._encoding = tiktoken.encoding_for_model(self.model)
+                        except KeyError:
+                            self._encoding = tiktoken.get_encoding("o200k_base")
+                        except Exception as e:
+                            logger.warning("Failed to load tiktoken encoding, approximating token counts: %s", e)
+                    self._loaded = True
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return len(APPROXIMATE_TOKEN_PATTERN.findall(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of text with at most max_tokens tokens"""
+        if max_tokens <= 0:
+            return ""
+        encoding = self._get_encoding()
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+        for count, match in enumerate(APPROXIMATE_TOKEN_PATTERN.finditer(text), start=1):
+            if count == max_tokens:
+                return text[:match.end()]
+        return text
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class ContextBuilder:
+    """Merge, deduplicate and pack retrieved chunks into a token budget for generation
+
+    Hits are expected best first. Section chunks of one document (parent_id) are merged
+    with their own subsections ("Methods" and "Methods.Sampling"), table rows of one
+    table are collapsed under a single caption line, and paragraphs already contained
+    in earlier context are dropped. Groups are packed in the order of their best hit;
+    one that does not fit whole is cut down to the paragraphs or rows that do.
+    """
+
+    def __init__(self, budget: int = None, tokenizer: Tokenizer = None):
+        self.budget = settings.CONTEXT_TOKEN_BUDGET if budget is None else budget
+        self.tokenizer = tokenizer or Tokenizer()
+
+    @staticmethod
+    def _group(hits: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Group hits that describe the same section or table, in order of each group's best hit"""
+        groups: List[List[Dict[str, Any]]] = []
+        sections: Dict[Tuple[str, str], int] = {}
+        tables: Dict[Tuple[str, str], int] = {}
+        for hit in hits:
+            properties = hit["properties"]
+            parent_id = properties.get("parent_id")
+            title = properties.get("section_title")
+            table_id = properties.get("table_id")
+            index = None
+            if parent_id and table_id:
+                index = tables.setdefault((parent_id, table_id), len(groups))
+            elif parent_id and title:
+                # Join the group of an enclosing, enclosed or the same section of this document
+                for (group_parent, group_title), group_index in sections.items():
+                    if group_parent == parent_id and (
+                        title == group_title
+                        or title.startswith(group_title + ".")
+                        or group_title.startswith(title + ".")
+                    ):
+                        index = group_index
+                        break
+                if index is None:
+                    index = sections[(parent_id, title)] = len(groups)
+            if index is None or index == len(groups):
+                groups.append([hit])
+            else:
+                groups[index].append(hit)
+        return groups
+
+    @staticmethod
+    def _parts(group: List[Dict[str, Any]]) -> Tuple[str, List[str]]:
+        """(header, parts) of a group's text; table rows share their caption line as the header"""
+        texts = [hit_text(hit["properties"]) for hit in group]
+        if group[0]["properties"].get("table_id"):
+            group_texts = sorted(zip(group, texts), key=lambda pair: pair[0]["properties"].get("row_index") or 0)
+            header, _, _ = group_texts[0][1].partition("\n")
+            if all(text.partition("\n")[0] == header for _, text in group_texts):
+                return header, [text.partition("\n")[2] for _, text in group_texts]
+            return "", [text for _, text in group_texts]
+        # Enclosing sections before their subsections, otherwise best first
+        depths = [len((hit["properties"].get("section_title") or "").split(".")) for hit in group]
+        texts = [text for _, text in sorted(zip(depths, texts), key=lambda pair: pair[0])]
+        parts = []
+        for text in texts:
+            parts.extend(part.strip() for part in PARAGRAPH_PATTERN.split(text) if part.strip())
+        return "", parts
+
+    def _entry(self, group: List[Dict[str, Any]], header: str, parts: List[str]) -> Dict[str, Any]:
+        # Label a merged section group with its outermost section
+        properties = min(group, key=lambda hit: len(hit["properties"].get("section_title") or ""))["properties"]
+        entry = {field: properties[field] for field in CONTEXT_FIELDS if properties.get(field) is not None}
+        separator = "\n" if properties.get("table_id") else "\n\n"
+        entry["content"] = separator.join(([header] if header else []) + parts)
+        return entry
+
+    def _tokens(self, entry: Dict[str, Any]) -> int:
+        # Entries are sent as JSON separated by a blank line, see OpenAIGenerator.build_messages
+        return self.tokenizer.count(json.dumps(entry, default=str)) + 1
+
+    def pack(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Context objects for the generator, within the token budget"""
+        seen: List[str] = []
+        remaining = self.budget
+        contexts = []
+        for group in self._group(hits):
+            header, parts = self._parts(group)
+            unique = []
+            for part in parts:
+                normalized = _normalize(part)
+                if normalized and not any(normalized in previous for previous in seen):
+                    unique.append(part)
+                    seen.append(normalized)
+            # A heading whose paragraphs were all dropped says nothing on its own
+            unique = [
+                part for index, part in enumerate(unique)
+                if not SECTION_HEADING_PATTERN.match(part)
+                or (index + 1 < len(unique) and not SECTION_HEADING_PATTERN.match(unique[index + 1]))
+            ]
+            if not unique:
+                continue
+
+            entry = self._entry(group, header, unique)
+            tokens = self._tokens(entry)
+            if tokens > remaining:
+                # Keep the leading parts that fit; the very first context is cut mid-text if need be
+                while len(unique) > 1 and tokens > remaining:
+                    unique.pop()
+                    entry = self._entry(group, header, unique)
+                    tokens = self._tokens(entry)
+                if tokens > remaining:
+                    if contexts:
+                        continue
+                    overhead = tokens - self.tokenizer.count(entry["content"])
+                    entry["content"] = self.tokenizer.truncate(entry["content"], remaining - overhead)
+                    tokens = self._tokens(entry)
+                    if not entry["content"] or tokens > remaining:
+                        continue
+            contexts.append(entry)
+            remaining -= tokens
+        return contexts
+
+    def prompt_tokens(self, query: str, contexts: List[Dict[str, Any]], task: str = GROUNDED_TASK) -> int:
+        """Tokens in the chat messages sent for a question and its packed context"""
+        return sum(
+            self.tokenizer.count(message["content"])
+            for message in generator.build_messages(query, contexts, task)
+        )
+
+# Global instance
+context_builder = ContextBuilder()
@@ -0,0 +1,187 @@
+import abc
+import contextlib
+import hashlib
+import re
+import sqlite3
+import threading
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence
+import numpy as np
+import requests
+from app.config import settings
+
+OPENAI_EMBEDDINGS_URL = "https://api.openai.com/v1/embeddings"
+
+def content_hash(text: str) -> str:
+    """Hash of the text an embedding was computed from"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class Embedder(abc.ABC):
+    """Base class for text embedders; subclasses implement embed()"""
+
+    model_name = "base"
+
+    @abc.abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts, returning one vector per text in input order"""
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query string"""
+        return self.embed([text])[0]
+
+class OpenAIEmbedder(Embedder):
+    """Compute text embeddings with the OpenAI embeddings API in large batches
+
+    breaker is a context manager wrapped around each API call and call_timeout maps the
+    configured timeout to the one for a call, so the API can apply its circuit breaker
+    and request deadline while the ingestion scripts use the embedder without them.
+    """
+
+    def __init__(self, model: str = None, batch_size: int = None, timeout: float = None, dimensions: int = None,
+                 breaker: Optional[ContextManager] = None,
+                 call_timeout: Optional[Callable[[float, str], float]] = None):
+        self.model = model or settings.EMBEDDING_MODEL
+        self.dimensions = dimensions or settings.EMBEDDING_DIMENSIONS
+        # Vectors of one model differ per dimensions, so caches key them apart
+        self.model_name = f"{self.model}-{self.dimensions}"
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.timeout = settings.EMBEDDING_TIMEOUT if timeout is None else timeout
+        self.breaker = breaker
+        self.call_timeout = call_timeout
+        self.session = requests.Session()
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        timeout = self.call_timeout(self.timeout, "embedding") if self.call_timeout else self.timeout
+        with self.breaker or contextlib.nullcontext():
+            response = self.session.post(
+                OPENAI_EMBEDDINGS_URL,
+                headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"},
+                json={"model": self.model, "input": texts, "dimensions": self.dimensions},
+                timeout=timeout
+            )
+            response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[start:start + self.batch_size]))
+        return vectors
+
+class HashingEmbedder(Embedder):
+    """Deterministic local embedder using signed feature hashing of word unigrams and bigrams
+
+    Needs no network access or model files, so it suits offline runs and tests. Texts
+    that share words get similar vectors, but it is not a semantic model.
+    """
+
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, dimensions: int = None):
+        self.dimensions = dimensions or settings.EMBEDDING_DIMENSIONS
+        self.model_name = f"hashing-{self.dimensions}"
+
+    def _embed_one(self, text: str) -> List[float]:
+        tokens = self.TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if (value >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+class VectorCache:
+    """Persistent SQLite store of embeddings keyed by model name and content hash"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "model TEXT NOT NULL, content_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, content_hash))"
+        )
+        self._connection.commit()
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors found for the given content hashes"""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT content_hash, vector FROM vectors WHERE model = ? "
+                    f"AND content_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk]
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, Sequence[float]]) -> None:
+        """Store vectors by content hash"""
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO vectors (model, content_hash, vector) VALUES (?, ?, ?)",
+                [
+                    (model, digest, np.asarray(vector, dtype=np.float32).tobytes())
+                    for digest, vector in items.items()
+                ]
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+class CachedEmbedder(Embedder):
+    """Embedder that serves previously computed vectors from a VectorCache
+
+    Only texts whose content hash is not cached for this model are sent to the
+    wrapped embedder, in one batched call per embed().
+    """
+
+    def __init__(self, embedder: Embedder, cache: VectorCache):
+        self.embedder = embedder
+        self.cache = cache
+        self.model_name = embedder.model_name
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        hashes = [content_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model_name, hashes)
+        missing = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in vectors:
+                missing.setdefault(digest, text)
+        self.hits += len(texts) - sum(1 for digest in hashes if digest in missing)
+        self.misses += len(missing)
+        if missing:
+            computed = dict(zip(missing, self.embedder.embed(list(missing.values()))))
+            self.cache.put_many(self.model_name, computed)
+            vectors.update(computed)
+        return [vectors[digest] for digest in hashes]
+
+def get_embedder(provider: str = None, **options) -> Embedder:
+    """Build the embedder for a provider name ("openai" or "hashing"); options go to OpenAIEmbedder"""
+    provider = (provider or settings.EMBEDDING_PROVIDER).lower()
+    if provider == "openai":
+        return OpenAIEmbedder(**options)
+    if provider == "hashing":
+        return HashingEmbedder()
+    raise ValueError(f"Unknown embedding provider: {provider}")
+
+def get_cached_embedder(provider: str = None, cache_path: str = None) -> CachedEmbedder:
+    """Build an embedder backed by the on-disk vector cache"""
+    return CachedEmbedder(get_embedder(provider), VectorCache(cache_path or settings.VECTOR_CACHE_PATH))
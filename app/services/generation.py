@@ -0,0 +1,90 @@
+import json
+from typing import Any, Dict, Iterator, List
+import requests
+from services.resilience import call_timeout, generation_breaker
+from app.config import settings
+
+OPENAI_CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
+
+GROUNDED_TASK = """
+                    Provide a direct, factual answer using only information from the provided context.
+                    Do not repeat the question.
+                    Do not use prefixes like 'Answer:' or 'According to the documents'.
+                    Focus on the most relevant information that directly addresses the query.
+                    If the query is not answerable with the provided context, respond with 'I don't know'."""
+
+class OpenAIGenerator:
+    """Generate grounded answers with the OpenAI chat completions API
+
+    Requests go through the generation circuit breaker, and their timeout is capped by
+    the time left until the request deadline.
+    """
+
+    def __init__(self, model: str = None, temperature: float = 0.0, timeout: float = None):
+        self.model = model or settings.GENERATION_MODEL
+        self.temperature = temperature
+        self.timeout = settings.GENERATION_TIMEOUT if timeout is None else timeout
+        self.session = requests.Session()
+
+    @staticmethod
+    def build_messages(query: str, contexts: List[Dict[str, Any]], task: str = GROUNDED_TASK) -> List[Dict[str, str]]:
+        """Build the chat messages for a question and its retrieved context objects"""
+        context = "\n\n".join(json.dumps(properties, default=str) for properties in contexts)
+        return [
+            {"role": "system", "content": task.strip()},
+            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"}
+        ]
+
+    def complete(self, query: str, contexts: List[Dict[str, Any]], task: str = GROUNDED_TASK) -> str:
+        """Return the full answer text in one request"""
+        with generation_breaker:
+            response = self.session.post(
+                OPENAI_CHAT_COMPLETIONS_URL,
+                headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"},
+                json={
+                    "model": self.model,
+                    "temperature": self.temperature,
+                    "messages": self.build_messages(query, contexts, task)
+                },
+                timeout=call_timeout(self.timeout, "generation")
+            )
+            response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    def stream(self, query: str, contexts: List[Dict[str, Any]], task: str = GROUNDED_TASK) -> Iterator[str]:
+        """Yield answer text fragments as the model produces them
+
+        The timeout bounds connecting and each read, not the whole stream.
+        """
+        # Only the request and its status count for the breaker; the stream may be abandoned by the client
+        with generation_breaker:
+            response = self.session.post(
+                OPENAI_CHAT_COMPLETIONS_URL,
+                headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"},
+                json={
+                    "model": self.model,
+                    "temperature": self.temperature,
+                    "messages": self.build_messages(query, contexts, task),
+                    "stream": True
+                },
+                stream=True,
+                timeout=call_timeout(self.timeout, "generation")
+            )
+            if not response.ok:
+                response.close()
+                response.raise_for_status()
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                if choices:
+                    fragment = choices[0].get("delta", {}).get("content")
+                    if fragment:
+                        yield fragment
+
+# Global instance
+generator = OpenAIGenerator()
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import re
+from typing import List, Dict, Any, Tuple
+from db.weaviate_client import weaviate_client
+from services.metrics import time_stage
+from services.neo4j_service import Neo4jService
+from services.resilience import BackendUnavailable, with_deadline
+from services.retrieval import backend
+from services.weaviate_service import WeaviateService
+from models.schema import GraphSearchRequest, GraphSearchResponse, Neo4jQueryRequest
+from app.config import settings
+
+# Characters with a meaning in Lucene query syntax, escaped so user text is searched literally
+LUCENE_SPECIAL_PATTERN = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+
+# Full-text match on chunk content, then the matched chunk's document and its neighbouring chunks of the same field
+GRAPH_EXPANSION_QUERY = """
+CALL db.index.fulltext.queryNodes($index, $query, {limit: $limit}) YIELD node, score
+MATCH (d:Document)-[:HAS_CHUNK]->(node)
+OPTIONAL MATCH (d)-[:HAS_CHUNK]->(sibling:Chunk)
+WHERE sibling <> node
+  AND sibling.field_name = node.field_name
+  AND abs(sibling.chunk_index - node.chunk_index) <= $window
+WITH node, score, d, sibling
+ORDER BY score DESC, sibling.chunk_index
+RETURN properties(node) AS chunk, score, d.id AS document_id, d.source_file AS source_file,
+       d.record_index AS record_index, [s IN collect(sibling) | properties(s)] AS siblings
+ORDER BY score DESC
+"""
+
+class GraphService:
+
+    @staticmethod
+    def fusion_key(properties: Dict[str, Any]) -> str:
+        """Identify a chunk across stores
+
+        Both JSON importers split a record's long fields the same way, so a chunk is named by
+        its source file, record, field and chunk position; Weaviate joins nested field names
+        with "." where Neo4j uses "_". Chunks without a position fall back to a hash of their
+        whitespace-normalized text.
+        """
+        chunk_index = properties.get("chunk_index", properties.get("sub_chunk_index"))
+        position = (
+            properties.get("source_file"), properties.get("record_index"), properties.get("field_name"), chunk_index
+        )
+        if None not in position:
+            source_file, record_index, field_name, chunk_index = position
+            return f"chunk:{source_file}:{record_index}:{str(field_name).replace('.', '_')}:{chunk_index}"
+        text = properties.get("field_content") or properties.get("content") or ""
+        return "text:" + hashlib.sha1(" ".join(str(text).split()).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _vector_candidates(query: str, limit: int) -> List[Dict[str, Any]]:
+        """Nearest chunks from the retrieval backend"""
+        query_vector = WeaviateService.embed_query(query)
+        with time_stage("retrieval"):
+            return backend.search(query, query_vector, limit)
+
+    @staticmethod
+    async def _graph_candidates(query: str, limit: int, window: int) -> List[Dict[str, Any]]:
+        """Full-text chunk matches in Neo4j followed by their sibling chunks, in rank order"""
+        response = await Neo4jService.execute_query(Neo4jQueryRequest(
+            query=GRAPH_EXPANSION_QUERY,
+            parameters={
+                "index": settings.GRAPH_FULLTEXT_INDEX,
+                "query": LUCENE_SPECIAL_PATTERN.sub(r"\\\1", query),
+                "limit": limit,
+                "window": window,
+            },
+            read_only=True
+        ))
+        if not response.success:
+            raise RuntimeError(response.message)
+
+        matches = []
+        expansions = []
+        for record in response.results:
+            context = {
+                "document_id": record["document_id"],
+                "source_file": record["source_file"],
+                "record_index": record["record_index"],
+            }
+            matches.append({
+                "id": record["chunk"].get("id"),
+                "properties": {**record["chunk"], **context},
+                "score": record["score"],
+            })
+            for sibling in record["siblings"]:
+                expansions.append({
+                    "id": sibling.get("id"),
+                    "properties": {**sibling, **context},
+                    "score": None,
+                })
+        return matches + expansions
+
+    @staticmethod
+    def reciprocal_rank_fusion(ranked_lists: Dict[str, List[Dict[str, Any]]], k: int) -> List[Dict[str, Any]]:
+        """Merge ranked lists by summing 1 / (k + rank) per chunk, keyed by its fusion_key"""
+        fused: Dict[str, Dict[str, Any]] = {}
+        for source, hits in ranked_lists.items():
+            seen = set()
+            for rank, hit in enumerate(hits, start=1):
+                key = GraphService.fusion_key(hit["properties"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                entry = fused.get(key)
+                if entry is None:
+                    entry = fused[key] = {"id": hit["id"], "properties": hit["properties"], "score": 0.0, "ranks": {}}
+                entry["score"] += 1.0 / (k + rank)
+                entry["ranks"][source] = rank
+        return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+
+    @staticmethod
+    async def graph_search(graph_request: GraphSearchRequest) -> GraphSearchResponse:
+        """Query the vector store and Neo4j concurrently and fuse both rankings with RRF"""
+        limit = graph_request.limit or settings.GRAPH_SEARCH_LIMIT
+        candidates = max(limit, settings.GRAPH_SEARCH_CANDIDATES)
+        window = settings.GRAPH_SIBLING_WINDOW if graph_request.sibling_window is None else graph_request.sibling_window
+
+        vector_hits, graph_hits = await asyncio.gather(
+            with_deadline(
+                weaviate_client.run_in_executor(GraphService._vector_candidates, graph_request.query, candidates),
+                "retrieval"
+            ),
+            GraphService._graph_candidates(graph_request.query, candidates, window),
+            return_exceptions=True
+        )
+
+        ranked_lists: Dict[str, List[Dict[str, Any]]] = {}
+        errors: List[Tuple[str, Exception]] = []
+        for source, hits in (("weaviate", vector_hits), ("neo4j", graph_hits)):
+            if isinstance(hits, Exception):
+                errors.append((source, hits))
+            else:
+                ranked_lists[source] = hits
+
+        if not ranked_lists:
+            # Every source was refused or out of time: answer with 503/504 rather than a generic error
+            unavailable = [error for _, error in errors if isinstance(error, BackendUnavailable)]
+            if len(unavailable) == len(errors):
+                raise unavailable[0]
+            return GraphSearchResponse(
+                success=False,
+                results=[],
+                count=0,
+                sources={},
+                message="Error performing graph search: " + "; ".join(f"{source}: {error}" for source, error in errors)
+            )
+
+        results = GraphService.reciprocal_rank_fusion(ranked_lists, settings.GRAPH_RRF_K)[:limit]
+        message = f"Found {len(results)} fused results for query: '{graph_request.query}'"
+        if errors:
+            message += " (partial: " + "; ".join(f"{source} failed: {error}" for source, error in errors) + ")"
+        return GraphSearchResponse(
+            success=True,
+            results=results,
+            count=len(results),
+            sources={source: len(hits) for source, hits in ranked_lists.items()},
+            message=message
+        )
@@ -0,0 +1,252 @@
+import abc
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+from app.config import settings
+
+# Route template of the request being handled, set by the metrics middleware so stage timings can be split per route
+current_route = contextvars.ContextVar("current_route", default="")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Metric(abc.ABC):
+    """Base class for a labelled metric family in the Prometheus text format"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(name suffix, formatted labels, value) for every series"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(Metric):
+    """Monotonically increasing count per label set"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [("", _format_labels(self.labelnames, key), value) for key, value in self._values.items()]
+
+class Gauge(Metric):
+    """Value that can go up and down, or be read from a callback at scrape time"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        """Read the value from function() whenever metrics are rendered"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        function = self._functions.get(key)
+        return float(function()) if function else self._values.get(key, 0.0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            values[key] = float(function())
+        return [("", _format_labels(self.labelnames, key), value) for key, value in values.items()]
+
+class Histogram(Metric):
+    """Cumulative-bucket latency histogram per label set"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket (non-cumulative) counts with a final +Inf slot, then sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, including when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            series = {key: (list(counts), total[0]) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                samples.append(("_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+# Global instance
+registry = MetricsRegistry()
+
+request_latency = registry.histogram(
+    "rag_http_request_duration_seconds", "HTTP request latency until the last body chunk is sent",
+    ("method", "route", "status")
+)
+requests_in_flight = registry.gauge("rag_http_requests_in_flight", "HTTP requests currently being handled", ("route",))
+request_errors = registry.counter(
+    "rag_http_request_errors_total", "HTTP requests that failed with a 5xx status or an unhandled exception",
+    ("route", "status")
+)
+stage_latency = registry.histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each stage of request handling (embedding, retrieval, rerank, context, generation, neo4j_*, serialization)",
+    ("route", "stage")
+)
+cache_requests = registry.counter("rag_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+coalesced_requests = registry.counter(
+    "rag_coalesced_requests_total", "Requests served by joining an identical in-flight execution", ("group",)
+)
+admission_active = registry.gauge("rag_admission_active", "Requests admitted and running per limit class", ("limit",))
+admission_queued = registry.gauge("rag_admission_queued", "Requests waiting for admission per limit class", ("limit",))
+admission_rejected = registry.counter(
+    "rag_admission_rejected_total", "Requests shed with 503 per limit class and reason", ("limit", "reason")
+)
+requests_cancelled = registry.counter(
+    "rag_requests_cancelled_total", "Requests cancelled because the client disconnected first", ("route",)
+)
+circuit_state = registry.gauge(
+    "rag_circuit_state", "Circuit breaker state per backend: 0 closed, 1 half-open, 2 open", ("backend",)
+)
+circuit_rejected = registry.counter(
+    "rag_circuit_rejected_total", "Backend calls refused because the backend's circuit was open", ("backend",)
+)
+degraded_answers = registry.counter(
+    "rag_generate_degraded_total", "Generate requests answered with retrieval results only", ("reason",)
+)
+prompt_tokens = registry.histogram(
+    "rag_generation_prompt_tokens", "Prompt tokens sent per client-side generation request", (),
+    (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+neo4j_sessions_in_use = registry.gauge("rag_neo4j_sessions_in_use", "Neo4j sessions currently open by the API")
+neo4j_pool_max_size = registry.gauge("rag_neo4j_pool_max_size", "Configured maximum Neo4j connection pool size")
+neo4j_pool_max_size.set(settings.NEO4J_MAX_POOL_SIZE)
+
+def time_stage(stage: str):
+    """Context manager that records a stage's duration under the current route"""
+    return stage_latency.time(route=current_route.get(), stage=stage)
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration measured by the caller"""
+    stage_latency.observe(seconds, route=current_route.get(), stage=stage)
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
@@ -1,16 +1,50 @@
-from typing import List, Dict, Any
+import base64
+import hashlib
+import json
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, AsyncIterator, Tuple
+from neo4j import READ_ACCESS, WRITE_ACCESS, Query, unit_of_work
 from db.neo4j_client import neo4j_client
+from services.metrics import neo4j_sessions_in_use, observe_stage, time_stage
+from services.resilience import BackendUnavailable, call_timeout, neo4j_breaker, with_deadline
+from services.singleflight import SingleFlight
 from models.schema import Neo4jQueryRequest, Neo4jQueryResponse, Neo4jHealthResponse
 from app.config import settings
 
+# Clauses that can modify the graph; queries without them or a write procedure are run as read transactions
+WRITE_CLAUSE_PATTERN = re.compile(
+    r"\b(CREATE|MERGE|SET|DELETE|DETACH|REMOVE|DROP|FOREACH|LOAD\s+CSV|IN\s+TRANSACTIONS)\b",
+    re.IGNORECASE
+)
+# Procedure calls; CALL { ... } and CALL (...) { ... } subqueries are not procedures
+PROCEDURE_CALL_PATTERN = re.compile(r"\bCALL\s*(?![\s{(])([^\s(]*)", re.IGNORECASE)
+# Procedures known not to write; any other procedure is treated as a write. Names ending in "." cover a namespace
+READ_PROCEDURES = (
+    "db.labels", "db.relationshiptypes", "db.propertykeys", "db.indexes", "db.constraints", "db.info", "db.ping",
+    "db.schema.visualization", "db.schema.nodetypeproperties", "db.schema.reltypeproperties",
+    "db.index.fulltext.querynodes", "db.index.fulltext.queryrelationships",
+    "db.index.vector.querynodes", "db.index.vector.queryrelationships",
+    "dbms.components", "apoc.meta.", "apoc.path.",
+)
+# String literals and comments are stripped before matching so values like 'Set' do not count
+CYPHER_LITERAL_PATTERN = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|//[^\n]*|/\*.*?\*/", re.DOTALL)
+
+# Pages are cut on the server; the client query runs as a subquery so its own clauses stay untouched
+PAGE_QUERY_TEMPLATE = "CALL {{\n{query}\n}}\nRETURN * SKIP $_page_skip LIMIT $_page_limit"
+
+# In-flight read-only queries, shared by concurrent identical requests
+query_flight = SingleFlight("neo4j_query")
+
 class Neo4jService:
     
     @staticmethod
-    def health_check() -> Dict[str, Any]:
+    async def health_check() -> Dict[str, Any]:
         """Check Neo4j health status"""
         try:
-            client = neo4j_client.get_driver()
-            is_ready = neo4j_client.is_ready()
+            client = neo4j_client.get_async_driver()
+            is_ready = await neo4j_client.is_ready_async()
             return {
                 "status": "healthy" if is_ready else "unhealthy",
                 "neo4j_ready": is_ready,
@@ -24,40 +58,197 @@ class Neo4jService:
             }
     
     @staticmethod
-    def execute_query(query_request: Neo4jQueryRequest) -> Neo4jQueryResponse:
-        """Execute a Cypher query in Neo4j"""
+    def _record_to_dict(record) -> Dict[str, Any]:
+        """Convert a Neo4j record to a dictionary of Python native values"""
+        record_dict = {}
+        for key, value in record.items():
+            # Handle Neo4j types conversion to Python native types
+            if hasattr(value, 'items'):  # If it's a Node or Relationship
+                record_dict[key] = dict(value.items())
+            else:
+                record_dict[key] = value
+        return record_dict
+    
+    @staticmethod
+    def _query_fingerprint(query_request: Neo4jQueryRequest) -> str:
+        """Identify a query and its parameters so cursors cannot be replayed against another query"""
+        payload = json.dumps(
+            {"query": query_request.query, "parameters": query_request.parameters or {}},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    
+    @staticmethod
+    def encode_cursor(query_request: Neo4jQueryRequest, skip: int) -> str:
+        """Encode the position of the next page as an opaque cursor token"""
+        token = json.dumps({"skip": skip, "query": Neo4jService._query_fingerprint(query_request)})
+        return base64.urlsafe_b64encode(token.encode("utf-8")).decode("ascii")
+    
+    @staticmethod
+    def decode_cursor(query_request: Neo4jQueryRequest) -> int:
+        """Return the number of records to skip for the request's cursor"""
+        if not query_request.cursor:
+            return 0
+        try:
+            token = json.loads(base64.urlsafe_b64decode(query_request.cursor.encode("ascii")))
+            skip = int(token["skip"])
+            fingerprint = token["query"]
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if fingerprint != Neo4jService._query_fingerprint(query_request) or skip < 0:
+            raise ValueError("Cursor does not match this query")
+        return skip
+    
+    @staticmethod
+    def is_read_only(query_request: Neo4jQueryRequest) -> bool:
+        """Decide whether a query can run in a read transaction, honouring an explicit read_only flag"""
+        if query_request.read_only is not None:
+            return query_request.read_only
+        query = CYPHER_LITERAL_PATTERN.sub(" ", query_request.query)
+        if WRITE_CLAUSE_PATTERN.search(query):
+            return False
+        return all(
+            Neo4jService._is_read_procedure(name) for name in PROCEDURE_CALL_PATTERN.findall(query)
+        )
+    
+    @staticmethod
+    def _is_read_procedure(name: str) -> bool:
+        name = name.lower()
+        return any(
+            name.startswith(procedure) if procedure.endswith(".") else name == procedure
+            for procedure in READ_PROCEDURES
+        )
+    
+    @staticmethod
+    @asynccontextmanager
+    async def _session(query_request: Neo4jQueryRequest, read_only: bool):
+        """Open an async session with the request's fetch size and access mode, counting open sessions"""
+        neo4j_sessions_in_use.inc()
         try:
-            driver = neo4j_client.get_driver()
+            async with neo4j_client.get_async_driver().session(
+                database=settings.NEO4J_DATABASE,
+                fetch_size=query_request.fetch_size or settings.NEO4J_FETCH_SIZE,
+                default_access_mode=READ_ACCESS if read_only else WRITE_ACCESS
+            ) as session:
+                yield session
+        finally:
+            neo4j_sessions_in_use.dec()
+    
+    @staticmethod
+    def _page_query(query_request: Neo4jQueryRequest, skip: int, page_size: int = None) -> Tuple[str, Dict[str, Any]]:
+        """Query text and parameters for one page, fetching one extra record to tell whether more follow"""
+        parameters = dict(query_request.parameters or {})
+        if page_size is None:
+            return query_request.query, parameters
+        parameters.update({"_page_skip": skip, "_page_limit": page_size + 1})
+        return PAGE_QUERY_TEMPLATE.format(query=query_request.query.strip().rstrip(";")), parameters
+    
+    @staticmethod
+    async def _read_records(result, page_size: int = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Read records from a result, stopping after one page when page_size is given"""
+        records = []
+        has_more = False
+        async for record in result:
+            if page_size is not None and len(records) == page_size:
+                has_more = True
+                break
+            records.append(Neo4jService._record_to_dict(record))
+        return records, has_more
+    
+    @staticmethod
+    async def execute_query(query_request: Neo4jQueryRequest) -> Neo4jQueryResponse:
+        """Execute a Cypher query in Neo4j, returning one page when page_size or cursor is given
+        
+        Pages are cut by the server: the query is wrapped as CALL { <query> } RETURN *
+        SKIP/LIMIT, so it must end in RETURN (procedure calls need YIELD), and only
+        paging read-only queries is allowed. Every page re-runs the query, so it needs
+        an ORDER BY on a unique key for pages not to overlap or skip records.
+        
+        Read-only queries run as managed read transactions, which the driver retries on
+        transient errors and routes to read replicas in a cluster. Concurrent identical
+        read-only queries (same query, parameters and page) share one execution. Other
+        queries run as auto-commit transactions so that e.g. CALL { ... } IN TRANSACTIONS
+        keeps working. Auto-commit runs acquire their connection inside run(), so their
+        neo4j_run stage includes the connection acquisition. Transactions time out on the
+        server after NEO4J_QUERY_TIMEOUT or at the request deadline, whichever is first.
+        """
+        if not Neo4jService.is_read_only(query_request):
+            return await with_deadline(Neo4jService._execute_query(query_request), "neo4j query")
+        return await with_deadline(query_flight.do(
+            (Neo4jService._query_fingerprint(query_request), query_request.cursor, query_request.page_size),
+            lambda: Neo4jService._execute_query(query_request)
+        ), "neo4j query")
+    
+    @staticmethod
+    async def _execute_query(query_request: Neo4jQueryRequest) -> Neo4jQueryResponse:
+        try:
+            paginated = query_request.page_size is not None or query_request.cursor is not None
+            skip = Neo4jService.decode_cursor(query_request)
+            page_size = None
+            if paginated:
+                page_size = min(query_request.page_size or settings.NEO4J_MAX_PAGE_SIZE, settings.NEO4J_MAX_PAGE_SIZE)
+            read_only = Neo4jService.is_read_only(query_request)
+            timeout = call_timeout(settings.NEO4J_QUERY_TIMEOUT, "neo4j query")
+            query, parameters = Neo4jService._page_query(query_request, skip, page_size)
             
-            with driver.session(database=settings.NEO4J_DATABASE) as session:
-                result = session.run(
-                    query_request.query,
-                    parameters=query_request.parameters or {}
-                )
-                
-                # Convert Neo4j records to dictionaries
-                records = []
-                for record in result:
-                    record_dict = {}
-                    for key, value in record.items():
-                        # Handle Neo4j types conversion to Python native types
-                        if hasattr(value, 'items'):  # If it's a Node or Relationship
-                            record_dict[key] = dict(value.items())
-                        else:
-                            record_dict[key] = value
-                    records.append(record_dict)
-                
-                return Neo4jQueryResponse(
-                    success=True,
-                    results=records,
-                    count=len(records),
-                    message=f"Successfully executed query with {len(records)} results"
-                )
-                
+            with neo4j_breaker:
+                async with Neo4jService._session(query_request, read_only) as session:
+                    if read_only:
+                        started = time.perf_counter()
+                        
+                        @unit_of_work(timeout=timeout)
+                        async def work(tx):
+                            # The managed transaction starts once a connection has been acquired
+                            observe_stage("neo4j_acquire", time.perf_counter() - started)
+                            with time_stage("neo4j_run"):
+                                result = await tx.run(query, parameters)
+                            with time_stage("neo4j_consume"):
+                                return await Neo4jService._read_records(result, page_size)
+                        
+                        records, has_more = await session.execute_read(work)
+                    else:
+                        with time_stage("neo4j_run"):
+                            result = await session.run(Query(query, timeout=timeout), parameters=parameters)
+                        with time_stage("neo4j_consume"):
+                            records, has_more = await Neo4jService._read_records(result, page_size)
+            
+            # Records are plain dicts from _record_to_dict; skip validating them again
+            return Neo4jQueryResponse.construct(
+                success=True,
+                results=records,
+                count=len(records),
+                message=f"Successfully executed query with {len(records)} results",
+                next_cursor=Neo4jService.encode_cursor(query_request, skip + len(records)) if has_more else None
+            )
+        
+        except BackendUnavailable:
+            raise
         except Exception as e:
             return Neo4jQueryResponse(
                 success=False,
                 results=[],
                 count=0,
                 message=f"Error executing query: {str(e)}"
-            ) 
\ No newline at end of file
+            )
+    
+    @staticmethod
+    async def stream_query(query_request: Neo4jQueryRequest) -> AsyncIterator[str]:
+        """Execute a Cypher query and yield each record as an NDJSON line while the driver fetches them
+        
+        Streamed records cannot be taken back, so streaming never uses retried managed
+        transactions; read-only queries still open a read session to reach read replicas.
+        """
+        try:
+            timeout = call_timeout(settings.NEO4J_QUERY_TIMEOUT, "neo4j query")
+            with neo4j_breaker:
+                async with Neo4jService._session(query_request, Neo4jService.is_read_only(query_request)) as session:
+                    with time_stage("neo4j_run"):
+                        result = await session.run(
+                            Query(query_request.query, timeout=timeout),
+                            parameters=query_request.parameters or {}
+                        )
+                    async for record in result:
+                        yield json.dumps(Neo4jService._record_to_dict(record), default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Error executing query: {str(e)}"}) + "\n"
@@ -0,0 +1,171 @@
+import abc
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+from app.config import settings
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def hit_text(properties: Dict[str, Any]) -> str:
+    """Text of a retrieved chunk, falling back to all of its string properties"""
+    text = properties.get("field_content") or properties.get("content")
+    if text:
+        return str(text)
+    return " ".join(str(value) for value in properties.values() if isinstance(value, str))
+
+class Scorer(abc.ABC):
+    """Base class for local relevance scorers; subclasses implement score()"""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """Relevance of each text to the query, higher is better"""
+
+class BM25Scorer(Scorer):
+    """Okapi BM25 with document statistics taken from the candidate set itself"""
+
+    name = "bm25"
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not texts:
+            return np.zeros(len(texts), dtype=np.float32)
+        documents = [Counter(tokenize(text)) for text in texts]
+        # Term frequencies as a (documents x query terms) matrix
+        tf = np.array([[document.get(term, 0) for term in terms] for document in documents], dtype=np.float32)
+        lengths = np.array([sum(document.values()) for document in documents], dtype=np.float32)
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log1p((len(texts) - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(float(lengths.mean()), 1.0))
+        return ((tf * (self.k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+class VectorScorer(Scorer):
+    """No text scoring; use with RERANK_VECTOR_WEIGHT=1 to rank by vector similarity alone"""
+
+    name = "vector"
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        return np.zeros(len(texts), dtype=np.float32)
+
+SCORERS: Dict[str, Callable[[], Scorer]] = {
+    "bm25": BM25Scorer,
+    "vector": VectorScorer,
+}
+
+def register_scorer(name: str, factory: Callable[[], Scorer]) -> None:
+    """Make a custom scorer selectable through RERANK_SCORER"""
+    SCORERS[name.lower()] = factory
+
+def get_scorer(name: str = None) -> Scorer:
+    """Build the scorer for a name ("bm25", "vector" or a registered one)"""
+    name = (name or settings.RERANK_SCORER).lower()
+    if name not in SCORERS:
+        raise ValueError(f"Unknown rerank scorer: {name}")
+    return SCORERS[name]()
+
+def _min_max(values: np.ndarray) -> np.ndarray:
+    spread = values.max() - values.min() if values.size else 0
+    if spread <= 0:
+        return np.ones_like(values) if values.size and values.max() > 0 else np.zeros_like(values)
+    return (values - values.min()) / spread
+
+def _reciprocal_rank(count: int, k: int = 60) -> np.ndarray:
+    """1 / (k + rank) for ranks 1..count, as used by reciprocal rank fusion"""
+    return 1.0 / (k + np.arange(1, count + 1, dtype=np.float32))
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def mmr(relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_: float,
+        duplicate_threshold: float = 1.0) -> List[int]:
+    """Greedy maximal marginal relevance over unit vectors; returns the selected row indices in order
+
+    Each step picks the candidate maximizing lambda * relevance - (1 - lambda) * its highest
+    cosine similarity to anything already selected. Candidates at least duplicate_threshold
+    similar to a selected one are dropped, so fewer than k may be returned.
+    """
+    k = min(k, len(relevance))
+    if k <= 0:
+        return []
+    similarity = vectors @ vectors.T
+    max_similarity = np.full(len(relevance), -np.inf, dtype=np.float32)
+    available = np.ones(len(relevance), dtype=bool)
+    selected = []
+    for _ in range(k):
+        redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        gain = np.where(available, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        choice = int(np.argmax(gain))
+        selected.append(choice)
+        available[choice] = False
+        max_similarity = np.maximum(max_similarity, similarity[choice])
+        available &= max_similarity < duplicate_threshold
+        if not available.any():
+            break
+    return selected
+
+class Reranker:
+    """Re-score over-fetched hits with a local scorer and diversify them with MMR
+
+    Relevance blends the min-max normalized scorer output with the cosine similarity
+    between the query vector and each hit's vector, or with the hits' retrieval rank
+    (reciprocal rank, hits arrive best first) when there is no query vector to compare.
+    Near-duplicates of a selected hit are dropped. Hits without vectors are ranked by
+    relevance alone.
+    """
+
+    def __init__(self, scorer: Scorer = None, vector_weight: float = None, lambda_: float = None,
+                 duplicate_threshold: float = None):
+        self.scorer = scorer or get_scorer()
+        self.vector_weight = settings.RERANK_VECTOR_WEIGHT if vector_weight is None else vector_weight
+        self.lambda_ = settings.RERANK_MMR_LAMBDA if lambda_ is None else lambda_
+        self.duplicate_threshold = (
+            settings.RERANK_DUPLICATE_THRESHOLD if duplicate_threshold is None else duplicate_threshold
+        )
+
+    def rerank(self, query: str, query_vector: Optional[Sequence[float]], hits: List[Dict[str, Any]],
+               limit: int) -> List[Dict[str, Any]]:
+        """Return up to limit hits, best first, without their vectors"""
+        if not hits:
+            return []
+        relevance = _min_max(np.asarray(
+            self.scorer.score(query, [hit_text(hit["properties"]) for hit in hits]), dtype=np.float32
+        ))
+
+        vectors = None
+        if all(hit.get("vector") is not None for hit in hits):
+            vectors = _unit_rows(np.asarray([hit["vector"] for hit in hits], dtype=np.float32))
+        if query_vector is not None:
+            query_vector = np.asarray(query_vector, dtype=np.float32)
+        if vectors is not None and query_vector is not None and query_vector.shape[-1] == vectors.shape[1]:
+            retrieval = _min_max(vectors @ _unit_rows(query_vector))
+        else:
+            # Keep the backend's own (hybrid) ranking in play instead of ranking by keywords alone
+            retrieval = _min_max(_reciprocal_rank(len(hits)))
+        if self.vector_weight > 0:
+            relevance = (1 - self.vector_weight) * relevance + self.vector_weight * retrieval
+
+        if vectors is not None:
+            order = mmr(relevance, vectors, limit, self.lambda_, self.duplicate_threshold)
+        else:
+            order = list(np.argsort(-relevance, kind="stable")[:limit])
+
+        selected = []
+        for index in order:
+            hit = {key: value for key, value in hits[index].items() if key != "vector"}
+            hit["rerank_score"] = float(relevance[index])
+            selected.append(hit)
+        return selected
+
+# Global instance
+reranker = Reranker()
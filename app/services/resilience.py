@@ -0,0 +1,191 @@
+import asyncio
+import contextvars
+import functools
+import math
+import threading
+import time
+from typing import Callable, Optional
+from neo4j.exceptions import ClientError
+from services.metrics import circuit_rejected, circuit_state
+from app.config import settings
+
+# Monotonic time by which the current request must be answered, a SharedDeadline, or None without a deadline
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+class SharedDeadline:
+    """Deadline of work shared by several requests: the latest of theirs, or None once one has none"""
+
+    def __init__(self, deadline: Optional[float]):
+        self.value = deadline
+
+    def extend(self, deadline: Optional[float]) -> None:
+        if self.value is not None:
+            self.value = None if deadline is None else max(self.value, deadline)
+
+class BackendUnavailable(Exception):
+    """A backend call was refused or abandoned; status_code is what the API answers with"""
+
+    status_code = 503
+
+class CircuitOpenError(BackendUnavailable):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable, retry in {max(1, math.ceil(retry_after))}s")
+        self.retry_after = retry_after
+
+class DeadlineExceeded(BackendUnavailable):
+    status_code = 504
+
+def current_deadline() -> Optional[float]:
+    """Monotonic time of the current deadline, or None without one"""
+    deadline = request_deadline.get()
+    return deadline.value if isinstance(deadline, SharedDeadline) else deadline
+
+def remaining() -> Optional[float]:
+    """Seconds left until the request deadline, or None without one"""
+    deadline = current_deadline()
+    return None if deadline is None else deadline - time.monotonic()
+
+def check_deadline(stage: str) -> None:
+    """Raise DeadlineExceeded instead of starting a stage the request has no time left for"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded before {stage}")
+
+def call_timeout(configured: float, stage: str = "backend call") -> float:
+    """Timeout for one backend call: its configured timeout, capped by the time left for the request"""
+    check_deadline(stage)
+    left = remaining()
+    return configured if left is None else min(configured, left)
+
+async def with_deadline(awaitable, stage: str = "backend call"):
+    """Await within the request deadline, raising DeadlineExceeded once it passes"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, max(left, 0))
+    except asyncio.TimeoutError:
+        # Only the deadline's own timeout is translated; a backend's timeout surfaces as it is
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded(f"Request deadline exceeded during {stage}")
+        raise
+
+class LatencyEstimate:
+    """Exponentially weighted moving average of a stage's duration in seconds"""
+
+    def __init__(self, weight: float = 0.2):
+        self.weight = weight
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.value = seconds if self.value == 0.0 else self.value + self.weight * (seconds - self.value)
+
+class CircuitBreaker:
+    """Fail fast while a backend keeps failing, and probe it before trusting it again
+
+    After failure_threshold consecutive failures the circuit opens and calls raise
+    CircuitOpenError without reaching the backend. Once recovery_timeout has passed it
+    is half-open: up to half_open_probes calls go through, and the first result closes
+    the circuit again or re-opens it. is_failure decides which exceptions count; errors
+    caused by the request itself, such as invalid queries, should not.
+    Usable as a context manager around sync or async calls and as a decorator.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = None, recovery_timeout: float = None,
+                 half_open_probes: int = None, is_failure: Callable[[BaseException], bool] = None):
+        self.name = name
+        self.failure_threshold = settings.CIRCUIT_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        self.recovery_timeout = settings.CIRCUIT_RECOVERY_TIMEOUT if recovery_timeout is None else recovery_timeout
+        self.half_open_probes = settings.CIRCUIT_HALF_OPEN_PROBES if half_open_probes is None else half_open_probes
+        self.is_failure = is_failure or (lambda error: True)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self._lock = threading.Lock()
+        circuit_state.set_function(
+            lambda: {self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[self.state], backend=name
+        )
+
+    def is_open(self) -> bool:
+        """Whether calls are currently refused without reaching the backend"""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.recovery_timeout
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.OPEN:
+                waited = time.monotonic() - self.opened_at
+                if waited < self.recovery_timeout:
+                    circuit_rejected.inc(backend=self.name)
+                    raise CircuitOpenError(self.name, self.recovery_timeout - waited)
+                self.state = self.HALF_OPEN
+                self.probes = 0
+            if self.state == self.HALF_OPEN:
+                if self.probes >= self.half_open_probes:
+                    circuit_rejected.inc(backend=self.name)
+                    raise CircuitOpenError(self.name, self.recovery_timeout)
+                self.probes += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def _release_probe(self) -> None:
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def __enter__(self):
+        self.before_call()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is None:
+            self.record_success()
+        elif isinstance(exc, Exception) and not isinstance(exc, BackendUnavailable) and self.is_failure(exc):
+            self.record_failure()
+        else:
+            # Cancelled, abandoned at the deadline or the caller's own error: says nothing about the backend
+            self._release_probe()
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+def _is_neo4j_failure(error: BaseException) -> bool:
+    """Client errors (syntax, constraints, parameters) are the query's fault, except timeouts"""
+    if isinstance(error, ClientError):
+        return "TimedOut" in (error.code or "")
+    return True
+
+def _is_http_failure(error: BaseException) -> bool:
+    """HTTP 4xx answers other than rate limiting are the request's fault"""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is None or status >= 500 or status == 429
+
+# Global instances
+weaviate_breaker = CircuitBreaker("weaviate", is_failure=lambda error: not isinstance(error, (ValueError, TypeError)))
+neo4j_breaker = CircuitBreaker("neo4j", is_failure=_is_neo4j_failure)
+generation_breaker = CircuitBreaker("generation", is_failure=_is_http_failure)
+embedding_breaker = CircuitBreaker("embedding", is_failure=_is_http_failure)
@@ -0,0 +1,252 @@
+import abc
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from db.weaviate_client import weaviate_client
+from services.generation import generator, GROUNDED_TASK
+from services.resilience import weaviate_breaker
+from services.serialization import SearchHit
+from services.vector_index import VectorIndex, autocut
+from app.config import settings
+
+# Metadata filters as {property: [accepted values]}; values of one property are ORed, properties ANDed
+Filters = Optional[Dict[str, List[Any]]]
+
+def project(properties: Dict[str, Any], names: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep only the named properties; None keeps all of them"""
+    if names is None:
+        return properties
+    return {name: properties[name] for name in names if name in properties}
+
+class RetrievalBackend(abc.ABC):
+    """Store that WeaviateService retrieves chunks from; hits are {"id", "properties", "score"} dicts
+
+    auto_limit cuts results after that many jumps in score (Weaviate's autocut), and
+    return_properties limits the properties returned per hit (None returns all).
+    """
+
+    name = "base"
+    display_name = "Retrieval backend"
+
+    @abc.abstractmethod
+    def is_ready(self) -> bool:
+        """Whether the store can serve queries"""
+
+    @abc.abstractmethod
+    def search(self, query: str, vector: Optional[Sequence[float]], limit: int, offset: int = 0,
+               filters: Filters = None, auto_limit: Optional[int] = None,
+               return_properties: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Nearest chunks to the query vector, or to the query text when vector is None"""
+
+    @abc.abstractmethod
+    def fetch(self, ids: List[str], return_properties: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Objects by ID as {"id", "properties"} dicts, skipping unknown IDs"""
+
+    @abc.abstractmethod
+    def hybrid(self, query: str, vector: Optional[Sequence[float]], limit: int, alpha: float = 0.5,
+               filters: Filters = None, auto_limit: Optional[int] = None,
+               include_vector: bool = False) -> List[Dict[str, Any]]:
+        """Retrieval used as context for generation; include_vector adds each hit's "vector" """
+
+    def generate(self, query: str, vector: Optional[Sequence[float]], limit: int, filters: Filters = None,
+                 auto_limit: Optional[int] = None, task: str = GROUNDED_TASK) -> Tuple[List[Dict[str, Any]], str]:
+        """Retrieve context and generate an answer from it; returns (sources, generated text)"""
+        sources = self.hybrid(query, vector, limit, filters=filters, auto_limit=auto_limit)
+        return sources, generator.complete(query, [source["properties"] for source in sources], task)
+
+class WeaviateBackend(RetrievalBackend):
+    """Retrieval and server-side generation against the remote Weaviate collection
+
+    The Weaviate client library is imported on use, so the local backend runs without it.
+    """
+
+    name = "weaviate"
+    display_name = "Weaviate"
+
+    @staticmethod
+    def _collection():
+        return weaviate_client.get_client().collections.get(settings.COLLECTION_NAME)
+
+    @staticmethod
+    def _filter(filters: Filters):
+        """Build a server-side Weaviate filter from metadata filters
+
+        equal() compares whole values only on properties indexed with field tokenization,
+        as the ingestion scripts create them; on word-tokenized ones it matches any word.
+        """
+        if not filters:
+            return None
+        from weaviate.classes.query import Filter
+        conditions = []
+        for name, values in filters.items():
+            matches = [Filter.by_property(name).equal(value) for value in values]
+            conditions.append(matches[0] if len(matches) == 1 else Filter.any_of(matches))
+        return conditions[0] if len(conditions) == 1 else Filter.all_of(conditions)
+
+    @staticmethod
+    def _object_vector(obj):
+        """The object's default vector; v4 clients return named vectors as a dict"""
+        vector = obj.vector
+        if isinstance(vector, dict):
+            vector = vector.get("default") or next(iter(vector.values()), None)
+        return vector
+
+    @staticmethod
+    def _to_hits(objects) -> List[SearchHit]:
+        return [SearchHit(str(obj.uuid), obj.properties, getattr(obj.metadata, 'distance', None)) for obj in objects]
+
+    def is_ready(self) -> bool:
+        return weaviate_client.get_client().is_ready()
+
+    @weaviate_breaker
+    def search(self, query: str, vector: Optional[Sequence[float]], limit: int, offset: int = 0,
+               filters: Filters = None, auto_limit: Optional[int] = None,
+               return_properties: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        from weaviate.classes.query import MetadataQuery
+        collection = self._collection()
+        options = {
+            "limit": limit,
+            "offset": offset or None,
+            "auto_limit": auto_limit,
+            "filters": self._filter(filters),
+            "return_properties": return_properties,
+            "return_metadata": MetadataQuery(distance=True),
+        }
+        if vector is not None:
+            response = collection.query.near_vector(near_vector=vector, **options)
+        else:
+            response = collection.query.near_text(query=query, **options)
+        return self._to_hits(response.objects)
+
+    @weaviate_breaker
+    def fetch(self, ids: List[str], return_properties: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        # Weaviate rejects malformed UUIDs in filters; they cannot match an object anyway
+        valid = []
+        for object_id in ids:
+            try:
+                valid.append(str(uuid.UUID(object_id)))
+            except ValueError:
+                continue
+        if not valid:
+            return []
+        from weaviate.classes.query import Filter
+        response = self._collection().query.fetch_objects(
+            filters=Filter.by_id().contains_any(valid),
+            limit=len(valid),
+            return_properties=return_properties
+        )
+        return [{"id": str(obj.uuid), "properties": obj.properties} for obj in response.objects]
+
+    @weaviate_breaker
+    def hybrid(self, query: str, vector: Optional[Sequence[float]], limit: int, alpha: float = 0.5,
+               filters: Filters = None, auto_limit: Optional[int] = None,
+               include_vector: bool = False) -> List[Dict[str, Any]]:
+        response = self._collection().query.hybrid(
+            query=query,
+            vector=vector,
+            limit=limit,
+            alpha=alpha,
+            auto_limit=auto_limit,
+            filters=self._filter(filters),
+            include_vector=include_vector
+        )
+        hits = []
+        for obj in response.objects:
+            hit = {"id": str(obj.uuid), "properties": obj.properties}
+            if include_vector:
+                hit["vector"] = self._object_vector(obj)
+            hits.append(hit)
+        return hits
+
+    @weaviate_breaker
+    def generate(self, query: str, vector: Optional[Sequence[float]], limit: int, filters: Filters = None,
+                 auto_limit: Optional[int] = None, task: str = GROUNDED_TASK) -> Tuple[List[Dict[str, Any]], str]:
+        from weaviate.classes.generate import GenerativeConfig
+        response = self._collection().generate.hybrid(
+            query=query,
+            vector=vector,
+            limit=limit,
+            auto_limit=auto_limit,
+            filters=self._filter(filters),
+            grouped_task=task,
+            generative_provider=GenerativeConfig.openai(model=settings.GENERATION_MODEL, temperature=0.0),
+            alpha=0.5
+        )
+        sources = [{"id": str(obj.uuid), "properties": obj.properties} for obj in response.objects]
+        return sources, response.generated
+
+class LocalBackend(RetrievalBackend):
+    """Retrieval from an in-process VectorIndex loaded from LOCAL_INDEX_PATH
+
+    Queries must be embedded client-side with the model the index was built with.
+    There is no keyword index, so hybrid() ranks by vector similarity alone, and
+    answers are generated client-side from the retrieved chunks.
+    """
+
+    name = "local"
+    display_name = "Local index"
+
+    def __init__(self, path: str = None, index: VectorIndex = None):
+        self.path = path or settings.LOCAL_INDEX_PATH
+        self.index = index
+        self._lock = threading.Lock()
+
+    def load(self) -> VectorIndex:
+        """Load the index from disk, building IVF partitions when configured"""
+        with self._lock:
+            if self.index is None:
+                index = VectorIndex.load(self.path) if os.path.exists(self.path) else VectorIndex()
+                if settings.LOCAL_INDEX_IVF_LISTS > 0 and len(index) >= settings.LOCAL_INDEX_IVF_MIN_SIZE:
+                    index.build_ivf(settings.LOCAL_INDEX_IVF_LISTS)
+                self.index = index
+            return self.index
+
+    def get_index(self) -> VectorIndex:
+        return self.index if self.index is not None else self.load()
+
+    def is_ready(self) -> bool:
+        return len(self.get_index()) > 0
+
+    def search(self, query: str, vector: Optional[Sequence[float]], limit: int, offset: int = 0,
+               filters: Filters = None, auto_limit: Optional[int] = None,
+               return_properties: Optional[List[str]] = None,
+               include_vector: bool = False) -> List[Dict[str, Any]]:
+        if vector is None:
+            raise ValueError("The local retrieval backend needs a query vector; enable CLIENT_QUERY_EMBEDDING")
+        hits = self.get_index().search(
+            vector, limit,
+            filters=filters,
+            offset=offset,
+            nprobe=settings.LOCAL_INDEX_NPROBE,
+            include_vector=include_vector
+        )
+        if auto_limit:
+            hits = hits[:autocut([hit["score"] for hit in hits], auto_limit)]
+        return [
+            SearchHit(hit["id"], project(hit["properties"], return_properties), hit["score"], hit.get("vector"))
+            for hit in hits
+        ]
+
+    def fetch(self, ids: List[str], return_properties: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return [
+            {"id": obj["id"], "properties": project(obj["properties"], return_properties)}
+            for obj in self.get_index().get(ids)
+        ]
+
+    def hybrid(self, query: str, vector: Optional[Sequence[float]], limit: int, alpha: float = 0.5,
+               filters: Filters = None, auto_limit: Optional[int] = None,
+               include_vector: bool = False) -> List[Dict[str, Any]]:
+        return self.search(query, vector, limit, filters=filters, auto_limit=auto_limit, include_vector=include_vector)
+
+def get_backend(name: str = None) -> RetrievalBackend:
+    """Build the retrieval backend for a name ("weaviate" or "local")"""
+    name = (name or settings.RETRIEVAL_BACKEND).lower()
+    if name == "weaviate":
+        return WeaviateBackend()
+    if name == "local":
+        return LocalBackend()
+    raise ValueError(f"Unknown retrieval backend: {name}")
+
+# Global instance
+backend = get_backend()
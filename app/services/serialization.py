@@ -0,0 +1,87 @@
+import functools
+import json
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+import numpy as np
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class SearchHit(Mapping):
+    """Compact retrieval hit; reads like the {"id", "properties", "score"} dicts it replaces
+
+    "vector" is only present when the hit was fetched with its vector.
+    """
+
+    __slots__ = ("id", "properties", "score", "vector")
+
+    def __init__(self, id: str, properties: Dict[str, Any], score: Optional[float] = None, vector=None):
+        self.id = id
+        self.properties = properties
+        self.score = score
+        self.vector = vector
+
+    def keys(self):
+        return ("id", "properties", "score", "vector") if self.vector is not None else ("id", "properties", "score")
+
+    def __getitem__(self, key: str):
+        if key in self.keys():
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __repr__(self) -> str:
+        return f"SearchHit(id={self.id!r}, score={self.score!r})"
+
+def _default(value):
+    """Encode what the JSON encoder does not know natively; unknown driver types fall back to str()"""
+    if isinstance(value, BaseModel):
+        # Field values as stored, without the deep copy that .dict() makes
+        return value.__dict__
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON with orjson when installed, otherwise the standard library encoder"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """JSON response encoded directly from internal results, without pydantic or jsonable_encoder"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def fast_json_endpoint(endpoint):
+    """Wrap an async endpoint so its return value is sent as a FastJSONResponse
+
+    FastAPI returns Response objects as they are, so the route's response_model is
+    neither validated nor run through jsonable_encoder. Services build their responses
+    from already-typed internal results, which is what makes skipping that safe.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        if isinstance(result, Response):
+            return result
+        return FastJSONResponse(result)
+    return wrapper
@@ -0,0 +1,57 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from services.metrics import coalesced_requests
+from services.resilience import SharedDeadline, current_deadline, request_deadline
+from app.config import settings
+
+class SingleFlight:
+    """Share one in-flight execution among concurrent callers with the same key
+
+    The first caller for a key starts the work as a task; callers arriving while it
+    runs await the same task and receive its result or exception. Completed results
+    are not kept, which is what the caches are for. Each caller awaits the task through
+    asyncio.shield, so one caller being cancelled (e.g. its client disconnected) does
+    not cancel the others' work; the work is cancelled once no caller is left.
+    The work runs to the latest deadline among its callers rather than the first
+    caller's, so a caller with little time left cannot cut it short for the others;
+    each caller still bounds its own wait with its own deadline.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # key -> [task, number of callers awaiting it, deadline shared by them]
+        self._calls: Dict[Hashable, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        if not settings.COALESCE_ENABLED:
+            return await work()
+        call = self._calls.get(key)
+        if call is not None:
+            coalesced_requests.inc(group=self.name)
+            call[2].extend(current_deadline())
+        else:
+            deadline = SharedDeadline(current_deadline())
+            context = contextvars.copy_context()
+            context.run(request_deadline.set, deadline)
+            call = self._calls[key] = [context.run(lambda: asyncio.ensure_future(work())), 0, deadline]
+
+            def forget(task):
+                if key in self._calls and self._calls[key][0] is task:
+                    del self._calls[key]
+
+            call[0].add_done_callback(forget)
+
+        task = call[0]
+        call[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if call[1] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            call[1] -= 1
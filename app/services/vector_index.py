@@ -0,0 +1,275 @@
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+def autocut(distances: Sequence[float], jumps: int) -> int:
+    """Number of results to keep when cutting after `jumps` jumps in ascending distances
+
+    Mirrors Weaviate's autocut: distances are normalized to [0, 1] and compared with
+    the straight line from first to last; each local maximum of the gap between the
+    line and the curve counts as a jump.
+    """
+    count = len(distances)
+    if count <= 2 or jumps <= 0:
+        return count
+    values = np.asarray(distances, dtype=np.float64)
+    spread = values[-1] - values[0]
+    if spread <= 0:
+        return count
+    gap = np.linspace(0.0, 1.0, count) - (values - values[0]) / spread
+    found = 0
+    for i in range(1, count - 1):
+        if gap[i] > gap[i - 1] and gap[i] >= gap[i + 1]:
+            found += 1
+            if found >= jumps:
+                return i + 1
+    return count
+
+class VectorIndex:
+    """In-process cosine vector index over a contiguous float32 matrix
+
+    Vectors are L2-normalized on insert so a query is one matrix-vector product
+    followed by an argpartition top-k. Metadata filters are evaluated as boolean
+    masks over cached per-property columns. For larger sets an optional IVF
+    partitioning (spherical k-means) restricts scoring to the rows of the
+    `nprobe` closest centroids. Distances follow Weaviate's cosine distance,
+    1 - cosine similarity.
+    """
+
+    def __init__(self, dimensions: Optional[int] = None):
+        self.dimensions = dimensions
+        self._matrix = np.zeros((0, dimensions or 0), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._properties: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """The live rows of the vector matrix"""
+        return self._matrix[:self._size]
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the matrix geometrically so appends stay amortized O(1)"""
+        if rows <= self._matrix.shape[0]:
+            return
+        capacity = max(rows, 2 * self._matrix.shape[0], 64)
+        matrix = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+
+    def _invalidate_derived(self) -> None:
+        self._columns = {}
+        self._lists = None
+
+    def add(self, ids: Sequence[str], vectors: Sequence[Sequence[float]],
+            properties: Optional[Sequence[Dict[str, Any]]] = None) -> None:
+        """Insert or replace objects by ID"""
+        if len(ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(ids):
+            raise ValueError("Expected one vector per ID")
+        if self.dimensions is None:
+            self.dimensions = vectors.shape[1]
+            self._matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+        if vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Expected vectors of dimension {self.dimensions}, got {vectors.shape[1]}")
+        vectors = self._normalize(vectors)
+        properties = properties or [{} for _ in ids]
+
+        with self._lock:
+            self._reserve(self._size + len(ids))
+            written = []
+            for object_id, vector, props in zip(ids, vectors, properties):
+                object_id = str(object_id)
+                row = self._rows.get(object_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._rows[object_id] = row
+                    self._ids.append(object_id)
+                    self._properties.append(dict(props))
+                else:
+                    self._properties[row] = dict(props)
+                self._matrix[row] = vector
+                written.append(row)
+            if self._centroids is not None:
+                # New and replaced rows join their nearest existing partition
+                assignments = np.zeros(self._size, dtype=np.int64)
+                assignments[:len(self._assignments)] = self._assignments
+                written = np.asarray(written)
+                assignments[written] = np.argmax(self._matrix[written] @ self._centroids.T, axis=1)
+                self._assignments = assignments
+            self._invalidate_derived()
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove objects by ID, moving the last row into each hole; returns the number removed"""
+        removed = 0
+        with self._lock:
+            for object_id in ids:
+                row = self._rows.pop(str(object_id), None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = self._ids[last]
+                    self._properties[row] = self._properties[last]
+                    self._rows[self._ids[row]] = row
+                    if self._assignments is not None:
+                        self._assignments[row] = self._assignments[last]
+                self._ids.pop()
+                self._properties.pop()
+                self._size -= 1
+                removed += 1
+            if removed:
+                if self._assignments is not None:
+                    self._assignments = self._assignments[:self._size]
+                self._invalidate_derived()
+        return removed
+
+    def get(self, ids: Iterable[str], include_vector: bool = False) -> List[Dict[str, Any]]:
+        """Return stored objects by ID, skipping unknown IDs"""
+        objects = []
+        with self._lock:
+            for object_id in ids:
+                row = self._rows.get(str(object_id))
+                if row is None:
+                    continue
+                obj = {"id": self._ids[row], "properties": self._properties[row]}
+                if include_vector:
+                    obj["vector"] = self._matrix[row].tolist()
+                objects.append(obj)
+        return objects
+
+    def _column(self, name: str) -> np.ndarray:
+        column = self._columns.get(name)
+        if column is None:
+            column = np.empty(self._size, dtype=object)
+            column[:] = [props.get(name) for props in self._properties]
+            self._columns[name] = column
+        return column
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Boolean mask of rows whose properties equal each filter value (a list means any of)"""
+        if not filters:
+            return None
+        mask = np.ones(self._size, dtype=bool)
+        for name, value in filters.items():
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            column = self._column(name)
+            mask &= np.fromiter((item in values for item in column), dtype=bool, count=self._size)
+        return mask
+
+    def build_ivf(self, n_lists: int, iterations: int = 10, seed: int = 0) -> None:
+        """Partition the vectors into n_lists clusters with spherical k-means"""
+        with self._lock:
+            vectors = self.matrix
+            if self._size == 0:
+                return
+            n_lists = max(1, min(n_lists, self._size))
+            rng = np.random.default_rng(seed)
+            centroids = vectors[rng.choice(self._size, size=n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                assignments = np.argmax(vectors @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignments, vectors)
+                empty = np.bincount(assignments, minlength=n_lists) == 0
+                sums[empty] = centroids[empty]
+                centroids = self._normalize(sums)
+            self._centroids = centroids
+            self._assignments = np.argmax(vectors @ centroids.T, axis=1)
+            self._lists = None
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows grouped by partition, with each partition's start offset"""
+        if self._lists is None:
+            order = np.argsort(self._assignments, kind="stable")
+            counts = np.bincount(self._assignments, minlength=len(self._centroids))
+            self._lists = (order, np.concatenate(([0], np.cumsum(counts))))
+        return self._lists
+
+    def search(self, vector: Sequence[float], limit: int, filters: Optional[Dict[str, Any]] = None,
+               offset: int = 0, nprobe: Optional[int] = None, include_vector: bool = False) -> List[Dict[str, Any]]:
+        """Return the nearest objects as {"id", "properties", "score"} with cosine distance as score"""
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            if self._size == 0 or limit <= 0:
+                return []
+            candidates = None
+            if self._centroids is not None and nprobe:
+                order, offsets = self._inverted_lists()
+                probes = np.argsort(-(self._centroids @ query))[:nprobe]
+                candidates = np.concatenate([order[offsets[p]:offsets[p + 1]] for p in probes])
+            mask = self.filter_mask(filters)
+            if mask is not None:
+                candidates = np.flatnonzero(mask) if candidates is None else candidates[mask[candidates]]
+            if candidates is None:
+                similarities = self.matrix @ query
+                rows = np.arange(self._size)
+            else:
+                similarities = self._matrix[candidates] @ query
+                rows = candidates
+
+            k = min(offset + limit, similarities.shape[0])
+            if k <= 0:
+                return []
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top], kind="stable")][offset:]
+
+            results = []
+            for index in top:
+                row = int(rows[index])
+                hit = {
+                    "id": self._ids[row],
+                    "properties": self._properties[row],
+                    "score": float(1.0 - similarities[index])
+                }
+                if include_vector:
+                    hit["vector"] = self._matrix[row].tolist()
+                results.append(hit)
+            return results
+
+    def save(self, path: str) -> None:
+        """Persist vectors, IDs and properties to a single .npz file"""
+        with self._lock:
+            arrays = {
+                "vectors": self.matrix,
+                "ids": np.asarray(self._ids, dtype=str),
+                "properties": np.asarray(json.dumps(self._properties, default=str)),
+            }
+            if self._centroids is not None:
+                arrays["centroids"] = self._centroids
+                arrays["assignments"] = self._assignments
+            with open(path, "wb") as f:
+                np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        """Load an index written by save(); object arrays are refused, since unpickling them can run code"""
+        with np.load(path, allow_pickle=False) as data:
+            vectors = data["vectors"]
+            index = cls(dimensions=vectors.shape[1] if vectors.ndim == 2 else None)
+            index.add([str(object_id) for object_id in data["ids"]], vectors, json.loads(str(data["properties"])))
+            if "centroids" in data:
+                index._centroids = data["centroids"]
+                index._assignments = data["assignments"]
+        return index
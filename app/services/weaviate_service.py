@@ -1,59 +1,275 @@
+import asyncio
+import base64
+import hashlib
 import json
-from typing import List, Dict, Any
+import logging
+import threading
+import time
+import requests
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from db.weaviate_client import weaviate_client
-from models.schema import SearchRequest, SearchResponse, GenerativeRequest, GenerativeResponse
+from services.cache import TTLCache, SemanticCache, normalize_query
+from services.context import context_builder
+from services.embedding import get_embedder
+from services.generation import generator
+from services.retrieval import backend
+from services.rerank import reranker
+from services.resilience import (
+    BackendUnavailable, DeadlineExceeded, LatencyEstimate, call_timeout, check_deadline, embedding_breaker,
+    generation_breaker, remaining, with_deadline
+)
+from services.singleflight import SingleFlight
+from services.metrics import (
+    cache_requests, degraded_answers, observe_stage, prompt_tokens, record_cache_lookup, time_stage
+)
+from models.schema import (
+    SearchRequest, SearchResponse, GenerativeRequest, GenerativeResponse,
+    BatchSearchRequest, BatchSearchItem, BatchSearchResponse, SearchFilters,
+    ObjectsRequest, ObjectsResponse
+)
 from app.config import settings
-from weaviate.classes.generate import GenerativeConfig
-from weaviate.classes.query import MetadataQuery
+
+logger = logging.getLogger(__name__)
+
+# Query embedder; API calls go through the embedding circuit breaker and end by the request deadline
+embedder = get_embedder(breaker=embedding_breaker, call_timeout=call_timeout)
+
+# Cache of successful semantic search responses, keyed by collection and query parameters
+search_cache = TTLCache(max_size=settings.SEARCH_CACHE_MAX_SIZE, ttl=settings.SEARCH_CACHE_TTL)
+
+# Cache of generated answers, matching repeated and paraphrased questions per collection
+answer_cache = SemanticCache(
+    max_size=settings.GENERATE_CACHE_MAX_SIZE,
+    ttl=settings.GENERATE_CACHE_TTL,
+    threshold=settings.GENERATE_CACHE_SIMILARITY
+)
+
+# In-flight searches and generations, shared by concurrent identical requests
+search_flight = SingleFlight("search")
+generate_flight = SingleFlight("generate")
+
+# Recent generation durations, to tell whether an answer still fits in a request's deadline
+generation_latency = LatencyEstimate()
+
+# Cache of query embeddings, keyed by embedding model and normalized query
+query_embedding_cache = TTLCache(
+    max_size=settings.QUERY_EMBEDDING_CACHE_MAX_SIZE,
+    ttl=settings.QUERY_EMBEDDING_CACHE_TTL
+)
 
 class WeaviateService:
     
     @staticmethod
     def health_check() -> Dict[str, Any]:
-        """Check Weaviate health status"""
+        """Check the retrieval backend's health status"""
         try:
-            client = weaviate_client.get_client()
-            is_ready = client.is_ready()
+            is_ready = backend.is_ready()
             return {
                 "status": "healthy" if is_ready else "unhealthy",
                 "weaviate_ready": is_ready,
-                "message": "Weaviate is ready" if is_ready else "Weaviate is not ready"
+                "message": f"{backend.display_name} is ready" if is_ready else f"{backend.display_name} is not ready"
             }
         except Exception as e:
             return {
                 "status": "error",
                 "weaviate_ready": False,
-                "message": f"Error connecting to Weaviate: {str(e)}"
+                "message": f"Error connecting to {backend.display_name}: {str(e)}"
             }
     
+    @staticmethod
+    async def health_check_async() -> Dict[str, Any]:
+        """Check Weaviate health status without blocking the event loop"""
+        return await weaviate_client.run_in_executor(WeaviateService.health_check)
+    
+    @staticmethod
+    def _filters(filters: Optional[SearchFilters]) -> Dict[str, List[str]]:
+        """Metadata filters as {property: [accepted values]}, without unset properties"""
+        if filters is None:
+            return {}
+        return {
+            name: [value] if isinstance(value, str) else list(value)
+            for name, value in filters.dict().items()
+            if value is not None
+        }
+    
+    @staticmethod
+    def _filters_key(filters: Optional[SearchFilters]) -> tuple:
+        """Hashable, order-independent form of the filters for cache keys"""
+        return tuple(sorted(
+            (name, tuple(sorted(values))) for name, values in WeaviateService._filters(filters).items()
+        ))
+    
+    @staticmethod
+    def _generation_scope(gen_request: GenerativeRequest) -> tuple:
+        """Answer cache scope: answers are only reused for the same retrieval options"""
+        return (
+            gen_request.limit or int(settings.LIMIT),
+            gen_request.auto_limit,
+            WeaviateService._filters_key(gen_request.filters),
+        )
+    
+    @staticmethod
+    def _search_fingerprint(search_request: SearchRequest) -> str:
+        """Identify a query and its filters so cursors cannot be replayed against another search"""
+        payload = json.dumps(
+            {
+                "query": normalize_query(search_request.query),
+                "filters": WeaviateService._filters_key(search_request.filters),
+            },
+            default=str
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    
+    @staticmethod
+    def encode_cursor(search_request: SearchRequest, offset: int) -> str:
+        """Encode the position of the next page as an opaque cursor token"""
+        token = json.dumps({"offset": offset, "search": WeaviateService._search_fingerprint(search_request)})
+        return base64.urlsafe_b64encode(token.encode("utf-8")).decode("ascii")
+    
+    @staticmethod
+    def decode_cursor(search_request: SearchRequest) -> int:
+        """Return the number of results to skip for the request's offset or cursor"""
+        if not search_request.cursor:
+            return search_request.offset or 0
+        try:
+            token = json.loads(base64.urlsafe_b64decode(search_request.cursor.encode("ascii")))
+            offset = int(token["offset"])
+            fingerprint = token["search"]
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if fingerprint != WeaviateService._search_fingerprint(search_request) or offset < 0:
+            raise ValueError("Cursor does not match this search")
+        return offset
+    
+    @staticmethod
+    def request_error(request) -> Optional[str]:
+        """Describe what is wrong with a search or generative request's options, or None if they are valid"""
+        if not request.query.strip():
+            return "Query cannot be empty"
+        if request.limit is not None and not 1 <= request.limit <= settings.MAX_LIMIT:
+            return f"limit must be between 1 and {settings.MAX_LIMIT}"
+        if request.auto_limit is not None and request.auto_limit < 1:
+            return "auto_limit must be positive"
+        if isinstance(request, SearchRequest):
+            if request.offset is not None and request.offset < 0:
+                return "offset cannot be negative"
+            if request.offset is not None and request.cursor:
+                return "Use either offset or cursor, not both"
+            if request.metadata_only and request.return_properties is not None:
+                return "Use either metadata_only or return_properties, not both"
+            if request.return_properties is not None and not all(name.strip() for name in request.return_properties):
+                return "return_properties cannot contain empty names"
+            try:
+                WeaviateService.decode_cursor(request)
+            except ValueError as e:
+                return str(e)
+        return None
+    
+    @staticmethod
+    def _search_cache_key(search_request: SearchRequest) -> tuple:
+        """Build the cache key for a semantic search request"""
+        return (
+            settings.COLLECTION_NAME,
+            normalize_query(search_request.query),
+            search_request.limit or int(settings.LIMIT),
+            WeaviateService.decode_cursor(search_request),
+            search_request.auto_limit,
+            WeaviateService._filters_key(search_request.filters),
+            None if search_request.return_properties is None else tuple(search_request.return_properties),
+            search_request.metadata_only,
+        )
+    
+    @staticmethod
+    def invalidate_cache(collection: str = None) -> int:
+        """Drop cached search results and answers, optionally only those for one collection"""
+        if collection is None:
+            removed = search_cache.invalidate()
+        else:
+            removed = search_cache.invalidate(lambda key: key[0] == collection)
+        return removed + answer_cache.invalidate(collection)
+    
+    @staticmethod
+    def embed_queries(queries: List[str]) -> List[List[float]]:
+        """Embed normalized queries, serving repeats from the cache and batching the rest in one call"""
+        keys = [(embedder.model_name, normalize_query(query)) for query in queries]
+        vectors = {key: query_embedding_cache.get(key) for key in set(keys)}
+        missing = [key for key, vector in vectors.items() if vector is None]
+        cache_requests.inc(len(vectors) - len(missing), cache="query_embedding", result="hit")
+        cache_requests.inc(len(missing), cache="query_embedding", result="miss")
+        if missing:
+            with time_stage("embedding"):
+                embedded = embedder.embed([text for _, text in missing])
+            for key, vector in zip(missing, embedded):
+                query_embedding_cache.set(key, vector)
+                vectors[key] = vector
+        return [vectors[key] for key in keys]
+    
+    @staticmethod
+    def embed_query(query: str):
+        """Embed one query for near_vector search; returns None when disabled or embedding fails"""
+        if not settings.CLIENT_QUERY_EMBEDDING:
+            return None
+        try:
+            return WeaviateService.embed_queries([query])[0]
+        except Exception as e:
+            logger.debug("Failed to embed query, falling back to server-side vectorization: %s", e)
+            return None
+    
+    @staticmethod
+    def _embed_for_answer_cache(query: str):
+        """Embed a query for paraphrase matching; returns None when matching is off or embedding fails"""
+        if answer_cache.threshold > 1:
+            return None
+        try:
+            return WeaviateService.embed_queries([query])[0]
+        except Exception as e:
+            logger.debug("Failed to embed query for answer cache: %s", e)
+            return None
+    
     @staticmethod
     def semantic_search(search_request: SearchRequest) -> SearchResponse:
-        """Perform semantic search in Weaviate"""
+        """Perform semantic search against the retrieval backend"""
+        cache_key = WeaviateService._search_cache_key(search_request)
+        cached = search_cache.get(cache_key)
+        record_cache_lookup("search", cached is not None)
+        if cached is not None:
+            return cached
+        
         try:
-            client = weaviate_client.get_client()
-            collection = client.collections.get(settings.COLLECTION_NAME)
+            check_deadline("retrieval")
+            limit = search_request.limit or int(settings.LIMIT)
+            offset = WeaviateService.decode_cursor(search_request)
+            query_vector = WeaviateService.embed_query(search_request.query)
+            with time_stage("retrieval"):
+                results = backend.search(
+                    search_request.query,
+                    query_vector,
+                    limit,
+                    offset=offset,
+                    filters=WeaviateService._filters(search_request.filters),
+                    auto_limit=search_request.auto_limit,
+                    return_properties=[] if search_request.metadata_only else search_request.return_properties
+                )
+            if search_request.metadata_only:
+                results = [{"id": hit["id"], "score": hit.get("score")} for hit in results]
             
-            response = collection.query.near_text(
-                query=search_request.query,
-                limit=int(settings.LIMIT),
-            )
-            
-            results = []
-            for obj in response.objects:
-                result = {
-                    "id": str(obj.uuid),
-                    "properties": obj.properties,
-                    "score": getattr(obj.metadata, 'distance', None)
-                }
-                results.append(result)
-            
-            return SearchResponse(
+            # A full page may have more after it; autocut pages end where relevance drops off
+            next_cursor = None
+            if len(results) == limit and not search_request.auto_limit:
+                next_cursor = WeaviateService.encode_cursor(search_request, offset + limit)
+            # Hits are already typed by the backend, so the response is built without re-validating them
+            response = SearchResponse.construct(
                 success=True,
                 results=results,
                 count=len(results),
-                message=f"Found {len(results)} results for query: '{search_request.query}'"
+                message=f"Found {len(results)} results for query: '{search_request.query}'",
+                next_cursor=next_cursor
             )
+            search_cache.set(cache_key, response)
+            return response
             
+        except BackendUnavailable:
+            raise
         except Exception as e:
             return SearchResponse(
                 success=False,
@@ -63,48 +279,190 @@ class WeaviateService:
             )
     
     @staticmethod
-    def generative_search(gen_request: GenerativeRequest) -> GenerativeResponse:
-        """Perform generative AI search in Weaviate"""
+    async def semantic_search_async(search_request: SearchRequest) -> SearchResponse:
+        """Perform semantic search in Weaviate without blocking the event loop, joining an identical one in flight"""
+        return await with_deadline(search_flight.do(
+            WeaviateService._search_cache_key(search_request),
+            lambda: weaviate_client.run_in_executor(WeaviateService.semantic_search, search_request)
+        ), "search")
+    
+    @staticmethod
+    def fetch_objects(objects_request: ObjectsRequest) -> ObjectsResponse:
+        """Hydrate objects by ID, e.g. hits from a metadata-only search, in request order"""
+        ids = list(dict.fromkeys(objects_request.ids))
         try:
-            client = weaviate_client.get_client()
-            collection = client.collections.get(settings.COLLECTION_NAME)
-
-            response = collection.generate.hybrid(
-                query=gen_request.query,
-                limit=int(settings.LIMIT),
-                grouped_task="""
-                    Provide a direct, factual answer using only information from the provided context.
-                    Do not repeat the question.
-                    Do not use prefixes like 'Answer:' or 'According to the documents'.
-                    Focus on the most relevant information that directly addresses the query.
-                    If the query is not answerable with the provided context, respond with 'I don't know'.""",
-                # grouped_task="Answer the question precisely using only information from the provided context. Focus on the most relevant information that directly addresses the query.",
-                generative_provider=GenerativeConfig.openai(model="gpt-4.1", temperature=0.0),
-                alpha=0.5
+            check_deadline("retrieval")
+            with time_stage("retrieval"):
+                objects = backend.fetch(ids, objects_request.return_properties)
+        except BackendUnavailable:
+            raise
+        except Exception as e:
+            return ObjectsResponse(
+                success=False,
+                results=[],
+                count=0,
+                missing=[],
+                message=f"Error fetching objects: {str(e)}"
             )
-
-            
-            # Extract source results
-            source_results = []
-            for obj in response.objects:
-                print(f"Retrieved doc: {obj.properties}")
-                
-                result = {
-                    "id": str(obj.uuid),
-                    "properties": obj.properties
-                }
-                source_results.append(result)
-            
-                
+        
+        found = {obj["id"]: obj for obj in objects}
+        results = [found[object_id] for object_id in ids if object_id in found]
+        missing = [object_id for object_id in ids if object_id not in found]
+        return ObjectsResponse.construct(
+            success=True,
+            results=results,
+            count=len(results),
+            missing=missing,
+            message=f"Fetched {len(results)} of {len(ids)} objects"
+        )
+    
+    @staticmethod
+    async def fetch_objects_async(objects_request: ObjectsRequest) -> ObjectsResponse:
+        """Hydrate objects by ID without blocking the event loop"""
+        return await with_deadline(
+            weaviate_client.run_in_executor(WeaviateService.fetch_objects, objects_request), "object fetch"
+        )
+    
+    @staticmethod
+    async def batch_search_async(batch_request: BatchSearchRequest) -> BatchSearchResponse:
+        """Run several semantic searches concurrently, returning per-item results in input order"""
+        semaphore = asyncio.Semaphore(max(1, settings.BATCH_SEARCH_CONCURRENCY))
+        
+        # Embed all queries up front in one batched call; the searches then hit the embedding cache
+        if settings.CLIENT_QUERY_EMBEDDING:
+            queries = [search_request.query for search_request in batch_request.requests if search_request.query.strip()]
+            try:
+                await with_deadline(weaviate_client.run_in_executor(WeaviateService.embed_queries, queries), "embedding")
+            except Exception as e:
+                logger.debug("Failed to pre-embed batch queries: %s", e)
+        
+        async def run_one(index: int, search_request: SearchRequest) -> BatchSearchItem:
+            error = WeaviateService.request_error(search_request)
+            if error is not None:
+                return BatchSearchItem(index=index, success=False, error=error)
+            try:
+                async with semaphore:
+                    result = await WeaviateService.semantic_search_async(search_request)
+            except BackendUnavailable as e:
+                return BatchSearchItem(index=index, success=False, error=str(e))
+            if not result.success:
+                return BatchSearchItem(index=index, success=False, error=result.message)
+            return BatchSearchItem(index=index, success=True, result=result)
+        
+        items = await asyncio.gather(*[
+            run_one(index, search_request)
+            for index, search_request in enumerate(batch_request.requests)
+        ])
+        failed = sum(1 for item in items if not item.success)
+        return BatchSearchResponse(
+            success=failed == 0,
+            results=items,
+            count=len(items),
+            message=f"Completed {len(items)} searches with {failed} errors"
+        )
+    
+    @staticmethod
+    def embed_generation_query(query: str):
+        """Query vector for a generate request: for near_vector retrieval when enabled, else for paraphrase matching"""
+        query_vector = WeaviateService.embed_query(query)
+        if query_vector is None:
+            query_vector = WeaviateService._embed_for_answer_cache(query)
+        return query_vector
+    
+    @staticmethod
+    def degrade_reason() -> Optional[str]:
+        """Why generation should be skipped in favour of retrieval-only results, or None to generate"""
+        if not settings.GENERATE_DEGRADE_ENABLED:
+            return None
+        if generation_breaker.is_open():
+            return "generation backend unavailable"
+        left = remaining()
+        if left is not None and left < max(settings.GENERATE_DEGRADE_MIN_SECONDS, generation_latency.value):
+            return "not enough time left to generate"
+        return None
+    
+    @staticmethod
+    def degraded_response(source_results: List[Dict[str, Any]], reason: str) -> GenerativeResponse:
+        """Retrieval-only answer to a generate request; never cached"""
+        degraded_answers.inc(reason=reason)
+        return GenerativeResponse(
+            success=True,
+            generated_text=None,
+            source_results=source_results,
+            count=len(source_results),
+            message=f"Generation skipped ({reason}); returning {len(source_results)} retrieved results",
+            degraded=True
+        )
+    
+    @staticmethod
+    def generative_search(gen_request: GenerativeRequest) -> GenerativeResponse:
+        """Perform generative AI search against the retrieval backend"""
+        scope = WeaviateService._generation_scope(gen_request)
+        cached = answer_cache.get_exact(settings.COLLECTION_NAME, gen_request.query, scope)
+        if cached is not None:
+            record_cache_lookup("answer", True)
+            return cached
+        
+        query_vector = WeaviateService.embed_generation_query(gen_request.query)
+        if query_vector is not None and answer_cache.threshold <= 1:
+            cached = answer_cache.get_similar(settings.COLLECTION_NAME, query_vector, scope)
+        record_cache_lookup("answer", cached is not None)
+        if cached is not None:
+            return cached
+        
+        try:
+            search_vector = query_vector if settings.CLIENT_QUERY_EMBEDDING else None
+            token_count = None
+            if settings.RERANK_ENABLED or settings.CONTEXT_PACKING_ENABLED:
+                source_results = WeaviateService.retrieve_context(gen_request, search_vector)
+                # Decided after retrieval, with the time it actually left
+                reason = WeaviateService.degrade_reason()
+                if reason is not None:
+                    return WeaviateService.degraded_response(source_results, reason)
+                contexts, token_count = WeaviateService.build_context(gen_request.query, source_results)
+                started = time.perf_counter()
+                try:
+                    with time_stage("generation"):
+                        generated_text = generator.complete(gen_request.query, contexts)
+                except (BackendUnavailable, requests.Timeout) as e:
+                    if not settings.GENERATE_DEGRADE_ENABLED:
+                        raise
+                    return WeaviateService.degraded_response(
+                        source_results,
+                        "generation timed out" if isinstance(e, requests.Timeout) else "generation backend unavailable"
+                    )
+                generation_latency.observe(time.perf_counter() - started)
+            else:
+                # Server-side generation retrieves and generates in one call, so decide up front
+                reason = WeaviateService.degrade_reason()
+                if reason is not None:
+                    return WeaviateService.degraded_response(
+                        WeaviateService.retrieve_context(gen_request, search_vector), reason
+                    )
+                started = time.perf_counter()
+                with time_stage("generation"):
+                    source_results, generated_text = backend.generate(
+                        gen_request.query,
+                        search_vector,
+                        gen_request.limit or int(settings.LIMIT),
+                        filters=WeaviateService._filters(gen_request.filters),
+                        auto_limit=gen_request.auto_limit
+                    )
+                generation_latency.observe(time.perf_counter() - started)
             
-            return GenerativeResponse(
+            result = GenerativeResponse(
                 success=True,
-                generated_text=response.generated,
+                generated_text=generated_text,
                 source_results=source_results,
                 count=len(source_results),
-                message=f"Generated response based on {len(source_results)} results"
+                message=f"Generated response based on {len(source_results)} results",
+                prompt_tokens=token_count
             )
+            answer_cache.set(settings.COLLECTION_NAME, gen_request.query, result, vector=query_vector, scope=scope)
+            return result
             
+        except BackendUnavailable:
+            raise
         except Exception as e:
             return GenerativeResponse(
                 success=False,
@@ -113,3 +471,169 @@ class WeaviateService:
                 count=0,
                 message=f"Error performing generative search: {str(e)}"
             )
+    
+    @staticmethod
+    async def generative_search_async(gen_request: GenerativeRequest) -> GenerativeResponse:
+        """Perform generative AI search in Weaviate without blocking the event loop, joining an identical one in flight"""
+        return await with_deadline(generate_flight.do(
+            (
+                settings.COLLECTION_NAME,
+                normalize_query(gen_request.query),
+                WeaviateService._generation_scope(gen_request),
+            ),
+            lambda: weaviate_client.run_in_executor(WeaviateService.generative_search, gen_request)
+        ), "generation")
+    
+    @staticmethod
+    def retrieve_context(gen_request: GenerativeRequest, query_vector) -> List[Dict[str, Any]]:
+        """Hybrid retrieval of generation context, over-fetched then re-ranked and diversified when enabled"""
+        check_deadline("retrieval")
+        limit = gen_request.limit or int(settings.LIMIT)
+        filters = WeaviateService._filters(gen_request.filters)
+        if not settings.RERANK_ENABLED:
+            with time_stage("retrieval"):
+                return backend.hybrid(
+                    gen_request.query, query_vector, limit, filters=filters, auto_limit=gen_request.auto_limit
+                )
+        with time_stage("retrieval"):
+            candidates = backend.hybrid(
+                gen_request.query,
+                query_vector,
+                max(settings.RERANK_CANDIDATES, limit),
+                filters=filters,
+                auto_limit=gen_request.auto_limit,
+                include_vector=True
+            )
+        with time_stage("rerank"):
+            return reranker.rerank(gen_request.query, query_vector, candidates, limit)
+    
+    @staticmethod
+    def build_context(query: str, source_results: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Context objects for client-side generation and the number of prompt tokens they make up"""
+        if settings.CONTEXT_PACKING_ENABLED:
+            with time_stage("context"):
+                contexts = context_builder.pack(source_results)
+        else:
+            contexts = [result["properties"] for result in source_results]
+        token_count = context_builder.prompt_tokens(query, contexts)
+        prompt_tokens.observe(token_count)
+        return contexts, token_count
+    
+    @staticmethod
+    async def generative_search_stream(gen_request: GenerativeRequest) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (event, data) pairs: the sources once retrieval finishes, then answer tokens as they arrive"""
+        scope = WeaviateService._generation_scope(gen_request)
+        cached = answer_cache.get_exact(settings.COLLECTION_NAME, gen_request.query, scope)
+        query_vector = None
+        if cached is None:
+            try:
+                query_vector = await with_deadline(
+                    weaviate_client.run_in_executor(WeaviateService.embed_generation_query, gen_request.query),
+                    "embedding"
+                )
+            except Exception as e:
+                yield "error", {"message": f"Error retrieving sources: {str(e)}"}
+                return
+            if query_vector is not None and answer_cache.threshold <= 1:
+                cached = answer_cache.get_similar(settings.COLLECTION_NAME, query_vector, scope)
+        record_cache_lookup("answer", cached is not None)
+        if cached is not None:
+            yield "sources", {
+                "source_results": cached.source_results,
+                "count": cached.count,
+                "prompt_tokens": cached.prompt_tokens
+            }
+            yield "token", {"text": cached.generated_text}
+            yield "done", {"generated_text": cached.generated_text, "cached": True}
+            return
+        
+        try:
+            search_vector = query_vector if settings.CLIENT_QUERY_EMBEDDING else None
+            source_results = await with_deadline(
+                weaviate_client.run_in_executor(WeaviateService.retrieve_context, gen_request, search_vector),
+                "retrieval"
+            )
+            reason = WeaviateService.degrade_reason()
+            token_count = None
+            if reason is None:
+                contexts, token_count = await weaviate_client.run_in_executor(
+                    WeaviateService.build_context, gen_request.query, source_results
+                )
+        except Exception as e:
+            yield "error", {"message": f"Error retrieving sources: {str(e)}"}
+            return
+        yield "sources", {"source_results": source_results, "count": len(source_results), "prompt_tokens": token_count}
+        
+        fragments = []
+        started = time.perf_counter()
+        stream = None
+        # Reads run in worker threads; the lock keeps closing the stream from racing a read still in flight
+        stream_lock = threading.Lock()
+        
+        def read_fragment():
+            with stream_lock:
+                return next(stream, None)
+        
+        def close_stream():
+            with stream_lock:
+                stream.close()
+        
+        try:
+            if reason is None:
+                stream = generator.stream(gen_request.query, contexts)
+                while True:
+                    fragment = await with_deadline(weaviate_client.run_in_executor(read_fragment), "generation")
+                    if fragment is None:
+                        break
+                    fragments.append(fragment)
+                    yield "token", {"text": fragment}
+        except (BackendUnavailable, requests.Timeout) as e:
+            # Nothing sent yet: fall back to the sources already delivered
+            if fragments or not settings.GENERATE_DEGRADE_ENABLED:
+                yield "error", {"message": f"Error generating response: {str(e)}"}
+                return
+            reason = "generation timed out" if isinstance(e, (DeadlineExceeded, requests.Timeout)) \
+                else "generation backend unavailable"
+        except Exception as e:
+            yield "error", {"message": f"Error generating response: {str(e)}"}
+            return
+        finally:
+            # Release the OpenAI HTTP stream after a deadline, disconnect or error too
+            if stream is not None:
+                if stream_lock.acquire(blocking=False):
+                    try:
+                        stream.close()
+                    finally:
+                        stream_lock.release()
+                else:
+                    # A read is still running in a worker thread; close once it returns
+                    weaviate_client.get_executor().submit(close_stream)
+        if reason is not None:
+            degraded_answers.inc(reason=reason)
+            yield "done", {
+                "generated_text": None,
+                "cached": False,
+                "degraded": True,
+                "message": f"Generation skipped ({reason})"
+            }
+            return
+        elapsed = time.perf_counter() - started
+        observe_stage("generation", elapsed)
+        generation_latency.observe(elapsed)
+        
+        generated_text = "".join(fragments)
+        answer_cache.set(
+            settings.COLLECTION_NAME,
+            gen_request.query,
+            GenerativeResponse(
+                success=True,
+                generated_text=generated_text,
+                source_results=source_results,
+                count=len(source_results),
+                message=f"Generated response based on {len(source_results)} results",
+                prompt_tokens=token_count
+            ),
+            vector=query_vector,
+            scope=scope
+        )
+        yield "done", {"generated_text": generated_text, "cached": False}
@@ -0,0 +1,301 @@
+"""Benchmark the API endpoints against in-memory Weaviate and Neo4j stand-ins.
+
+Boots `app.main.app` in-process over httpx's ASGI transport, so no server or
+cloud services are needed. The stand-ins sleep for a configurable latency per
+call, which isolates the overhead added by the service itself. Results are
+printed (and optionally written) as JSON; with --baseline the run fails when an
+endpoint's p95 latency or throughput regresses beyond --tolerance.
+
+    python app/test/benchmark.py --requests 500 --concurrency 32 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import types
+import uuid
+
+# The stand-ins replace the remote services; embed queries locally instead of calling OpenAI
+os.environ.setdefault("EMBEDDING_PROVIDER", "hashing")
+os.environ.setdefault("RETRIEVAL_BACKEND", "weaviate")
+os.environ.setdefault("COLLECTION_NAME", "Benchmark")
+
+import httpx
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from app.main import app
+from app.config import settings
+from db.weaviate_client import weaviate_client
+from db.neo4j_client import neo4j_client
+from services.generation import generator
+
+ENDPOINTS = ("search", "generate", "neo4j")
+
+
+class FakeWeaviateObject:
+    def __init__(self, index):
+        self.uuid = uuid.UUID(int=index + 1)
+        self.properties = {
+            "field_content": f"Benchmark chunk {index} " + "lorem ipsum dolor sit amet " * 20,
+            "source_file": f"doc_{index % 7}.json",
+            "chunk_type": "text",
+        }
+        self.metadata = types.SimpleNamespace(distance=0.1 + index / 100)
+        self.vector = {"default": np.random.default_rng(index).normal(size=settings.EMBEDDING_DIMENSIONS).tolist()}
+
+
+class FakeWeaviateClient:
+    """Blocking stand-in for the Weaviate v4 client; every query sleeps for the configured latency"""
+
+    def __init__(self, latency, generate_latency, limit=10):
+        self.latency = latency
+        self.generate_latency = generate_latency
+        self.objects = [FakeWeaviateObject(index) for index in range(limit)]
+        self.collections = types.SimpleNamespace(get=lambda name: self._collection())
+
+    def _respond(self, latency, limit, generated=None):
+        time.sleep(latency)
+        return types.SimpleNamespace(objects=self.objects[:limit], generated=generated)
+
+    def _collection(self):
+        def query(**kwargs):
+            return self._respond(self.latency, kwargs.get("limit") or len(self.objects))
+
+        def generate(**kwargs):
+            return self._respond(
+                self.latency + self.generate_latency,
+                kwargs.get("limit") or len(self.objects),
+                generated="Benchmark answer."
+            )
+
+        return types.SimpleNamespace(
+            query=types.SimpleNamespace(near_vector=query, near_text=query, hybrid=query, fetch_objects=query),
+            generate=types.SimpleNamespace(hybrid=generate),
+        )
+
+    def is_ready(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class FakeRecord(dict):
+    """Dict with the items() interface of a neo4j Record"""
+
+
+class FakeResult:
+    def __init__(self, records):
+        self._records = iter(records)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._records)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def run(self, query, parameters=None, **kwargs):
+        await asyncio.sleep(self.driver.latency)
+        return FakeResult(self.driver.records)
+
+    async def execute_read(self, work, *args, **kwargs):
+        return await work(self, *args, **kwargs)
+
+    execute_write = execute_read
+
+
+class FakeAsyncNeo4jDriver:
+    """Async stand-in for the neo4j driver; every query sleeps for the configured latency"""
+
+    def __init__(self, latency, rows):
+        self.latency = latency
+        self.records = [
+            FakeRecord(n={"id": index, "name": f"node {index}"}, score=index / rows)
+            for index in range(rows)
+        ]
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    async def verify_connectivity(self):
+        return None
+
+    async def close(self):
+        pass
+
+
+class FakeGenerator:
+    """Stand-in for client-side generation; sleeps for the configured latency"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def complete(self, query, contexts, task=None):
+        time.sleep(self.latency)
+        return "Benchmark answer."
+
+    def stream(self, query, contexts, task=None):
+        for word in ("Benchmark", " answer."):
+            time.sleep(self.latency / 2)
+            yield word
+
+
+def install_stand_ins(args):
+    """Point the global clients at the in-memory stand-ins"""
+    weaviate_client.client = FakeWeaviateClient(args.weaviate_latency / 1000, args.generate_latency / 1000)
+    neo4j_client.async_driver = FakeAsyncNeo4jDriver(args.neo4j_latency / 1000, args.neo4j_rows)
+    fake_generator = FakeGenerator(args.generate_latency / 1000)
+    generator.complete = fake_generator.complete
+    generator.stream = fake_generator.stream
+
+
+def build_request(endpoint, index, distinct_queries):
+    """Method, path and body for the index-th request; queries cycle to control cache hit rates"""
+    query_id = index % distinct_queries if distinct_queries else index
+    if endpoint == "search":
+        return "/api/search/search", {"query": f"benchmark search query {query_id}"}
+    if endpoint == "generate":
+        return "/api/search/generate", {"query": f"benchmark question {query_id}"}
+    return "/api/neo4j/query", {
+        "query": "MATCH (n:Chunk) WHERE n.id > $id RETURN n, n.score AS score LIMIT 25",
+        "parameters": {"id": query_id}
+    }
+
+
+def summarize(latencies, errors, duration):
+    latencies_ms = np.asarray(latencies) * 1000
+    completed = len(latencies)
+    return {
+        "requests": completed + errors,
+        "errors": errors,
+        "duration_s": round(duration, 4),
+        "throughput_rps": round(completed / duration, 2) if duration > 0 else None,
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 3),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        } if completed else None,
+    }
+
+
+async def run_endpoint(client, endpoint, args):
+    """Send args.requests requests from args.concurrency workers and collect per-request latencies"""
+    for index in range(args.warmup):
+        path, body = build_request(endpoint, -1 - index, args.distinct_queries)
+        await client.post(path, json=body)
+
+    latencies = []
+    errors = 0
+    counter = iter(range(args.requests))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            path, body = build_request(endpoint, index, args.distinct_queries)
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                ok = response.status_code == 200 and response.json().get("success", True)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_benchmark(args):
+    install_stand_ins(args)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for endpoint in args.endpoints:
+            results[endpoint] = await run_endpoint(client, endpoint, args)
+    return results
+
+
+def compare(report, baseline, tolerance):
+    """Regressions of p95 latency or throughput beyond the tolerance, as messages"""
+    regressions = []
+    for endpoint, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if not previous or not previous.get("latency_ms") or not current.get("latency_ms"):
+            continue
+        if current["latency_ms"]["p95"] > previous["latency_ms"]["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{endpoint}: p95 {current['latency_ms']['p95']}ms vs baseline {previous['latency_ms']['p95']}ms"
+            )
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{endpoint}: throughput {current['throughput_rps']}rps vs baseline {previous['throughput_rps']}rps"
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent in-flight requests")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per endpoint")
+    parser.add_argument("--distinct-queries", type=int, default=0,
+                        help="cycle through this many queries (0 = every query distinct, defeating caches)")
+    parser.add_argument("--weaviate-latency", type=float, default=20.0, help="ms per Weaviate query")
+    parser.add_argument("--generate-latency", type=float, default=200.0, help="extra ms per generative query")
+    parser.add_argument("--neo4j-latency", type=float, default=10.0, help="ms per Neo4j query")
+    parser.add_argument("--neo4j-rows", type=int, default=25, help="records returned per Neo4j query")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression vs the baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    endpoints = asyncio.run(run_benchmark(args))
+    report = {
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "baseline", "tolerance")
+        },
+        "endpoints": endpoints,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
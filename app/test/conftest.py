@@ -0,0 +1,14 @@
+"""Pytest setup: import the app's modules the way main.py does, with no remote services
+
+Tests embed locally and read from an in-process index, so they need neither OpenAI
+nor a Weaviate or Neo4j cluster.
+"""
+import os
+import sys
+
+os.environ.setdefault("EMBEDDING_PROVIDER", "hashing")
+os.environ.setdefault("RETRIEVAL_BACKEND", "local")
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(APP_DIR))
+sys.path.append(APP_DIR)
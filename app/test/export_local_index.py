@@ -0,0 +1,59 @@
+import os
+import sys
+from tqdm import tqdm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from app.config import settings
+from app.db.weaviate_client import weaviate_client
+from app.services.vector_index import VectorIndex
+
+# Export a Weaviate collection with its vectors into the file served by RETRIEVAL_BACKEND=local
+COLLECTION_NAME = os.environ.get("COLLECTION_NAME", settings.COLLECTION_NAME)
+OUTPUT_PATH = os.environ.get("LOCAL_INDEX_PATH", settings.LOCAL_INDEX_PATH)
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+
+
+def object_vector(obj):
+    """The object's default vector; v4 clients return named vectors as a dict."""
+    vector = obj.vector
+    if isinstance(vector, dict):
+        vector = vector.get("default") or next(iter(vector.values()), None)
+    return vector
+
+
+def main():
+    client = weaviate_client.get_client()
+    collection = client.collections.get(COLLECTION_NAME)
+    index = VectorIndex()
+
+    ids, vectors, properties = [], [], []
+    skipped = 0
+
+    def flush():
+        index.add(ids, vectors, properties)
+        ids.clear()
+        vectors.clear()
+        properties.clear()
+
+    for obj in tqdm(collection.iterator(include_vector=True), desc="Exporting objects"):
+        vector = object_vector(obj)
+        if not vector:
+            skipped += 1
+            continue
+        ids.append(str(obj.uuid))
+        vectors.append(vector)
+        properties.append(obj.properties)
+        if len(ids) >= EXPORT_BATCH_SIZE:
+            flush()
+    flush()
+
+    if settings.LOCAL_INDEX_IVF_LISTS > 0 and len(index) >= settings.LOCAL_INDEX_IVF_MIN_SIZE:
+        index.build_ivf(settings.LOCAL_INDEX_IVF_LISTS)
+    index.save(OUTPUT_PATH)
+
+    client.close()
+    print(f"✅ Exported {len(index)} objects from '{COLLECTION_NAME}' to {OUTPUT_PATH} ({skipped} without vectors skipped).")
+
+
+if __name__ == "__main__":
+    main()
@@ -447,10 +447,14 @@
 
 import json
 import weaviate
-from weaviate.collections.classes.config import DataType, Configure
+from weaviate.collections.classes.config import DataType, Configure, Tokenization
 import sys
 import os
 import hashlib
+import queue
+import threading
+import requests
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 from weaviate.util import generate_uuid5
 from tqdm import tqdm
@@ -458,15 +462,25 @@ from tqdm import tqdm
 # Import your existing Weaviate client setup
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from app.db.weaviate_client import weaviate_client
-
-# Connect to Weaviate
-client = weaviate_client.get_client()
+from app.services.embedding import get_cached_embedder
+from ingest_manifest import IngestManifest, file_hash, delete_objects
 
 # Config
 json_dir = "json_files"
 COLLECTION_NAME = "RAG_PROJECT_FLEXIBLE"
 MIN_CHUNK_SIZE = 50
 MAX_CHUNK_SIZE = 2000
+# Parsing/chunking worker processes, and how many parsed files may wait for upload before parsing pauses
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 4))
+# Incremental mode keeps the collection and only writes chunks whose content hash changed
+INCREMENTAL = os.getenv("INGEST_INCREMENTAL", "false").lower() == "true"
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", f".ingest_manifest_{COLLECTION_NAME}.json")
+# Compute vectors here (through the on-disk vector cache) instead of having Weaviate vectorize objects
+CLIENT_VECTORS = os.getenv("INGEST_CLIENT_VECTORS", "false").lower() == "true"
+# Base URL of the running RAG API and its CACHE_ADMIN_TOKEN, used to invalidate its search cache after ingestion
+RAG_API_URL = os.getenv("RAG_API_URL")
+CACHE_ADMIN_TOKEN = os.getenv("CACHE_ADMIN_TOKEN")
 
 #####################
 # Utility Functions #
@@ -531,12 +545,36 @@ def map_to_weaviate_enum(data_type):
     }
     return mapping.get(data_type, DataType.TEXT)
 
+def notify_cache_invalidation(collection_name):
+    """Ask the running API to drop cached search results for a rewritten collection.
+
+    Only the API worker that receives the call is cleared; with several workers the
+    others serve cached results until their TTL expires.
+    """
+    if not RAG_API_URL:
+        return
+    try:
+        response = requests.post(
+            f"{RAG_API_URL.rstrip('/')}/api/search/cache/invalidate",
+            params={"collection": collection_name},
+            headers={"X-Cache-Admin-Token": CACHE_ADMIN_TOKEN or ""},
+            timeout=10
+        )
+        response.raise_for_status()
+        print(f"🧹 Invalidated API search cache: {response.json().get('message')}")
+    except Exception as e:
+        print(f"⚠️ Could not invalidate API search cache: {e}")
+
 #########################
 # JSON File Processing  #
 #########################
 
 def process_json_file(filepath, filename):
-    """Process one JSON file into flexible chunks."""
+    """Process one JSON file into flexible chunks.
+
+    Returns None when the file cannot be read or is not a JSON object or list, so the
+    caller can keep what was ingested from it before instead of treating it as empty.
+    """
     records = []
     try:
         with open(filepath, "r", encoding='utf-8') as f:
@@ -546,7 +584,7 @@ def process_json_file(filepath, filename):
             data = [data]
         elif not isinstance(data, list):
             print(f"Unexpected JSON format in {filename}. Skipping...")
-            return []
+            return None
 
         for i, record in enumerate(data):
             flat_record = flatten_dict(record)
@@ -588,53 +626,122 @@ def process_json_file(filepath, filename):
 
     except Exception as e:
         print(f"❌ Error processing {filename}: {e}")
-        return []
+        return None
+
+def build_objects(filepath, filename):
+    """Parse and chunk one JSON file into (uuid, properties) pairs ready for upload.
+
+    Runs in a worker process, so it only depends on module-level helpers. Returns
+    None when the file could not be parsed.
+    """
+    records = process_json_file(filepath, filename)
+    if records is None:
+        return None
+    objects = []
+    for rec in records:
+        unique_id = f"{rec['source_file']}_{rec['record_index']}"
+        base_uuid = generate_uuid5(unique_id)
+
+        for chunk in rec['chunks']:
+            obj = {
+                "source_file": rec['source_file'],
+                "record_index": rec['record_index'],
+                "field_name": chunk['field'],
+                "field_content": chunk['content'],
+                "sub_chunk_index": chunk['sub_chunk_index'],
+                "total_sub_chunks": chunk['total_sub_chunks'],
+                "is_chunked": chunk['total_sub_chunks'] > 1,
+                "original_id": str(base_uuid)
+            }
+            chunk_uuid = generate_uuid5(f"{base_uuid}_{chunk['field']}_{chunk['sub_chunk_index']}")
+            objects.append((chunk_uuid, obj))
+    return objects
+
+def produce_objects(files, object_queue):
+    """Parse files in a process pool and feed (filename, digest, objects) into a bounded queue.
+
+    At most INGEST_WORKERS files are parsed at once, and the producer blocks on the
+    queue while the uploader is behind, so memory stays bounded by the queue size.
+    """
+    try:
+        with ProcessPoolExecutor(max_workers=INGEST_WORKERS) as executor:
+            pending = {}
+            for filepath, filename, digest in files:
+                pending[executor.submit(build_objects, filepath, filename)] = (filename, digest)
+                if len(pending) >= INGEST_WORKERS:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        object_queue.put((*pending.pop(future), future.result()))
+            for future, (filename, digest) in pending.items():
+                object_queue.put((filename, digest, future.result()))
+    except Exception as e:
+        print(f"❌ Error while parsing files: {e}")
+    finally:
+        object_queue.put(None)
+
+def iter_files(files):
+    """Yield (filename, digest, objects) as worker processes finish parsing files.
+
+    objects is None for a file that could not be parsed.
+    """
+    object_queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    producer = threading.Thread(target=produce_objects, args=(files, object_queue), daemon=True)
+    producer.start()
+    while True:
+        item = object_queue.get()
+        if item is None:
+            break
+        yield item
+    producer.join()
 
 ##############################
-# Build Unified Dynamic Schema
+# Collection Schema
 ##############################
 
-def build_unified_schema(all_records):
-    property_types = {}
-
-    for rec in all_records:
-        for chunk in rec['chunks']:
-            key = "field_name"
-            value = chunk["field"]
-            property_types[key] = infer_weaviate_type(value)
+def build_schema():
+    """Properties of the chunk collection.
 
-            key = "field_content"
-            value = chunk["content"]
-            property_types[key] = infer_weaviate_type(value)
-
-    # Add common metadata fields
-    property_types.update({
+    The schema is fixed rather than inferred from the data so that uploading can
+    start before every file has been parsed.
+    """
+    property_types = {
+        "field_name": "text",
+        "field_content": "text",
         "source_file": "text",
         "record_index": "int",
         "sub_chunk_index": "int",
         "total_sub_chunks": "int",
         "is_chunked": "boolean",
         "original_id": "text"
-    })
-
-    # Build property schema
-    properties = []
-    for key, dtype in property_types.items():
-        properties.append({"name": key, "data_type": map_to_weaviate_enum(dtype)})
-
+    }
+    properties = [
+        {"name": key, "data_type": map_to_weaviate_enum(dtype)}
+        for key, dtype in property_types.items()
+    ]
+    # The API's source_file filter matches whole values; existing collections need re-ingesting
+    for prop in properties:
+        if prop["name"] == "source_file":
+            prop["tokenization"] = Tokenization.FIELD
     return properties
 
 ##########################
 # Create Collection Logic
 ##########################
 
-def create_collection(properties):
+def create_collection(client, properties, recreate=True):
+    """Create the collection; returns False when an existing one was kept."""
     try:
         if client.collections.exists(COLLECTION_NAME):
+            if not recreate:
+                print(f"♻️ Collection {COLLECTION_NAME} already exists - updating incrementally")
+                return False
             print(f"⚠️ Collection {COLLECTION_NAME} already exists - deleting...")
             client.collections.delete(COLLECTION_NAME)
 
-        vectorizer_config = Configure.Vectorizer.text2vec_openai()  # Change this if needed
+        if CLIENT_VECTORS:
+            vectorizer_config = Configure.Vectorizer.none()
+        else:
+            vectorizer_config = Configure.Vectorizer.text2vec_openai()  # Change this if needed
         generative_config = Configure.Generative.openai()
 
         client.collections.create(
@@ -644,6 +751,7 @@ def create_collection(properties):
             generative_config=generative_config
         )
         print(f"✅ Created Weaviate collection: {COLLECTION_NAME}")
+        return True
     except Exception as e:
         print(f"❌ Error creating collection: {e}")
         client.close()
@@ -654,53 +762,83 @@ def create_collection(properties):
 #########################
 
 def main():
-    all_processed_data = []
+    files = [
+        (os.path.join(json_dir, file), file)
+        for file in sorted(os.listdir(json_dir))
+        if file.endswith(".json")
+    ]
+
+    if not files and not INCREMENTAL:
+        print("❌ No JSON files found. Exiting.")
+        sys.exit(1)
 
-    # Load and process all JSON files
-    for file in os.listdir(json_dir):
-        if not file.endswith(".json"):
-            continue
+    # Connect to Weaviate
+    client = weaviate_client.get_client()
 
-        filepath = os.path.join(json_dir, file)
-        file_records = process_json_file(filepath, file)
-        all_processed_data.extend(file_records)
+    embedder = get_cached_embedder() if CLIENT_VECTORS else None
 
-    if not all_processed_data:
-        print("❌ No valid data found. Exiting.")
-        client.close()
-        sys.exit(1)
+    manifest = None
+    if INCREMENTAL:
+        manifest = IngestManifest(MANIFEST_PATH, COLLECTION_NAME, {
+            "max_chunk_size": MAX_CHUNK_SIZE,
+            "vectors": embedder.model_name if embedder else "server"
+        })
+    if create_collection(client, build_schema(), recreate=not INCREMENTAL) and manifest:
+        manifest.reset()
+    collection = client.collections.get(COLLECTION_NAME)
 
-    print(f"\n📊 Total records processed: {len(all_processed_data)}")
+    # Skip files whose content is unchanged since the last successful run
+    pending_files = []
+    for filepath, filename in files:
+        digest = file_hash(filepath)
+        if manifest and manifest.is_unchanged(filename, digest):
+            continue
+        pending_files.append((filepath, filename, digest))
 
-    # Build unified schema
-    properties = build_unified_schema(all_processed_data)
-    create_collection(properties)
-    collection = client.collections.get(COLLECTION_NAME)
+    print(f"\n📊 Files to ingest: {len(pending_files)} of {len(files)}")
 
-    # Insert into Weaviate
+    # Insert into Weaviate while worker processes keep parsing
     total_objects = 0
+    stale_ids = []
+    written_files = []
     print("\n🚀 Inserting data into Weaviate...")
     with collection.batch.fixed_size(batch_size=100) as batch:
-        for rec in tqdm(all_processed_data):
-            unique_id = f"{rec['source_file']}_{rec['record_index']}"
-            base_uuid = generate_uuid5(unique_id)
-
-            for chunk in rec['chunks']:
-                obj = {
-                    "source_file": rec['source_file'],
-                    "record_index": rec['record_index'],
-                    "field_name": chunk['field'],
-                    "field_content": chunk['content'],
-                    "sub_chunk_index": chunk['sub_chunk_index'],
-                    "total_sub_chunks": chunk['total_sub_chunks'],
-                    "is_chunked": chunk['total_sub_chunks'] > 1,
-                    "original_id": str(base_uuid)
-                }
-                chunk_uuid = generate_uuid5(f"{base_uuid}_{chunk['field']}_{chunk['sub_chunk_index']}")
-                batch.add_object(properties=obj, uuid=chunk_uuid)
+        for filename, digest, objects in tqdm(iter_files(pending_files), total=len(pending_files), desc="Uploading files"):
+            if objects is None:
+                # Keep the file's chunks and manifest entry from the last run; the next run retries it
+                print(f"⚠️ Skipping {filename}: it could not be parsed")
+                continue
+            if manifest:
+                objects, removed_ids, chunk_hashes = manifest.diff_chunks(filename, objects)
+                stale_ids.extend(removed_ids)
+                written_files.append((filename, digest, chunk_hashes))
+            vectors = [None] * len(objects)
+            if embedder:
+                vectors = embedder.embed([obj["field_content"] for _, obj in objects])
+            for (chunk_uuid, obj), vector in zip(objects, vectors):
+                batch.add_object(properties=obj, uuid=chunk_uuid, vector=vector)
                 total_objects += 1
 
     print(f"✅ Successfully inserted {total_objects} objects into '{COLLECTION_NAME}' collection.")
+    if embedder:
+        print(f"🧮 Embeddings: {embedder.hits} from cache, {embedder.misses} computed with {embedder.model_name}")
+
+    if manifest:
+        for filename in manifest.removed_files([filename for _, filename in files]):
+            stale_ids.extend(manifest.chunk_ids(filename))
+            manifest.forget_file(filename)
+        print(f"🗑️ Deleted {delete_objects(collection, stale_ids)} stale objects.")
+
+        # Failed chunks are left out of the manifest so the next run retries them
+        failed_ids = {str(failed.object_.uuid) for failed in collection.batch.failed_objects}
+        for filename, digest, chunk_hashes in written_files:
+            if failed_ids & chunk_hashes.keys():
+                chunk_hashes = {key: value for key, value in chunk_hashes.items() if key not in failed_ids}
+                digest = None
+            manifest.record_file(filename, digest, chunk_hashes)
+        manifest.save()
+
+    notify_cache_invalidation(COLLECTION_NAME)
 
     client.close()
     print("🎉 Processing complete!")
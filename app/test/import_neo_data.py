@@ -1,15 +1,42 @@
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from tqdm import tqdm
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from app.config import settings
 from app.db.neo4j_client import neo4j_client
 
 # Configuration
 JSON_DIR = "json_files"
 CHUNK_SIZE = 2000  # Maximum size for text chunks
+BATCH_SIZE = int(os.getenv("NEO4J_IMPORT_BATCH_SIZE", 500))  # Rows per UNWIND transaction
+MAX_WORKERS = int(os.getenv("NEO4J_IMPORT_WORKERS", 4))  # Files imported in parallel
+
+# Upserts keyed on the document_id / chunk_id constraints, so reruns update instead of duplicating
+UPSERT_DOCUMENTS_QUERY = """
+UNWIND $rows AS row
+MERGE (d:Document {id: row.id})
+SET d = row.properties
+"""
+
+UPSERT_CHUNKS_QUERY = """
+UNWIND $rows AS row
+MATCH (d:Document {id: row.doc_id})
+MERGE (c:Chunk {id: row.id})
+SET c = row.properties
+MERGE (d)-[:HAS_CHUNK]->(c)
+"""
+
+# Remove chunks left over from earlier runs whose text now splits into fewer chunks
+PRUNE_STALE_CHUNKS_QUERY = """
+UNWIND $rows AS row
+MATCH (d:Document {id: row.id})-[:HAS_CHUNK]->(c:Chunk)
+WHERE NOT c.id IN row.chunk_ids
+DETACH DELETE c
+"""
 
 def flatten_dict(d, parent_key='', sep='_'):
     """Recursively flatten nested dictionaries."""
@@ -64,10 +91,12 @@ def clean_property_value(value):
     return str(value)
 
 def create_constraints(session):
-    """Create necessary constraints in Neo4j."""
+    """Create necessary constraints and indexes in Neo4j."""
     constraints = [
         "CREATE CONSTRAINT document_id IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE",
-        "CREATE CONSTRAINT chunk_id IF NOT EXISTS FOR (c:Chunk) REQUIRE c.id IS UNIQUE"
+        "CREATE CONSTRAINT chunk_id IF NOT EXISTS FOR (c:Chunk) REQUIRE c.id IS UNIQUE",
+        # Full-text index used by graph-augmented search in the API
+        f"CREATE FULLTEXT INDEX {settings.GRAPH_FULLTEXT_INDEX} IF NOT EXISTS FOR (c:Chunk) ON EACH [c.content]"
     ]
     
     for constraint in constraints:
@@ -76,71 +105,75 @@ def create_constraints(session):
         except Exception as e:
             print(f"Warning: Constraint creation failed: {e}")
 
-def process_json_file(filepath, filename, session):
-    """Process a single JSON file and create nodes in Neo4j."""
-    try:
-        with open(filepath, "r", encoding='utf-8') as f:
-            data = json.load(f)
+def build_rows(filepath, filename):
+    """Read a JSON file and build the document and chunk rows to upsert."""
+    with open(filepath, "r", encoding='utf-8') as f:
+        data = json.load(f)
+    
+    if isinstance(data, dict):
+        data = [data]
+    elif not isinstance(data, list):
+        print(f"Unexpected JSON format in {filename}. Skipping...")
+        return [], []
+    
+    document_rows = []
+    chunk_rows = []
+    for record_idx, record in enumerate(data):
+        # Create unique ID for the document
+        doc_id = f"{filename}_{record_idx}"
         
-        if isinstance(data, dict):
-            data = [data]
-        elif not isinstance(data, list):
-            print(f"Unexpected JSON format in {filename}. Skipping...")
-            return 0
+        # Flatten and clean the record
+        flat_record = flatten_dict(record)
+        clean_record = {k: clean_property_value(v) for k, v in flat_record.items()}
         
-        total_nodes = 0
-        for record_idx, record in enumerate(data):
-            # Create unique ID for the document
-            doc_id = f"{filename}_{record_idx}"
-            
-            # Flatten and clean the record
-            flat_record = flatten_dict(record)
-            clean_record = {k: clean_property_value(v) for k, v in flat_record.items()}
-            
-            # Add metadata
-            clean_record.update({
-                "id": doc_id,
-                "source_file": filename,
-                "record_index": record_idx
-            })
-            
-            # Create document node
-            create_doc_query = """
-            CREATE (d:Document)
-            SET d = $properties
-            RETURN d
-            """
-            session.run(create_doc_query, {"properties": clean_record})
-            total_nodes += 1
-            
-            # Process long text fields into chunks
-            for key, value in flat_record.items():
-                if isinstance(value, str) and len(value) > CHUNK_SIZE:
-                    chunks = chunk_text(value)
-                    for chunk_idx, chunk_text in enumerate(chunks):
-                        chunk_id = f"{doc_id}_{key}_{chunk_idx}"
-                        chunk_props = {
+        # Add metadata
+        clean_record.update({
+            "id": doc_id,
+            "source_file": filename,
+            "record_index": record_idx
+        })
+        
+        # Process long text fields into chunks
+        chunk_ids = []
+        for key, value in flat_record.items():
+            if isinstance(value, str) and len(value) > CHUNK_SIZE:
+                chunks = chunk_text(value)
+                for chunk_idx, chunk_content in enumerate(chunks):
+                    chunk_id = f"{doc_id}_{key}_{chunk_idx}"
+                    chunk_ids.append(chunk_id)
+                    chunk_rows.append({
+                        "doc_id": doc_id,
+                        "id": chunk_id,
+                        "properties": {
                             "id": chunk_id,
-                            "content": chunk_text,
+                            "content": chunk_content,
                             "field_name": key,
                             "chunk_index": chunk_idx,
                             "total_chunks": len(chunks)
                         }
-                        
-                        # Create chunk node and relationship to document
-                        create_chunk_query = """
-                        MATCH (d:Document {id: $doc_id})
-                        CREATE (c:Chunk)
-                        SET c = $properties
-                        CREATE (d)-[:HAS_CHUNK]->(c)
-                        """
-                        session.run(create_chunk_query, {
-                            "doc_id": doc_id,
-                            "properties": chunk_props
-                        })
-                        total_nodes += 1
+                    })
         
-        return total_nodes
+        document_rows.append({"id": doc_id, "properties": clean_record, "chunk_ids": chunk_ids})
+    
+    return document_rows, chunk_rows
+
+def write_batches(session, query, rows):
+    """Send rows in UNWIND batches, one explicit write transaction per batch."""
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        session.execute_write(lambda tx: tx.run(query, rows=batch).consume())
+
+def import_file(driver, filepath, filename):
+    """Upsert one JSON file's documents and chunks; returns the number of nodes written."""
+    try:
+        document_rows, chunk_rows = build_rows(filepath, filename)
+        
+        with driver.session(database=settings.NEO4J_DATABASE) as session:
+            write_batches(session, UPSERT_DOCUMENTS_QUERY, document_rows)
+            write_batches(session, UPSERT_CHUNKS_QUERY, chunk_rows)
+            write_batches(session, PRUNE_STALE_CHUNKS_QUERY, document_rows)
+        
+        return len(document_rows) + len(chunk_rows)
     
     except Exception as e:
         print(f"Error processing {filename}: {e}")
@@ -151,29 +184,31 @@ def main():
         # Connect to Neo4j
         driver = neo4j_client.get_driver()
         
-        with driver.session() as session:
+        with driver.session(database=settings.NEO4J_DATABASE) as session:
             # Create constraints
             create_constraints(session)
-            
-            total_nodes = 0
-            files_processed = 0
-            
-            # Process each JSON file
-            for file in os.listdir(JSON_DIR):
-                if not file.endswith(".json"):
-                    continue
-                
-                print(f"\nProcessing {file}...")
-                filepath = os.path.join(JSON_DIR, file)
-                nodes_created = process_json_file(filepath, file, session)
+        
+        files = [file for file in os.listdir(JSON_DIR) if file.endswith(".json")]
+        total_nodes = 0
+        files_processed = 0
+        
+        # Process JSON files in parallel, each worker with its own session
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(import_file, driver, os.path.join(JSON_DIR, file), file): file
+                for file in files
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Importing files"):
+                file = futures[future]
+                nodes_written = future.result()
                 
-                total_nodes += nodes_created
+                total_nodes += nodes_written
                 files_processed += 1
-                print(f"Created {nodes_created} nodes for {file}")
-            
-            print(f"\n✅ Import complete!")
-            print(f"📊 Files processed: {files_processed}")
-            print(f"📈 Total nodes created: {total_nodes}")
+                print(f"Upserted {nodes_written} nodes for {file}")
+        
+        print(f"\n✅ Import complete!")
+        print(f"📊 Files processed: {files_processed}")
+        print(f"📈 Total nodes upserted: {total_nodes}")
     
     except Exception as e:
         print(f"❌ Error during import: {e}")
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+from weaviate.classes.query import Filter
+
+
+def file_hash(filepath):
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(properties):
+    """SHA-256 of an object's properties, independent of key order."""
+    payload = json.dumps(properties, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """Per-file and per-chunk content hashes from the last successful ingestion run.
+
+    The manifest lets an ingestion script skip unchanged files, upsert only chunks
+    whose content changed under their deterministic UUIDs, and delete chunks that
+    disappeared. `config` captures chunking and vectorization settings; when it
+    changes, every chunk is rewritten while the recorded chunk UUIDs are kept so
+    stale ones still get deleted.
+    """
+
+    def __init__(self, path, collection, config=None):
+        self.path = path
+        self.collection = collection
+        self.config = config or {}
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("collection") == collection:
+                self.files = data.get("files", {})
+                if data.get("config") != self.config:
+                    for entry in self.files.values():
+                        entry["hash"] = None
+                        entry["chunks"] = {key: None for key in entry.get("chunks", {})}
+
+    def reset(self):
+        """Forget everything, e.g. after the collection was recreated."""
+        self.files = {}
+
+    def is_unchanged(self, filename, digest):
+        """True when the file's content hash matches the last successful run."""
+        entry = self.files.get(filename)
+        return entry is not None and entry.get("hash") == digest
+
+    def diff_chunks(self, filename, objects):
+        """Split a file's (uuid, properties) objects into changed ones and removed UUIDs.
+
+        Returns (changed objects, removed uuids, new chunk hashes by uuid).
+        """
+        previous = self.files.get(filename, {}).get("chunks", {})
+        chunk_hashes = {}
+        changed = []
+        for uuid, properties in objects:
+            key = str(uuid)
+            digest = content_hash(properties)
+            chunk_hashes[key] = digest
+            if previous.get(key) != digest:
+                changed.append((uuid, properties))
+        removed = [key for key in previous if key not in chunk_hashes]
+        return changed, removed, chunk_hashes
+
+    def removed_files(self, filenames):
+        """Files recorded in the manifest that are no longer present."""
+        current = set(filenames)
+        return [filename for filename in self.files if filename not in current]
+
+    def chunk_ids(self, filename):
+        """UUIDs recorded for a file."""
+        return list(self.files.get(filename, {}).get("chunks", {}))
+
+    def record_file(self, filename, digest, chunk_hashes):
+        """Record a file's hashes after its chunks were written."""
+        self.files[filename] = {"hash": digest, "chunks": chunk_hashes}
+
+    def forget_file(self, filename):
+        """Drop a file that was deleted from the corpus."""
+        self.files.pop(filename, None)
+
+    def save(self):
+        """Write the manifest atomically."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"collection": self.collection, "config": self.config, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+
+def delete_objects(collection, uuids, batch_size=1000):
+    """Delete objects by UUID in batches; returns the number of UUIDs requested."""
+    uuids = list(uuids)
+    for start in range(0, len(uuids), batch_size):
+        collection.data.delete_many(
+            where=Filter.by_id().contains_any(uuids[start:start + batch_size])
+        )
+    return len(uuids)
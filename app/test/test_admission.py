@@ -0,0 +1,80 @@
+import asyncio
+from middleware.admission import ConcurrencyLimiter
+
+def test_admits_up_to_the_concurrency_limit():
+    limiter = ConcurrencyLimiter("test", concurrency=2, queue_size=0)
+
+    async def run():
+        return [await limiter.acquire(1) for _ in range(3)]
+
+    assert asyncio.run(run()) == [None, None, "queue_full"]
+    assert limiter.active == 2
+
+def test_released_slots_are_handed_to_waiters_in_order():
+    limiter = ConcurrencyLimiter("test", concurrency=1, queue_size=3)
+    admitted = []
+
+    async def request(name):
+        assert await limiter.acquire(1) is None
+        admitted.append(name)
+
+    async def run():
+        await limiter.acquire(1)
+        waiters = []
+        for name in ("first", "second", "third"):
+            waiters.append(asyncio.ensure_future(request(name)))
+            await asyncio.sleep(0)
+        assert len(limiter._waiters) == 3
+
+        for _ in waiters:
+            limiter.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiters)
+
+    asyncio.run(run())
+    assert admitted == ["first", "second", "third"]
+    # The slot went from holder to waiter to waiter without ever being free in between
+    assert limiter.active == 1
+
+def test_new_requests_cannot_overtake_the_queue():
+    limiter = ConcurrencyLimiter("test", concurrency=1, queue_size=2)
+
+    async def run():
+        await limiter.acquire(1)
+        waiter = asyncio.ensure_future(limiter.acquire(1))
+        await asyncio.sleep(0)
+        limiter.release()
+        # The freed slot belongs to the waiter, so a newcomer has to queue
+        newcomer = asyncio.ensure_future(limiter.acquire(0.01))
+        return await waiter, await newcomer
+
+    assert asyncio.run(run()) == (None, "queue_timeout")
+
+def test_queue_timeout_and_full_queue():
+    limiter = ConcurrencyLimiter("test", concurrency=1, queue_size=1)
+
+    async def run():
+        await limiter.acquire(1)
+        waiter = asyncio.ensure_future(limiter.acquire(0.02))
+        await asyncio.sleep(0)
+        full = await limiter.acquire(1)
+        return full, await waiter
+
+    assert asyncio.run(run()) == ("queue_full", "queue_timeout")
+    assert len(limiter._waiters) == 0
+    assert limiter.active == 1
+
+def test_cancelled_waiter_leaves_the_queue():
+    limiter = ConcurrencyLimiter("test", concurrency=1, queue_size=2)
+
+    async def run():
+        await limiter.acquire(1)
+        waiter = asyncio.ensure_future(limiter.acquire(1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert len(limiter._waiters) == 0
+        limiter.release()
+
+    asyncio.run(run())
+    assert limiter.active == 0
@@ -0,0 +1,71 @@
+import time
+from services.cache import SemanticCache, TTLCache, normalize_query
+
+def test_normalize_query():
+    assert normalize_query("  Insulin\n  DOSING ") == "insulin dosing"
+
+def test_ttl_cache_hits_and_expires():
+    cache = TTLCache(max_size=4, ttl=0.05)
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    time.sleep(0.06)
+    assert cache.get("key") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert cache.stats()["size"] == 0
+
+def test_ttl_cache_evicts_the_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_invalidates_by_predicate():
+    cache = TTLCache(max_size=4, ttl=60)
+    cache.set(("papers", "q1"), 1)
+    cache.set(("papers", "q2"), 2)
+    cache.set(("tables", "q1"), 3)
+
+    assert cache.invalidate(lambda key: key[0] == "papers") == 2
+    assert cache.get(("tables", "q1")) == 3
+    assert cache.invalidate() == 1
+
+def test_ttl_cache_of_size_zero_stores_nothing():
+    cache = TTLCache(max_size=0, ttl=60)
+    cache.set("key", "value")
+
+    assert cache.get("key") is None
+
+def test_semantic_cache_matches_exact_and_paraphrased_queries():
+    cache = SemanticCache(max_size=4, ttl=60, threshold=0.9)
+    cache.set("papers", "Insulin dosing?", "answer", vector=[1.0, 0.0])
+
+    assert cache.get_exact("papers", "  insulin   DOSING? ") == "answer"
+    assert cache.get_similar("papers", [0.99, 0.05]) == "answer"
+    assert cache.get_similar("papers", [0.5, 0.5]) is None
+    assert cache.stats()["semantic_hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_semantic_cache_keeps_collections_and_scopes_apart():
+    cache = SemanticCache(max_size=4, ttl=60, threshold=0.9)
+    cache.set("papers", "insulin dosing", "answer", vector=[1.0, 0.0], scope=(5,))
+
+    assert cache.get_exact("papers", "insulin dosing", (10,)) is None
+    assert cache.get_similar("tables", [1.0, 0.0], (5,)) is None
+    assert cache.get_similar("papers", [1.0, 0.0], (5,)) == "answer"
+    # Vectors of another model's dimensions are never compared
+    assert cache.get_similar("papers", [1.0, 0.0, 0.0], (5,)) is None
+
+def test_semantic_cache_expires_and_invalidates():
+    cache = SemanticCache(max_size=4, ttl=0.05, threshold=0.9)
+    cache.set("papers", "insulin dosing", "answer", vector=[1.0, 0.0])
+    cache.set("tables", "insulin dosing", "answer", vector=[1.0, 0.0], ttl=60)
+
+    time.sleep(0.06)
+    assert cache.get_similar("papers", [1.0, 0.0]) is None
+    assert cache.invalidate("tables") == 1
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,51 @@
+import asyncio
+import gzip
+from middleware.compression import CompressionMiddleware, choose_encoding, zstandard
+
+def response_app(body, content_type=b"application/json", chunks=1):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+        size = len(body) // chunks
+        for index in range(chunks):
+            last = index == chunks - 1
+            await send({"type": "http.response.body", "body": body[index * size:None if last else (index + 1) * size],
+                        "more_body": not last})
+    return app
+
+def call(app, accept_encoding="gzip", minimum_size=100):
+    """Run a request through the middleware; returns (response headers, body)"""
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=minimum_size)(scope, None, send))
+    headers = dict(messages[0]["headers"])
+    return headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+def test_choose_encoding():
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("br") is None
+    assert choose_encoding("*") == ("zstd" if zstandard else "gzip")
+    assert choose_encoding("gzip;q=1, zstd;q=0.5") == "gzip"
+
+def test_large_bodies_are_compressed():
+    body = b'{"results": [' + b'"insulin dosing",' * 200 + b'"end"]}'
+
+    headers, encoded = call(response_app(body, chunks=3))
+
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    assert gzip.decompress(encoded) == body
+
+def test_small_bodies_and_streams_pass_through():
+    headers, body = call(response_app(b'{"ok": true}'))
+    assert b"content-encoding" not in headers and body == b'{"ok": true}'
+
+    events = b"event: token\ndata: {}\n\n" * 100
+    for media_type in (b"text/event-stream", b"application/x-ndjson"):
+        headers, body = call(response_app(events, content_type=media_type, chunks=4))
+        assert b"content-encoding" not in headers and body == events
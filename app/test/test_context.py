@@ -0,0 +1,66 @@
+from services.context import ContextBuilder, Tokenizer
+
+class WordTokenizer(Tokenizer):
+    """One token per whitespace-separated word, independent of tiktoken"""
+
+    def count(self, text):
+        return len(text.split())
+
+    def truncate(self, text, max_tokens):
+        return " ".join(text.split()[:max(max_tokens, 0)])
+
+def section(parent_id, title, content):
+    return {"properties": {"parent_id": parent_id, "section_title": title,
+                           "content": f"Section: {title}\n\n{content}"}}
+
+def row(parent_id, table_id, index, cells):
+    return {"properties": {"parent_id": parent_id, "table_id": table_id, "row_index": index,
+                           "content": f"Table 1: Outcomes\n{cells}"}}
+
+def builder(budget=1000):
+    return ContextBuilder(budget=budget, tokenizer=WordTokenizer())
+
+def test_subsections_merge_under_their_section():
+    contexts = builder().pack([
+        section("paper", "Methods.Sampling", "Patients were sampled at random."),
+        section("paper", "Methods", "The trial ran for a year."),
+        section("other", "Methods", "Mice were used."),
+    ])
+
+    assert len(contexts) == 2
+    assert contexts[0]["section_title"] == "Methods"
+    assert contexts[0]["content"].index("ran for a year") < contexts[0]["content"].index("sampled at random")
+    # Its heading repeats the first document's and is dropped as already seen
+    assert contexts[1]["content"] == "Mice were used."
+
+def test_table_rows_share_one_caption_in_row_order():
+    contexts = builder().pack([
+        row("paper", "t1", 2, "arm B | 12"),
+        row("paper", "t1", 1, "arm A | 10"),
+    ])
+
+    assert contexts == [{"table_id": "t1", "content": "Table 1: Outcomes\narm A | 10\narm B | 12"}]
+
+def test_repeated_paragraphs_are_dropped():
+    contexts = builder().pack([
+        section("a", "Results", "Survival improved in both arms."),
+        section("b", "Discussion", "survival  improved in both arms."),
+    ])
+
+    # The second chunk is left with a bare heading, which is dropped as well
+    assert len(contexts) == 1
+
+def test_packing_stays_within_the_budget():
+    hits = [section(f"paper{index}", "Results", "word " * 20) for index in range(5)]
+    small = builder(budget=60)
+
+    contexts = small.pack(hits)
+
+    assert 0 < len(contexts) < 5
+    assert sum(small._tokens(context) for context in contexts) <= 60
+
+def test_first_context_is_cut_to_fit():
+    contexts = builder(budget=15).pack([section("paper", "Results", "word " * 100)])
+
+    assert len(contexts) == 1
+    assert builder()._tokens(contexts[0]) <= 15
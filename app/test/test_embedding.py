@@ -0,0 +1,77 @@
+import time
+import pytest
+import requests
+from services.embedding import CachedEmbedder, HashingEmbedder, OpenAIEmbedder, VectorCache
+from services.resilience import CircuitBreaker, CircuitOpenError, call_timeout, request_deadline
+
+class FakeResponse:
+    def __init__(self, status_code, vectors=()):
+        self.status_code = status_code
+        self.vectors = vectors
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def json(self):
+        return {"data": [{"index": index, "embedding": vector} for index, vector in reversed(list(enumerate(self.vectors)))]}
+
+class FakeSession:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.calls = []
+
+    def post(self, url, headers, json, timeout):
+        self.calls.append((json, timeout))
+        return FakeResponse(self.status_code, [[float(index)] * json["dimensions"] for index in range(len(json["input"]))])
+
+def openai_embedder(session, **options):
+    embedder = OpenAIEmbedder(model="text-embedding-3-small", batch_size=2, timeout=30, dimensions=4, **options)
+    embedder.session = session
+    return embedder
+
+def test_openai_requests_the_configured_dimensions_in_batches():
+    session = FakeSession()
+
+    vectors = openai_embedder(session).embed(["a", "b", "c"])
+
+    assert vectors == [[0.0] * 4, [1.0] * 4, [0.0] * 4]
+    assert [json["input"] for json, _ in session.calls] == [["a", "b"], ["c"]]
+    assert all(json["dimensions"] == 4 and timeout == 30 for json, timeout in session.calls)
+
+def test_openai_calls_end_by_the_request_deadline():
+    session = FakeSession()
+    embedder = openai_embedder(session, call_timeout=call_timeout)
+
+    token = request_deadline.set(time.monotonic() + 2)
+    try:
+        embedder.embed_query("insulin")
+    finally:
+        request_deadline.reset(token)
+
+    assert session.calls[0][1] <= 2
+
+def test_openai_failures_open_the_breaker():
+    session = FakeSession(status_code=503)
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+    embedder = openai_embedder(session, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            embedder.embed_query("insulin")
+    with pytest.raises(CircuitOpenError):
+        embedder.embed_query("insulin")
+    assert len(session.calls) == 2
+
+def test_cache_keys_include_the_dimensions():
+    assert OpenAIEmbedder(model="text-embedding-3-small", dimensions=256).model_name == "text-embedding-3-small-256"
+    assert HashingEmbedder(dimensions=64).model_name == "hashing-64"
+
+def test_cached_embedder_only_embeds_new_texts(tmp_path):
+    embedder = CachedEmbedder(HashingEmbedder(dimensions=8), VectorCache(str(tmp_path / "vectors.sqlite3")))
+
+    first = embedder.embed(["insulin", "survival"])
+    second = embedder.embed(["survival", "insulin", "dosing"])
+
+    assert second[:2] == [first[1], first[0]]
+    assert (embedder.hits, embedder.misses) == (2, 3)
@@ -0,0 +1,46 @@
+from services.graph_service import GraphService
+
+def weaviate_hit(hit_id, text, field="results.summary", record_index=0, chunk_index=0):
+    return {"id": hit_id, "properties": {
+        "source_file": "papers.json", "record_index": record_index, "field_name": field,
+        "sub_chunk_index": chunk_index, "field_content": text,
+    }}
+
+def neo4j_hit(hit_id, text, field="results_summary", record_index=0, chunk_index=0):
+    return {"id": hit_id, "properties": {
+        "id": hit_id, "content": text, "field_name": field, "chunk_index": chunk_index,
+        "document_id": f"papers.json_{record_index}", "source_file": "papers.json", "record_index": record_index,
+    }}
+
+def test_chunks_from_both_importers_fuse_by_position():
+    fused = GraphService.reciprocal_rank_fusion({
+        "weaviate": [
+            weaviate_hit("uuid-1", "Insulin dosing was titrated weekly."),
+            weaviate_hit("uuid-2", "Other", chunk_index=1),
+        ],
+        # Same chunk, stored with slightly different text
+        "neo4j": [neo4j_hit("papers.json_0_results_summary_0", "Insulin dosing was titrated weekly")],
+    }, k=60)
+
+    assert [entry["id"] for entry in fused] == ["uuid-1", "uuid-2"]
+    assert fused[0]["ranks"] == {"weaviate": 1, "neo4j": 1}
+    assert fused[0]["score"] == 2 / 61
+
+def test_chunks_without_a_position_fuse_by_text():
+    section = {"content": "Section: Methods\n\nPatients  were randomized.", "section_title": "Methods"}
+    fused = GraphService.reciprocal_rank_fusion({
+        "weaviate": [{"id": "a", "properties": section}],
+        "neo4j": [{"id": "b", "properties": {"content": "Section: Methods\n\nPatients were randomized."}}],
+    }, k=60)
+
+    assert len(fused) == 1 and fused[0]["ranks"] == {"weaviate": 1, "neo4j": 1}
+
+def test_other_positions_stay_apart():
+    keys = {
+        GraphService.fusion_key(weaviate_hit("a", "x")["properties"]),
+        GraphService.fusion_key(weaviate_hit("b", "x", record_index=1)["properties"]),
+        GraphService.fusion_key(weaviate_hit("c", "x", chunk_index=1)["properties"]),
+        GraphService.fusion_key(weaviate_hit("d", "x", field="methods")["properties"]),
+    }
+
+    assert len(keys) == 4
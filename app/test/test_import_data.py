@@ -0,0 +1,94 @@
+import json
+from contextlib import contextmanager
+import pytest
+
+pytest.importorskip("weaviate", exc_type=ImportError)
+pytest.importorskip("tqdm")
+
+import import_data
+from ingest_manifest import IngestManifest, file_hash
+
+class FakeCollection:
+    def __init__(self):
+        self.added = []
+        self.batch = self
+
+    @contextmanager
+    def fixed_size(self, batch_size):
+        yield self
+
+    def add_object(self, properties, uuid, vector=None):
+        self.added.append(str(uuid))
+
+    failed_objects = []
+
+class FakeClient:
+    def __init__(self, collection):
+        self.collections = self
+        self.collection = collection
+
+    def get(self, name):
+        return self.collection
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def ingest(tmp_path, monkeypatch):
+    """Run import_data.main incrementally over tmp_path / "json", parsing in-process"""
+    (tmp_path / "json").mkdir()
+    collection = FakeCollection()
+    deleted = []
+    monkeypatch.setattr(import_data, "json_dir", str(tmp_path / "json"))
+    monkeypatch.setattr(import_data, "INCREMENTAL", True)
+    monkeypatch.setattr(import_data, "CLIENT_VECTORS", False)
+    monkeypatch.setattr(import_data, "MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(import_data.weaviate_client, "get_client", lambda: FakeClient(collection))
+    monkeypatch.setattr(import_data, "create_collection", lambda *args, **kwargs: False)
+    monkeypatch.setattr(import_data, "notify_cache_invalidation", lambda name: None)
+    monkeypatch.setattr(import_data, "delete_objects", lambda collection, ids: deleted.extend(ids) or len(ids))
+    monkeypatch.setattr(import_data, "iter_files", lambda files: (
+        (filename, digest, import_data.build_objects(filepath, filename)) for filepath, filename, digest in files
+    ))
+
+    def run():
+        collection.added.clear()
+        import_data.main()
+        return list(collection.added), list(deleted)
+
+    return run
+
+def manifest(tmp_path):
+    return IngestManifest(str(tmp_path / "manifest.json"), import_data.COLLECTION_NAME, {
+        "max_chunk_size": import_data.MAX_CHUNK_SIZE, "vectors": "server"
+    })
+
+def test_unparsable_file_is_skipped():
+    assert import_data.process_json_file(__file__, "test_import_data.py") is None
+    assert import_data.build_objects(__file__, "test_import_data.py") is None
+
+def test_failed_parse_keeps_the_previous_chunks(tmp_path, ingest):
+    path = tmp_path / "json" / "papers.json"
+    path.write_text(json.dumps([{"title": "Insulin dosing"}, {"title": "Survival"}]))
+    added, deleted = ingest()
+    assert len(added) == 2
+    recorded = manifest(tmp_path).files["papers.json"]
+
+    path.write_text('[{"title": "Insulin dosing"},')
+    added, deleted = ingest()
+
+    assert added == [] and deleted == []
+    # Left as it was, so the next run retries the file
+    assert manifest(tmp_path).files["papers.json"] == recorded
+    assert not manifest(tmp_path).is_unchanged("papers.json", file_hash(str(path)))
+
+def test_emptied_file_removes_its_chunks(tmp_path, ingest):
+    path = tmp_path / "json" / "papers.json"
+    path.write_text(json.dumps([{"title": "Insulin dosing"}]))
+    added, _ = ingest()
+
+    path.write_text("[]")
+    _, deleted = ingest()
+
+    assert deleted == added
+    assert manifest(tmp_path).files["papers.json"]["chunks"] == {}
@@ -0,0 +1,52 @@
+import pytest
+from services.metrics import MetricsRegistry, current_route, stage_latency, time_stage
+
+def test_counter_and_gauge_render_per_label_set():
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests", ("route",))
+    in_flight = registry.gauge("test_in_flight", "In flight")
+    requests.inc(route="/search")
+    requests.inc(2, route='/say "hi"')
+    in_flight.set_function(lambda: 3)
+
+    text = registry.render()
+
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{route="/search"} 1' in text
+    assert 'test_requests_total{route="/say \\"hi\\""} 2' in text
+    assert "test_in_flight 3" in text
+    assert text.endswith("\n")
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value, stage="retrieval")
+
+    text = registry.render()
+
+    assert 'test_latency_seconds_bucket{stage="retrieval",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="retrieval",le="1"} 3' in text
+    assert 'test_latency_seconds_bucket{stage="retrieval",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_sum{stage="retrieval"} 6.05' in text
+    assert 'test_latency_seconds_count{stage="retrieval"} 4' in text
+
+def test_labels_and_names_are_checked():
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests", ("route",))
+
+    with pytest.raises(ValueError):
+        requests.inc(stage="retrieval")
+    with pytest.raises(ValueError):
+        registry.counter("test_requests_total", "Requests again")
+
+def test_stages_are_recorded_under_the_current_route():
+    token = current_route.set("/test/route")
+    try:
+        with pytest.raises(RuntimeError):
+            with time_stage("retrieval"):
+                raise RuntimeError()
+    finally:
+        current_route.reset(token)
+
+    assert stage_latency.count(route="/test/route", stage="retrieval") == 1
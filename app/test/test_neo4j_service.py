@@ -0,0 +1,63 @@
+import pytest
+from services.neo4j_service import Neo4jService
+from models.schema import Neo4jQueryRequest
+
+QUERY = "MATCH (c:Chunk) RETURN c.id AS id ORDER BY c.id"
+
+def test_cursor_round_trip():
+    request = Neo4jQueryRequest(query=QUERY, parameters={"a": 1, "b": 2}, page_size=10)
+    cursor = Neo4jService.encode_cursor(request, 30)
+
+    # Parameter order does not matter
+    same = Neo4jQueryRequest(query=QUERY, parameters={"b": 2, "a": 1}, page_size=10, cursor=cursor)
+    assert Neo4jService.decode_cursor(same) == 30
+
+def test_cursor_rejects_another_query_or_garbage():
+    cursor = Neo4jService.encode_cursor(Neo4jQueryRequest(query=QUERY, parameters={"a": 1}), 10)
+
+    with pytest.raises(ValueError, match="does not match"):
+        Neo4jService.decode_cursor(Neo4jQueryRequest(query=QUERY, parameters={"a": 2}, cursor=cursor))
+    with pytest.raises(ValueError, match="does not match"):
+        Neo4jService.decode_cursor(Neo4jQueryRequest(query="MATCH (n) RETURN n", cursor=cursor))
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        Neo4jService.decode_cursor(Neo4jQueryRequest(query=QUERY, cursor="not-a-cursor"))
+
+def test_pages_are_cut_on_the_server():
+    request = Neo4jQueryRequest(query=QUERY + ";", parameters={"a": 1}, page_size=10)
+
+    query, parameters = Neo4jService._page_query(request, 20, 10)
+
+    assert query.startswith("CALL {\n" + QUERY + "\n}")
+    assert query.endswith("SKIP $_page_skip LIMIT $_page_limit")
+    assert parameters == {"a": 1, "_page_skip": 20, "_page_limit": 11}
+    assert request.parameters == {"a": 1}
+
+def test_unpaged_queries_run_unchanged():
+    request = Neo4jQueryRequest(query=QUERY)
+
+    assert Neo4jService._page_query(request, 0) == (QUERY, {})
+
+@pytest.mark.parametrize("query, read_only", [
+    ("MATCH (n) RETURN n", True),
+    ("MATCH (n) WHERE n.name = 'Set' RETURN n", True),
+    ("MATCH (n) // DELETE later\nRETURN n", True),
+    ("CREATE (n:Chunk) RETURN n", False),
+    ("MATCH (n) SET n.seen = true RETURN n", False),
+    ("CALL apoc.create.node(['Chunk'], {}) YIELD node RETURN node", False),
+    ("CALL db.labels() YIELD label RETURN label", True),
+    ("CALL db.index.fulltext.queryNodes('chunk_content', 'insulin') YIELD node RETURN node", True),
+    ("CALL apoc.meta.schema() YIELD value RETURN value", True),
+    ("CALL { MATCH (n) RETURN n } RETURN n", True),
+    ("MATCH (n) CALL (n) { MATCH (n)--(m) RETURN m } RETURN m", True),
+    ("MATCH (n) CALL db.create.setNodeVectorProperty(n, 'embedding', $vector)", False),
+    ("CALL db.index.fulltext.createNodeIndex('chunks', ['Chunk'], ['content'])", False),
+    ("CALL dbms.security.createUser('reader', 'secret')", False),
+    ("CALL apoc.refactor.mergeNodes($nodes)", False),
+    ("CALL `db`.labels()", False),
+    ("CALL custom.procedure()", False),
+])
+def test_is_read_only(query, read_only):
+    assert Neo4jService.is_read_only(Neo4jQueryRequest(query=query)) is read_only
+
+def test_explicit_read_only_flag_wins():
+    assert Neo4jService.is_read_only(Neo4jQueryRequest(query="CREATE (n) RETURN n", read_only=True)) is True
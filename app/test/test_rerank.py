@@ -0,0 +1,54 @@
+import numpy as np
+from services.rerank import BM25Scorer, Reranker, mmr
+
+def hit(hit_id, content, vector=None):
+    hit = {"id": hit_id, "properties": {"content": content}}
+    if vector is not None:
+        hit["vector"] = vector
+    return hit
+
+def test_bm25_prefers_documents_with_rare_query_terms():
+    scores = BM25Scorer().score("insulin dosing", [
+        "insulin dosing was titrated weekly",
+        "dosing of the placebo arm",
+        "median overall survival",
+    ])
+
+    assert scores[0] > scores[1] > scores[2] == 0
+
+def test_strong_hybrid_hit_survives_without_a_query_vector():
+    # The top hybrid hit matches the question semantically but shares few of its keywords
+    hits = [
+        hit("semantic", "Glucose control improved after the basal regimen was adjusted"),
+        hit("keywords", "Insulin dosing insulin dosing schedule listed in the appendix"),
+        hit("weak", "Adverse events recorded on the dosing schedule"),
+    ]
+
+    reranked = Reranker(vector_weight=0.5, lambda_=1.0).rerank("insulin dosing schedule", None, hits, 2)
+
+    assert [result["id"] for result in reranked] == ["keywords", "semantic"]
+
+def test_without_a_retrieval_weight_only_the_scorer_ranks():
+    hits = [hit("first", "unrelated text"), hit("second", "insulin dosing")]
+
+    reranked = Reranker(vector_weight=0.0).rerank("insulin dosing", None, hits, 2)
+
+    assert [result["id"] for result in reranked] == ["second", "first"]
+
+def test_query_vector_similarity_is_blended_in_and_vectors_are_dropped():
+    hits = [
+        hit("keywords", "insulin dosing", [0.0, 1.0]),
+        hit("similar", "glucose control", [1.0, 0.0]),
+    ]
+
+    reranked = Reranker(vector_weight=0.8, lambda_=1.0).rerank("insulin dosing", [1.0, 0.1], hits, 2)
+
+    assert [result["id"] for result in reranked] == ["similar", "keywords"]
+    assert all("vector" not in result for result in reranked)
+    assert reranked[0]["rerank_score"] > reranked[1]["rerank_score"]
+
+def test_mmr_skips_near_duplicates():
+    vectors = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    relevance = np.array([1.0, 0.9, 0.5], dtype=np.float32)
+
+    assert mmr(relevance, vectors, 3, lambda_=0.7, duplicate_threshold=0.97) == [0, 2]
@@ -0,0 +1,140 @@
+import asyncio
+import time
+import pytest
+from services.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, call_timeout, remaining, request_deadline, with_deadline
+)
+
+class BackendError(Exception):
+    pass
+
+def breaker(**options):
+    options = {"failure_threshold": 2, "recovery_timeout": 0.05, "half_open_probes": 1, **options}
+    return CircuitBreaker("test", **options)
+
+def fail(circuit):
+    with pytest.raises(BackendError):
+        with circuit:
+            raise BackendError()
+
+def test_circuit_opens_after_consecutive_failures():
+    circuit = breaker()
+    fail(circuit)
+    assert circuit.state == CircuitBreaker.CLOSED
+    fail(circuit)
+    assert circuit.state == CircuitBreaker.OPEN
+    assert circuit.is_open()
+
+    with pytest.raises(CircuitOpenError) as error:
+        with circuit:
+            pytest.fail("an open circuit must not reach the backend")
+    assert 0 < error.value.retry_after <= 0.05
+
+def test_success_resets_the_failure_count():
+    circuit = breaker()
+    fail(circuit)
+    with circuit:
+        pass
+    fail(circuit)
+    assert circuit.state == CircuitBreaker.CLOSED
+
+def test_half_open_probe_closes_the_circuit():
+    circuit = breaker()
+    fail(circuit)
+    fail(circuit)
+    time.sleep(0.06)
+    assert not circuit.is_open()
+
+    with circuit:
+        assert circuit.state == CircuitBreaker.HALF_OPEN
+        # Only one probe at a time while half-open
+        with pytest.raises(CircuitOpenError):
+            with circuit:
+                pass
+
+    assert circuit.state == CircuitBreaker.CLOSED
+    with circuit:
+        pass
+
+def test_failed_probe_reopens_the_circuit():
+    circuit = breaker()
+    fail(circuit)
+    fail(circuit)
+    time.sleep(0.06)
+
+    fail(circuit)
+
+    assert circuit.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call()
+
+def test_errors_that_are_not_failures_release_the_probe():
+    circuit = breaker(is_failure=lambda error: not isinstance(error, ValueError))
+    fail(circuit)
+    fail(circuit)
+    time.sleep(0.06)
+
+    with pytest.raises(ValueError):
+        with circuit:
+            raise ValueError("the request's own fault")
+
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    with circuit:
+        pass
+    assert circuit.state == CircuitBreaker.CLOSED
+
+def test_breaker_as_decorator():
+    circuit = breaker(failure_threshold=1)
+    calls = []
+
+    @circuit
+    def call(should_fail):
+        calls.append(should_fail)
+        if should_fail:
+            raise BackendError()
+        return "ok"
+
+    with pytest.raises(BackendError):
+        call(True)
+    with pytest.raises(CircuitOpenError):
+        call(False)
+    assert calls == [True]
+
+def test_call_timeout_is_capped_by_the_deadline():
+    token = request_deadline.set(time.monotonic() + 2)
+    try:
+        assert call_timeout(30) <= 2
+        assert call_timeout(1) == 1
+    finally:
+        request_deadline.reset(token)
+    assert remaining() is None
+    assert call_timeout(30) == 30
+
+def test_call_timeout_refuses_to_start_after_the_deadline():
+    token = request_deadline.set(time.monotonic() - 1)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            call_timeout(30, "retrieval")
+    finally:
+        request_deadline.reset(token)
+
+def test_with_deadline_abandons_the_wait():
+    async def run():
+        request_deadline.set(time.monotonic() + 0.05)
+        assert await with_deadline(asyncio.sleep(0, result="fast")) == "fast"
+        with pytest.raises(DeadlineExceeded):
+            await with_deadline(asyncio.sleep(1), "search")
+
+    asyncio.run(run())
+
+def test_with_deadline_keeps_a_backend_timeout_as_it_is():
+    async def backend_timeout():
+        raise asyncio.TimeoutError()
+
+    async def run():
+        request_deadline.set(time.monotonic() + 10)
+        with pytest.raises(asyncio.TimeoutError) as error:
+            await with_deadline(backend_timeout())
+        assert not isinstance(error.value, DeadlineExceeded)
+
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+import pytest
+from services.embedding import HashingEmbedder
+from services.retrieval import LocalBackend, RetrievalBackend
+from services.vector_index import VectorIndex
+
+CHUNKS = {
+    "a": ("Insulin dosing was titrated weekly", {"chunk_type": "section", "section_title": "Methods"}),
+    "b": ("Insulin dosing in type 2 diabetes", {"chunk_type": "table", "section_title": "Results"}),
+    "c": ("Median overall survival by cohort", {"chunk_type": "table", "section_title": "Results"}),
+    "d": ("Adverse events during the trial", {"chunk_type": "section", "section_title": "Safety"}),
+}
+
+@pytest.fixture
+def embedder():
+    return HashingEmbedder(dimensions=64)
+
+@pytest.fixture
+def backend(embedder):
+    index = VectorIndex()
+    index.add(
+        list(CHUNKS),
+        embedder.embed([text for text, _ in CHUNKS.values()]),
+        [{"content": text, **properties} for text, properties in CHUNKS.values()]
+    )
+    return LocalBackend(index=index)
+
+def test_local_search_ranks_filters_and_projects(backend, embedder):
+    vector = embedder.embed_query("insulin dosing")
+
+    hits = backend.search("insulin dosing", vector, 2)
+    assert {hit["id"] for hit in hits} == {"a", "b"}
+
+    hits = backend.search("insulin dosing", vector, 4, filters={"chunk_type": ["table"]})
+    assert {hit["id"] for hit in hits} == {"b", "c"}
+
+    hits = backend.search("insulin dosing", vector, 1, return_properties=["section_title"])
+    assert hits[0]["properties"] == {"section_title": CHUNKS[hits[0]["id"]][1]["section_title"]}
+
+def test_local_search_auto_limit_cuts_at_the_first_jump(backend, embedder):
+    vector = embedder.embed_query("insulin dosing")
+    everything = backend.search("insulin dosing", vector, 4)
+
+    hits = backend.search("insulin dosing", vector, 4, auto_limit=1)
+
+    assert 1 <= len(hits) < len(everything)
+    assert [hit["id"] for hit in hits] == [hit["id"] for hit in everything[:len(hits)]]
+
+def test_local_search_needs_a_query_vector(backend):
+    with pytest.raises(ValueError):
+        backend.search("insulin dosing", None, 2)
+
+def test_local_fetch_skips_unknown_ids(backend):
+    objects = backend.fetch(["c", "missing", "a"], ["content"])
+
+    assert [obj["id"] for obj in objects] == ["c", "a"]
+    assert objects[0]["properties"] == {"content": CHUNKS["c"][0]}
+
+def test_backends_must_implement_retrieval():
+    class SearchOnly(RetrievalBackend):
+        def search(self, *args, **kwargs):
+            return []
+
+    with pytest.raises(TypeError):
+        SearchOnly()
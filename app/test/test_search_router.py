@@ -0,0 +1,25 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from routers import search
+from app.config import settings
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(search.router, prefix="/api/search")
+    return TestClient(app)
+
+def test_cache_invalidation_needs_the_admin_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ADMIN_TOKEN", "secret")
+
+    assert client.post("/api/search/cache/invalidate").status_code == 403
+    assert client.post("/api/search/cache/invalidate", headers={"X-Cache-Admin-Token": "guess"}).status_code == 403
+
+    response = client.post("/api/search/cache/invalidate", headers={"X-Cache-Admin-Token": "secret"})
+    assert response.status_code == 200 and response.json()["success"]
+
+def test_cache_invalidation_is_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ADMIN_TOKEN", None)
+
+    assert client.post("/api/search/cache/invalidate", headers={"X-Cache-Admin-Token": ""}).status_code == 403
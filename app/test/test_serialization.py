@@ -0,0 +1,37 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+from fastapi.encoders import jsonable_encoder
+from services.serialization import FastJSONResponse, SearchHit, dumps, fast_json_endpoint
+from models.schema import SearchResponse
+
+def test_search_hit_reads_like_a_dict():
+    hit = SearchHit("a", {"content": "Insulin dosing"}, 0.25)
+
+    assert dict(hit) == {"id": "a", "properties": {"content": "Insulin dosing"}, "score": 0.25}
+    assert hit["score"] == 0.25 and hit.get("vector") is None
+    with pytest.raises(KeyError):
+        hit["vector"]
+    assert "vector" in SearchHit("a", {}, 0.25, [0.1, 0.2])
+
+def test_fast_encoding_matches_the_response_model():
+    hits = [SearchHit("a", {"content": "Insulin dosing", "row_index": np.int64(3)}, np.float32(0.5))]
+    fields = {"success": True, "results": hits, "count": 1, "message": "Found 1 results"}
+
+    fast = json.loads(dumps(SearchResponse.construct(**fields)))
+
+    validated = SearchResponse(**{**fields, "results": [
+        {"id": "a", "properties": {"content": "Insulin dosing", "row_index": 3}, "score": 0.5}
+    ]})
+    assert fast == jsonable_encoder(validated)
+
+def test_fast_json_endpoint_wraps_results_but_keeps_responses():
+    @fast_json_endpoint
+    async def endpoint(wrap):
+        return {"ids": ("a", "b")} if wrap else FastJSONResponse({"already": "encoded"})
+
+    response = asyncio.run(endpoint(True))
+    assert isinstance(response, FastJSONResponse)
+    assert json.loads(response.body) == {"ids": ["a", "b"]}
+    assert json.loads(asyncio.run(endpoint(False)).body) == {"already": "encoded"}
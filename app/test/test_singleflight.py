@@ -0,0 +1,122 @@
+import asyncio
+import time
+import pytest
+from services.resilience import current_deadline, request_deadline
+from services.singleflight import SingleFlight
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*[flight.do("key", work) for _ in range(5)])
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert calls == [1]
+    assert len(flight) == 0
+
+def test_results_are_not_kept_after_completion():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        return [await flight.do("key", work), await flight.do("key", work)]
+
+    assert asyncio.run(run()) == [1, 2]
+
+def test_exceptions_reach_every_caller():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(*[flight.do("key", work) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_cancelling_one_caller_keeps_the_work_for_the_others():
+    flight = SingleFlight("test")
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(0.05)
+            return "result"
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "result"
+    assert cancelled == []
+
+def test_work_is_cancelled_once_no_caller_is_left():
+    flight = SingleFlight("test")
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        caller = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [1]
+    assert len(flight) == 0
+
+def test_shared_work_runs_to_the_latest_deadline():
+    flight = SingleFlight("test")
+    seen = []
+
+    async def work():
+        await asyncio.sleep(0.02)
+        seen.append(current_deadline())
+
+    async def caller(timeout):
+        request_deadline.set(None if timeout is None else time.monotonic() + timeout)
+        await flight.do("key", work)
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(caller(1), caller(30))
+        return started
+
+    started = asyncio.run(run())
+    assert seen[0] - started > 29
+
+    seen.clear()
+
+    async def run_without_deadline():
+        await asyncio.gather(caller(1), caller(None))
+
+    asyncio.run(run_without_deadline())
+    assert seen == [None]
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from services.embedding import HashingEmbedder
+from services.vector_index import VectorIndex, autocut
+
+DOCUMENTS = [
+    ("a", "insulin dosing was titrated weekly", {"chunk_type": "section", "doi": "10.1/a"}),
+    ("b", "insulin dosing in type 2 diabetes", {"chunk_type": "table", "doi": "10.1/a"}),
+    ("c", "progression free survival with trastuzumab", {"chunk_type": "section", "doi": "10.1/b"}),
+    ("d", "median overall survival by cohort", {"chunk_type": "table", "doi": "10.1/b"}),
+    ("e", "adverse events during the trial", {"chunk_type": "section", "doi": "10.1/c"}),
+]
+
+@pytest.fixture
+def embedder():
+    return HashingEmbedder(dimensions=64)
+
+@pytest.fixture
+def index(embedder):
+    index = VectorIndex()
+    index.add(
+        [object_id for object_id, _, _ in DOCUMENTS],
+        embedder.embed([text for _, text, _ in DOCUMENTS]),
+        [{"content": text, **properties} for _, text, properties in DOCUMENTS]
+    )
+    return index
+
+def brute_force(index, vector, limit):
+    """Reference ranking: every stored vector scored by cosine distance"""
+    query = np.asarray(vector, dtype=np.float32)
+    query /= np.linalg.norm(query)
+    distances = 1.0 - index.matrix @ query
+    return [index._ids[row] for row in np.argsort(distances, kind="stable")[:limit]]
+
+def test_search_returns_top_k_by_cosine_distance(index, embedder):
+    vector = embedder.embed_query("insulin dosing")
+    hits = index.search(vector, 3)
+
+    assert [hit["id"] for hit in hits] == brute_force(index, vector, 3)
+    assert hits[0]["id"] in ("a", "b")
+    assert [hit["score"] for hit in hits] == sorted(hit["score"] for hit in hits)
+
+def test_search_offset_continues_the_ranking(index, embedder):
+    vector = embedder.embed_query("survival")
+    everything = [hit["id"] for hit in index.search(vector, 5)]
+
+    assert [hit["id"] for hit in index.search(vector, 2, offset=2)] == everything[2:4]
+    assert index.search(vector, 2, offset=5) == []
+
+def test_search_applies_filters(index, embedder):
+    vector = embedder.embed_query("insulin dosing")
+
+    hits = index.search(vector, 5, filters={"chunk_type": "table"})
+    assert {hit["id"] for hit in hits} == {"b", "d"}
+
+    hits = index.search(vector, 5, filters={"doi": ["10.1/b", "10.1/c"], "chunk_type": "section"})
+    assert {hit["id"] for hit in hits} == {"c", "e"}
+
+    assert index.search(vector, 5, filters={"doi": "10.1/missing"}) == []
+
+def test_ivf_probing_every_list_matches_exact_search():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16))
+    index = VectorIndex()
+    index.add([str(i) for i in range(200)], vectors)
+    query = rng.normal(size=16)
+    exact = [hit["id"] for hit in index.search(query, 10)]
+
+    index.build_ivf(8)
+
+    assert [hit["id"] for hit in index.search(query, 10, nprobe=8)] == exact
+    probed = index.search(query, 10, nprobe=2)
+    assert 0 < len(probed) <= 10
+    assert set(hit["id"] for hit in probed) <= set(str(i) for i in range(200))
+
+def test_ivf_assigns_rows_added_after_building():
+    rng = np.random.default_rng(1)
+    index = VectorIndex()
+    index.add([str(i) for i in range(50)], rng.normal(size=(50, 8)))
+    index.build_ivf(4)
+    vector = rng.normal(size=8)
+
+    index.add(["new"], [vector])
+
+    assert index.search(vector, 1, nprobe=1)[0]["id"] == "new"
+
+def test_delete_and_replace(index, embedder):
+    assert index.delete(["a", "missing"]) == 1
+    assert len(index) == 4
+    assert index.get(["a"]) == []
+
+    vector = embedder.embed_query("completely different text")
+    index.add(["e"], [vector], [{"content": "replaced"}])
+    assert len(index) == 4
+    assert index.search(vector, 1)[0]["properties"] == {"content": "replaced"}
+
+def test_save_and_load_round_trip(index, embedder, tmp_path):
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    loaded = VectorIndex.load(path)
+
+    vector = embedder.embed_query("insulin dosing")
+    assert loaded.search(vector, 5) == index.search(vector, 5)
+
+def test_load_refuses_pickled_arrays(tmp_path):
+    path = str(tmp_path / "index.npz")
+    np.savez(
+        path,
+        vectors=np.eye(2, dtype=np.float32),
+        ids=np.asarray(["a", "b"], dtype=object),
+        properties=np.asarray("[{}, {}]")
+    )
+
+    with pytest.raises(ValueError):
+        VectorIndex.load(path)
+
+@pytest.mark.parametrize("distances, jumps, expected", [
+    ([0.1, 0.11, 0.12, 0.5, 0.51, 0.52], 1, 3),
+    ([0.1, 0.11, 0.12, 0.5, 0.51, 0.9], 2, 5),
+    ([0.2, 0.2, 0.2], 1, 3),
+    ([0.1, 0.5], 1, 2),
+    ([0.1, 0.11, 0.9], 0, 3),
+])
+def test_autocut(distances, jumps, expected):
+    assert autocut(distances, jumps) == expected
@@ -0,0 +1,156 @@
+import asyncio
+import pytest
+from services import weaviate_service
+from services.retrieval import LocalBackend
+from services.vector_index import VectorIndex
+from services.weaviate_service import WeaviateService, embedder
+from app.config import settings
+from models.schema import GenerativeRequest, ObjectsRequest, SearchRequest, SearchFilters
+
+CHUNKS = {
+    "a": "Insulin dosing was titrated weekly",
+    "b": "Median overall survival by cohort",
+    "c": "Adverse events during the trial",
+}
+
+class CountingBackend(LocalBackend):
+    def __init__(self, index):
+        super().__init__(index=index)
+        self.searches = 0
+
+    def search(self, *args, **kwargs):
+        self.searches += 1
+        return super().search(*args, **kwargs)
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Serve WeaviateService from an in-process index, with empty caches"""
+    index = VectorIndex()
+    index.add(list(CHUNKS), embedder.embed(list(CHUNKS.values())),
+              [{"content": text, "source_file": "paper.json"} for text in CHUNKS.values()])
+    backend = CountingBackend(index)
+    monkeypatch.setattr(weaviate_service, "backend", backend)
+    monkeypatch.setattr(settings, "CLIENT_QUERY_EMBEDDING", True)
+    WeaviateService.invalidate_cache()
+    yield backend
+    WeaviateService.invalidate_cache()
+
+def test_search_cursor_round_trip():
+    request = SearchRequest(query="insulin dosing", filters=SearchFilters(chunk_type="table"))
+    cursor = WeaviateService.encode_cursor(request, 20)
+
+    assert WeaviateService.decode_cursor(SearchRequest(query="  Insulin   dosing ", cursor=cursor,
+                                                       filters=SearchFilters(chunk_type=["table"]))) == 20
+
+def test_search_cursor_rejects_another_search_or_garbage():
+    cursor = WeaviateService.encode_cursor(SearchRequest(query="insulin dosing"), 10)
+
+    with pytest.raises(ValueError, match="does not match"):
+        WeaviateService.decode_cursor(SearchRequest(query="survival", cursor=cursor))
+    with pytest.raises(ValueError, match="does not match"):
+        WeaviateService.decode_cursor(SearchRequest(
+            query="insulin dosing", cursor=cursor, filters=SearchFilters(chunk_type="table")
+        ))
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        WeaviateService.decode_cursor(SearchRequest(query="insulin dosing", cursor="not-a-cursor"))
+
+def test_request_error_reports_conflicting_paging():
+    cursor = WeaviateService.encode_cursor(SearchRequest(query="q"), 10)
+
+    assert WeaviateService.request_error(SearchRequest(query="q", offset=5, cursor=cursor)) is not None
+    assert WeaviateService.request_error(SearchRequest(query="q", limit=0)) is not None
+    assert WeaviateService.request_error(SearchRequest(query="q", cursor=cursor)) is None
+
+def test_repeated_search_is_served_from_the_cache(backend):
+    first = WeaviateService.semantic_search(SearchRequest(query="insulin dosing", limit=2))
+    second = WeaviateService.semantic_search(SearchRequest(query="  Insulin  dosing", limit=2))
+
+    assert first.success and second is first
+    assert backend.searches == 1
+
+    WeaviateService.semantic_search(SearchRequest(query="insulin dosing", limit=3))
+    assert backend.searches == 2
+
+def test_invalidation_drops_cached_searches(backend):
+    WeaviateService.semantic_search(SearchRequest(query="insulin dosing", limit=2))
+
+    assert WeaviateService.invalidate_cache("another collection") == 0
+    assert WeaviateService.invalidate_cache(settings.COLLECTION_NAME) == 1
+    WeaviateService.semantic_search(SearchRequest(query="insulin dosing", limit=2))
+    assert backend.searches == 2
+
+class FakeStream:
+    """Answer fragments from a generation stream that records whether it was closed"""
+
+    def __init__(self, fragments):
+        self.fragments = iter(fragments)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.fragments)
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def streams(backend, monkeypatch):
+    streams = []
+
+    def stream(query, contexts, task=None):
+        streams.append(FakeStream(["Insulin ", "was ", "titrated."]))
+        return streams[-1]
+
+    monkeypatch.setattr(weaviate_service.generator, "stream", stream)
+    return streams
+
+def collect(gen_request, stop_after=None):
+    async def run():
+        events = []
+        stream = WeaviateService.generative_search_stream(gen_request)
+        async for event, data in stream:
+            events.append((event, data))
+            if event == stop_after:
+                await stream.aclose()
+                break
+        return events
+
+    return asyncio.run(run())
+
+def test_streamed_answer_is_cached_with_its_query_vector(streams):
+    events = collect(GenerativeRequest(query="insulin dosing", limit=2))
+
+    assert [event for event, _ in events] == ["sources", "token", "token", "token", "done"]
+    assert events[-1][1] == {"generated_text": "Insulin was titrated.", "cached": False}
+    assert streams[0].closed
+
+    cached = collect(GenerativeRequest(query="Insulin  dosing", limit=2))
+    assert cached[-1][1] == {"generated_text": "Insulin was titrated.", "cached": True}
+    assert len(streams) == 1
+    # Stored with the query vector, so paraphrases can match it
+    vector = WeaviateService.embed_generation_query("insulin dosing")
+    scope = WeaviateService._generation_scope(GenerativeRequest(query="insulin dosing", limit=2))
+    assert weaviate_service.answer_cache.get_similar(settings.COLLECTION_NAME, vector, scope) is not None
+
+def test_stream_is_closed_when_the_client_goes_away(streams):
+    gen_request = GenerativeRequest(query="insulin dosing", limit=2)
+    events = collect(gen_request, stop_after="token")
+
+    assert events[-1] == ("token", {"text": "Insulin "})
+    assert streams[0].closed
+    # A partial answer is not cached
+    scope = WeaviateService._generation_scope(gen_request)
+    assert weaviate_service.answer_cache.get_exact(settings.COLLECTION_NAME, gen_request.query, scope) is None
+
+def test_search_projects_properties_and_hydrates_metadata_only_hits(backend):
+    projected = WeaviateService.semantic_search(SearchRequest(query="insulin", limit=1, return_properties=["source_file"]))
+    assert projected.results[0]["properties"] == {"source_file": "paper.json"}
+
+    hits = WeaviateService.semantic_search(SearchRequest(query="insulin", limit=2, metadata_only=True)).results
+    assert all(set(hit) == {"id", "score"} for hit in hits)
+
+    objects = WeaviateService.fetch_objects(ObjectsRequest(ids=[hit["id"] for hit in hits] + ["missing"]))
+    assert [obj["id"] for obj in objects.results] == [hit["id"] for hit in hits]
+    assert objects.missing == ["missing"]
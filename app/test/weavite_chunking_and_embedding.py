@@ -1,10 +1,15 @@
 import weaviate
 import weaviate.classes.config as wvc
 import os
+import sys
 import json
+import requests
 from tqdm import tqdm
 import warnings
 from dotenv import load_dotenv
+from ingest_manifest import IngestManifest, file_hash, delete_objects
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from app.services.embedding import get_cached_embedder
 load_dotenv()
 
 # --- Configuration ---
@@ -13,6 +18,14 @@ WEAVIATE_API_KEY = os.getenv("WEAVIATE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 COLLECTION_NAME = "Medical_Paper_RAG"
 JSON_FILE_PATH = "./json_files/NEJMoa2203690.json"
+# Base URL of the running RAG API and its CACHE_ADMIN_TOKEN, used to invalidate its search cache after ingestion
+RAG_API_URL = os.getenv("RAG_API_URL")
+CACHE_ADMIN_TOKEN = os.getenv("CACHE_ADMIN_TOKEN")
+# Incremental mode keeps the collection and only writes chunks whose content hash changed
+INCREMENTAL = os.getenv("INGEST_INCREMENTAL", "false").lower() == "true"
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", f".ingest_manifest_{COLLECTION_NAME}.json")
+# Compute vectors here (through the on-disk vector cache) instead of having Weaviate vectorize objects
+CLIENT_VECTORS = os.getenv("INGEST_CLIENT_VECTORS", "false").lower() == "true"
 
 # --- 1. Connect to Weaviate ---
 def setup_weaviate_client():
@@ -31,28 +44,37 @@ def setup_weaviate_client():
     return client
 
 # --- 2. Define and Create Collection Schema ---
-def create_collection_schema(client: weaviate.WeaviateClient):
-    """Defines and creates the collection in Weaviate."""
+def create_collection_schema(client: weaviate.WeaviateClient, recreate: bool = True):
+    """Defines and creates the collection in Weaviate, or keeps it when recreate is False."""
     if client.collections.exists(COLLECTION_NAME):
+        if not recreate:
+            print(f"Collection '{COLLECTION_NAME}' already exists. Updating incrementally.")
+            return None
         print(f"Collection '{COLLECTION_NAME}' already exists. Deleting and recreating.")
         client.collections.delete(COLLECTION_NAME)
 
     print(f"Creating collection '{COLLECTION_NAME}'...")
     collection = client.collections.create(
         name=COLLECTION_NAME,
-        vectorizer_config=wvc.Configure.Vectorizer.text2vec_openai(),
+        vectorizer_config=wvc.Configure.Vectorizer.none() if CLIENT_VECTORS else wvc.Configure.Vectorizer.text2vec_openai(),
         generative_config=wvc.Configure.Generative.openai(),
+        # Properties the API filters on are indexed as whole values, so filters match them exactly
+        # (word tokenization would match any word, case-insensitively); existing collections need re-ingesting
         properties=[
             wvc.Property(name="content", data_type=wvc.DataType.TEXT),
-            wvc.Property(name="chunk_type", data_type=wvc.DataType.TEXT),
+            wvc.Property(name="chunk_type", data_type=wvc.DataType.TEXT, tokenization=wvc.Tokenization.FIELD),
             wvc.Property(name="document_title", data_type=wvc.DataType.TEXT),
             wvc.Property(name="parent_id", data_type=wvc.DataType.TEXT),
-            wvc.Property(name="section_title", data_type=wvc.DataType.TEXT, skip_vectorization=True),
-            wvc.Property(name="table_id", data_type=wvc.DataType.TEXT, skip_vectorization=True),
+            wvc.Property(name="section_title", data_type=wvc.DataType.TEXT, skip_vectorization=True,
+                         tokenization=wvc.Tokenization.FIELD),
+            wvc.Property(name="table_id", data_type=wvc.DataType.TEXT, skip_vectorization=True,
+                         tokenization=wvc.Tokenization.FIELD),
             wvc.Property(name="figure_id", data_type=wvc.DataType.TEXT, skip_vectorization=True),
             wvc.Property(name="row_index", data_type=wvc.DataType.INT, skip_vectorization=True),
-            wvc.Property(name="source_file", data_type=wvc.DataType.TEXT, skip_vectorization=True),
-            wvc.Property(name="doi", data_type=wvc.DataType.TEXT, skip_vectorization=True),
+            wvc.Property(name="source_file", data_type=wvc.DataType.TEXT, skip_vectorization=True,
+                         tokenization=wvc.Tokenization.FIELD),
+            wvc.Property(name="doi", data_type=wvc.DataType.TEXT, skip_vectorization=True,
+                         tokenization=wvc.Tokenization.FIELD),
         ]
     )
     print("Collection created successfully.")
@@ -75,85 +97,127 @@ def format_table_row_content(row_data: dict, columns: list) -> str:
     return " | ".join(parts)
 
 # --- 4. Main Ingestion Logic ---
-def ingest_medical_paper(client: weaviate.WeaviateClient, filepath: str):
-    """Reads, chunks, and ingests a medical paper from a JSON file."""
+def iter_medical_paper_objects(doc: dict, source_file: str):
+    """Chunks a medical paper into (uuid, properties) pairs with deterministic UUIDs."""
+    # --- Document Metadata ---
+    doc_meta = doc.get('document_metadata', {})
+    doc_title = doc_meta.get('article_title', 'Unknown Title')
+    doc_doi = doc_meta.get('doi', 'Unknown DOI')
+    parent_uuid = weaviate.util.generate_uuid5(doc_doi or doc_title)
+
+    # --- Sections ---
+    for section in tqdm(doc.get('sections', []), desc="Processing Sections"):
+        section_title = section.get('title')
+        if section.get('content'):
+            yield weaviate.util.generate_uuid5(f"{parent_uuid}_section_{section_title}"), {
+                "content": f"Section: {section_title}\n\n{section.get('content')}",
+                "chunk_type": "section", "document_title": doc_title, "parent_id": parent_uuid,
+                "section_title": section_title, "source_file": source_file, "doi": doc_doi,
+            }
+        for subsection in section.get('subsections', []):
+            subsection_title = subsection.get('title')
+            full_title = f"{section_title}.{subsection_title}"
+            if subsection.get('content'):
+                yield weaviate.util.generate_uuid5(f"{parent_uuid}_section_{full_title}"), {
+                    "content": f"Section: {full_title}\n\n{subsection.get('content')}",
+                    "chunk_type": "section", "document_title": doc_title, "parent_id": parent_uuid,
+                    "section_title": full_title, "source_file": source_file, "doi": doc_doi,
+                }
+
+    # --- Tables (Row by Row) ---
+    for table in tqdm(doc.get('tables', []), desc="Processing Tables"):
+        table_id = table.get('id')
+        table_caption = table.get('caption', '')
+        columns = table.get('columns', [])
+        for i, row in enumerate(table.get('rows', [])):
+            row_content = format_table_row_content(row, columns)
+            full_content = f"Data from {table_id} (Caption: {table_caption}):\n{row_content}"
+            yield weaviate.util.generate_uuid5(f"{parent_uuid}_{table_id}_row_{i}"), {
+                "content": full_content, "chunk_type": "table_row", "document_title": doc_title,
+                "parent_id": parent_uuid, "table_id": table_id, "row_index": i,
+                "source_file": source_file, "doi": doc_doi,
+            }
+
+    # --- Figure Captions ---
+    for figure in tqdm(doc.get('figures', []), desc="Processing Figures"):
+        figure_id = figure.get('id')
+        caption = figure.get('caption_general', '')
+        if caption:
+            yield weaviate.util.generate_uuid5(f"{parent_uuid}_{figure_id}"), {
+                "content": f"Caption for {figure_id}: {caption}", "chunk_type": "figure_caption",
+                "document_title": doc_title, "parent_id": parent_uuid, "figure_id": figure_id,
+                "source_file": source_file, "doi": doc_doi,
+            }
+
+def ingest_medical_paper(client: weaviate.WeaviateClient, filepath: str, manifest: IngestManifest = None,
+                         embedder=None):
+    """Reads, chunks, and ingests a medical paper from a JSON file.
+
+    With a manifest, an unchanged file is skipped, only chunks whose content hash
+    changed are upserted, and chunks that no longer exist are deleted. With an
+    embedder, chunk vectors are computed client-side and sent with the objects.
+    """
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"The file {filepath} was not found.")
 
+    source_file = os.path.basename(filepath)
+    digest = file_hash(filepath)
+    if manifest and manifest.is_unchanged(source_file, digest):
+        print(f"\n'{source_file}' is unchanged since the last ingestion. Skipping.")
+        return
+
     with open(filepath, 'r', encoding='utf-8') as f:
         doc = json.load(f)
 
     collection = client.collections.get(COLLECTION_NAME)
-    
-    print(f"\nStarting ingestion for '{os.path.basename(filepath)}'...")
+    objects = list(iter_medical_paper_objects(doc, source_file))
+    removed_ids = []
+    if manifest:
+        objects, removed_ids, chunk_hashes = manifest.diff_chunks(source_file, objects)
+
+    print(f"\nStarting ingestion for '{source_file}' ({len(objects)} new or changed chunks)...")
+    vectors = [None] * len(objects)
+    if embedder:
+        vectors = embedder.embed([properties["content"] for _, properties in objects])
+
     with collection.batch.dynamic() as batch:
-        # --- Document Metadata ---
-        doc_meta = doc.get('document_metadata', {})
-        doc_title = doc_meta.get('article_title', 'Unknown Title')
-        doc_doi = doc_meta.get('doi', 'Unknown DOI')
-        source_file = os.path.basename(filepath)
-        parent_uuid = weaviate.util.generate_uuid5(doc_doi or doc_title)
-
-        # --- Ingest Sections ---
-        for section in tqdm(doc.get('sections', []), desc="Processing Sections"):
-            section_title = section.get('title')
-            if section.get('content'):
-                batch.add_object(
-                    properties={
-                        "content": f"Section: {section_title}\n\n{section.get('content')}",
-                        "chunk_type": "section", "document_title": doc_title, "parent_id": parent_uuid,
-                        "section_title": section_title, "source_file": source_file, "doi": doc_doi,
-                    },
-                    uuid=weaviate.util.generate_uuid5(f"{parent_uuid}_section_{section_title}")
-                )
-            for subsection in section.get('subsections', []):
-                subsection_title = subsection.get('title')
-                full_title = f"{section_title}.{subsection_title}"
-                if subsection.get('content'):
-                    batch.add_object(
-                        properties={
-                            "content": f"Section: {full_title}\n\n{subsection.get('content')}",
-                            "chunk_type": "section", "document_title": doc_title, "parent_id": parent_uuid,
-                            "section_title": full_title, "source_file": source_file, "doi": doc_doi,
-                        },
-                        uuid=weaviate.util.generate_uuid5(f"{parent_uuid}_section_{full_title}")
-                    )
-
-        # --- Ingest Tables (Row by Row) ---
-        for table in tqdm(doc.get('tables', []), desc="Processing Tables"):
-            table_id = table.get('id')
-            table_caption = table.get('caption', '')
-            columns = table.get('columns', [])
-            for i, row in enumerate(table.get('rows', [])):
-                row_content = format_table_row_content(row, columns)
-                full_content = f"Data from {table_id} (Caption: {table_caption}):\n{row_content}"
-                batch.add_object(
-                    properties={
-                        "content": full_content, "chunk_type": "table_row", "document_title": doc_title,
-                        "parent_id": parent_uuid, "table_id": table_id, "row_index": i,
-                        "source_file": source_file, "doi": doc_doi,
-                    },
-                    uuid=weaviate.util.generate_uuid5(f"{parent_uuid}_{table_id}_row_{i}")
-                )
-
-        # --- Ingest Figure Captions ---
-        for figure in tqdm(doc.get('figures', []), desc="Processing Figures"):
-            figure_id = figure.get('id')
-            caption = figure.get('caption_general', '')
-            if caption:
-                batch.add_object(
-                    properties={
-                        "content": f"Caption for {figure_id}: {caption}", "chunk_type": "figure_caption",
-                        "document_title": doc_title, "parent_id": parent_uuid, "figure_id": figure_id,
-                        "source_file": source_file, "doi": doc_doi,
-                    },
-                    uuid=weaviate.util.generate_uuid5(f"{parent_uuid}_{figure_id}")
-                )
-    
+        for (uuid, properties), vector in zip(objects, vectors):
+            batch.add_object(properties=properties, uuid=uuid, vector=vector)
+
     # The batch manager automatically sends the data, so we just need a confirmation message.
     print(f"\nBatch ingestion process finished.")
 
-# --- 5. Demonstration Query ---
+    if manifest:
+        print(f"Deleted {delete_objects(collection, removed_ids)} stale chunks.")
+        failed_ids = {str(failed.object_.uuid) for failed in collection.batch.failed_objects}
+        if failed_ids:
+            chunk_hashes = {key: value for key, value in chunk_hashes.items() if key not in failed_ids}
+            digest = None
+        manifest.record_file(source_file, digest, chunk_hashes)
+        manifest.save()
+
+# --- 5. Invalidate the API Search Cache ---
+def notify_cache_invalidation(collection_name: str):
+    """Asks the running API to drop cached search results for a rewritten collection.
+
+    Only the API worker that receives the call is cleared; with several workers the
+    others serve cached results until their TTL expires.
+    """
+    if not RAG_API_URL:
+        return
+    try:
+        response = requests.post(
+            f"{RAG_API_URL.rstrip('/')}/api/search/cache/invalidate",
+            params={"collection": collection_name},
+            headers={"X-Cache-Admin-Token": CACHE_ADMIN_TOKEN or ""},
+            timeout=10
+        )
+        response.raise_for_status()
+        print(f"Invalidated API search cache: {response.json().get('message')}")
+    except Exception as e:
+        print(f"Could not invalidate API search cache: {e}")
+
+# --- 6. Demonstration Query ---
 def run_query_example(client: weaviate.WeaviateClient):
     """Runs a sample query to demonstrate the system's accuracy."""
     print("\n--- Running Demonstration Query ---")
@@ -188,8 +252,16 @@ if __name__ == "__main__":
     
     try:
         client = setup_weaviate_client()
-        create_collection_schema(client)
-        ingest_medical_paper(client, JSON_FILE_PATH)
+        embedder = get_cached_embedder() if CLIENT_VECTORS else None
+        manifest = None
+        if INCREMENTAL:
+            manifest = IngestManifest(MANIFEST_PATH, COLLECTION_NAME, {
+                "vectors": embedder.model_name if embedder else "server"
+            })
+        if create_collection_schema(client, recreate=not INCREMENTAL) is not None and manifest:
+            manifest.reset()
+        ingest_medical_paper(client, JSON_FILE_PATH, manifest, embedder)
+        notify_cache_invalidation(COLLECTION_NAME)
         run_query_example(client)
     except Exception as e:
         print(f"\nAn error occurred: {e}")